@@ -0,0 +1,65 @@
+"""
+Generators of large GraphQL documents, shaped like the queries generated by clients.
+"""
+
+
+def wide_query(fields: int = 400) -> str:
+    """
+    A flat query with many aliased fields, arguments and string literals.
+    """
+    selections = "\n".join(
+        '    field{0}: node(id: {0}, name: "name {0}", first: 10, after: $cursor) {{ id name }}'.format(i)
+        for i in range(fields)
+    )
+    return "query Wide($cursor: String) {\n  viewer {\n" + selections + "\n  }\n}\n"
+
+
+def deep_query(depth: int = 60) -> str:
+    """
+    A query nested depth levels deep, with arguments and directives at every level.
+    """
+    query = "id"
+    for i in range(depth):
+        query = 'child{0}(first: {0}, filter: {{name: "level {0}"}}) @include(if: $deep) {{ id {1} }}'.format(
+            i, query
+        )
+    return "query Deep($deep: Boolean!) { " + query + " }"
+
+
+def fragment_query(fragments: int = 200) -> str:
+    """
+    A query that spreads a chain of fragments, with unused fragments mixed in.
+    """
+    definitions = [
+        "fragment Fragment{0} on Node {{ id field{0}(arg: {0}) ...Fragment{1} }}".format(
+            i, i + 1
+        )
+        for i in range(fragments)
+    ]
+    definitions.append("fragment Fragment{} on Node {{ id }}".format(fragments))
+    definitions.extend(
+        "fragment Unused{0} on Node {{ id unused{0} }}".format(i)
+        for i in range(fragments // 4)
+    )
+    definitions.append("query Fragments { node { ...Fragment0 } }")
+    return "\n\n".join(reversed(definitions))
+
+
+def literal_query(items: int = 2000) -> str:
+    """
+    A query with big literal lists and objects, e.g. ids inlined by the client.
+    """
+    ids = ", ".join('"{:032x}"'.format(i * 7919) for i in range(items))
+    numbers = ", ".join(str(i) for i in range(items))
+    objects = ", ".join("{{key: {0}, value: {0}.5}}".format(i) for i in range(items // 10))
+    return "query Literals {{ nodes(ids: [{}], numbers: [{}], pairs: [{}]) {{ id }} }}".format(
+        ids, numbers, objects
+    )
+
+
+DOCUMENTS = {
+    "wide": (wide_query, "Wide"),
+    "deep": (deep_query, "Deep"),
+    "fragments": (fragment_query, "Fragments"),
+    "literals": (literal_query, "Literals"),
+}
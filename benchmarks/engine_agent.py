@@ -0,0 +1,334 @@
+"""
+Benchmarks the Engine reporting agent under load, against a local stand-in for the Engine ingress.
+
+    python -m benchmarks.engine_agent --rps 200 --duration 10
+    python -m benchmarks.engine_agent --report-stats --error-rate 0.1 --reset-rate 0.05
+
+GraphQL requests are sent at the target rate to a TornadoGraphQLHandler with the EngineReportingExtension,
+and its agent reports to a FakeIngress in the same process. The same load is first run without the
+extension, so that the CPU time per request that reporting adds can be told apart from the cost of
+executing the query. Also reported are the CPU time spent in the agent itself, on the IOLoop in add_trace
+and in its worker thread serializing reports, the compressed and uncompressed bytes per trace received
+by the ingress, and the latency of each flush from the start of send_report to the end of its uploads.
+"""
+import argparse
+import json
+import time
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import tornado.gen
+import tornado.web
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.testing import bind_unused_port
+
+from graphene_tornado.ext.apollo_engine_reporting import engine_agent
+from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
+    EngineReportingAgent,
+)
+from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
+    EngineReportingOptions,
+)
+from graphene_tornado.ext.apollo_engine_reporting.engine_extension import (
+    EngineReportingExtension,
+)
+from graphene_tornado.ext.apollo_engine_reporting.tests.fake_ingress import FakeIngress
+from graphene_tornado.ext.apollo_engine_reporting.tests.fake_ingress import STATS_PATH
+from graphene_tornado.ext.apollo_engine_reporting.tests.fake_ingress import (
+    TRACES_PATH,
+)
+from graphene_tornado.ext.apollo_engine_reporting.tests.schema import schema
+from graphene_tornado.tornado_graphql_handler import TornadoGraphQLHandler
+
+QUERIES = [
+    """
+    query AuthorPosts {
+      author(id: 5) {
+        name
+        posts(limit: 2) {
+          id
+          title
+          views
+        }
+      }
+      aBoolean
+    }
+    """,
+    """
+    query TopPosts {
+      topPosts(limit: 10) {
+        id
+        title
+        author {
+          name
+        }
+      }
+    }
+    """,
+    "query Scalars { aString aBoolean anInt }",
+]
+
+
+class AgentMeter:
+    """
+    Measures the CPU time spent in an agent and the latency of its flushes.
+    """
+
+    def __init__(self, agent: EngineReportingAgent) -> None:
+        self.add_trace_cpu = 0.0
+        self.serialize_cpu = 0.0
+        self.flush_latencies: List[float] = []
+
+        add_trace = agent.add_trace
+        send_report = agent.send_report
+
+        async def measured_add_trace(*args):
+            # add_trace does not yield, so the thread time around it is its own
+            start = time.thread_time()
+            await add_trace(*args)
+            self.add_trace_cpu += time.thread_time() - start
+
+        async def measured_send_report():
+            start = time.perf_counter()
+            try:
+                await send_report()
+            finally:
+                self.flush_latencies.append(time.perf_counter() - start)
+
+        agent.add_trace = measured_add_trace
+        agent.send_report = measured_send_report
+
+    def serializer(self, serialize):
+        # Runs on the agent's worker thread
+        def measured(*args):
+            start = time.thread_time()
+            try:
+                return serialize(*args)
+            finally:
+                self.serialize_cpu += time.thread_time() - start
+
+        return measured
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+def _listen(application: tornado.web.Application) -> Tuple[HTTPServer, str]:
+    sock, port = bind_unused_port()
+    server = HTTPServer(application)
+    server.add_sockets([sock])
+    return server, "http://127.0.0.1:{}".format(port)
+
+
+async def _drive(url: str, rps: float, duration: float, concurrency: int) -> Dict:
+    """
+    Sends requests at a fixed rate, without waiting for earlier responses unless too many are in flight.
+    """
+    http_client = AsyncHTTPClient(force_instance=True, max_clients=concurrency)
+    io_loop = IOLoop.current()
+    requests = 0
+    errors = 0
+    in_flight: set = set()
+
+    async def send(query: str) -> None:
+        nonlocal errors
+        response = await http_client.fetch(
+            url,
+            method="POST",
+            body=json.dumps({"query": query}),
+            headers={"Content-Type": "application/json"},
+            raise_error=False,
+        )
+        if response.code != 200:
+            errors += 1
+
+    start = io_loop.time()
+    cpu_start = time.process_time()
+    try:
+        while io_loop.time() - start < duration:
+            due = start + requests / rps
+            if due > io_loop.time():
+                await tornado.gen.sleep(due - io_loop.time())
+            if len(in_flight) >= concurrency:
+                await tornado.gen.multi(list(in_flight)[:1])
+                continue
+            future = tornado.gen.convert_yielded(send(QUERIES[requests % len(QUERIES)]))
+            in_flight.add(future)
+            future.add_done_callback(in_flight.discard)
+            requests += 1
+        if in_flight:
+            await tornado.gen.multi(list(in_flight))
+        elapsed = io_loop.time() - start
+        cpu = time.process_time() - cpu_start
+    finally:
+        http_client.close()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "achieved_rps": requests / elapsed,
+        "cpu_per_request_us": cpu / max(requests, 1) * 1e6,
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    ingress = FakeIngress(
+        api_key="benchmark",
+        latency=args.ingress_latency_ms / 1000.0,
+        error_rate=args.error_rate,
+        reset_rate=args.reset_rate,
+        seed=0,
+    )
+    ingress_server, ingress_url = _listen(ingress.application())
+
+    options = EngineReportingOptions(
+        api_key="benchmark",
+        endpoint_url=ingress_url + TRACES_PATH,
+        stats_endpoint_url=ingress_url + STATS_PATH,
+        report_interval_ms=args.report_interval_ms,
+        compression_level=args.compression_level,
+        report_stats=args.report_stats,
+        minimum_retry_delay_ms=10,
+    )
+    agent = EngineReportingAgent(options, "benchmark")
+    meter = AgentMeter(agent)
+    serialize = engine_agent._serialize
+    serialize_stats = engine_agent._serialize_stats
+    engine_agent._serialize = meter.serializer(serialize)
+    engine_agent._serialize_stats = meter.serializer(serialize_stats)
+
+    graphql_server, graphql_url = _listen(
+        tornado.web.Application(
+            [
+                (r"/graphql", TornadoGraphQLHandler, dict(schema=schema)),
+                (
+                    r"/graphql/engine",
+                    TornadoGraphQLHandler,
+                    dict(
+                        schema=schema,
+                        extensions=[
+                            lambda: EngineReportingExtension(options, agent.add_trace)
+                        ],
+                    ),
+                ),
+            ]
+        )
+    )
+
+    try:
+        baseline = await _drive(
+            graphql_url + "/graphql", args.rps, args.duration, args.concurrency
+        )
+        reporting = await _drive(
+            graphql_url + "/graphql/engine", args.rps, args.duration, args.concurrency
+        )
+        await agent.shutdown()
+    finally:
+        engine_agent._serialize = serialize
+        engine_agent._serialize_stats = serialize_stats
+        agent.close()
+        graphql_server.stop()
+        ingress_server.stop()
+
+    requests = max(reporting["requests"], 1)
+    traces = ingress.trace_count if not args.report_stats else ingress.stats_request_count
+    return {
+        "baseline": baseline,
+        "reporting": reporting,
+        "reporting_overhead_us": reporting["cpu_per_request_us"]
+        - baseline["cpu_per_request_us"],
+        "add_trace_cpu_per_request_us": meter.add_trace_cpu / requests * 1e6,
+        "serialize_cpu_per_request_us": meter.serialize_cpu / requests * 1e6,
+        "traces_received": traces,
+        "bytes_per_trace": ingress.received_bytes / max(traces, 1),
+        "uncompressed_bytes_per_trace": ingress.decoded_bytes / max(traces, 1),
+        "ingress_requests": ingress.requests,
+        "dropped_traces": agent.dropped_traces,
+        "flushes": len(meter.flush_latencies),
+        "flush_latency_ms": {
+            "p50": _percentile(meter.flush_latencies, 0.5) * 1000,
+            "p99": _percentile(meter.flush_latencies, 0.99) * 1000,
+            "max": max(meter.flush_latencies, default=0.0) * 1000,
+        },
+    }
+
+
+def _print(results: Dict) -> None:
+    for name in ("baseline", "reporting"):
+        phase = results[name]
+        print(
+            "{:<10} {:>7} requests {:>5} errors {:>9.1f} rps {:>9.1f} us CPU/request".format(
+                name,
+                phase["requests"],
+                phase["errors"],
+                phase["achieved_rps"],
+                phase["cpu_per_request_us"],
+            )
+        )
+    for label, key in (
+        ("reporting overhead", "reporting_overhead_us"),
+        ("  agent add_trace", "add_trace_cpu_per_request_us"),
+        ("  agent serialization", "serialize_cpu_per_request_us"),
+    ):
+        print("{:<23} {:>9.1f} us CPU/request".format(label, results[key]))
+    print(
+        "traces received         {:>9} in {} ingress requests, {} dropped by the agent".format(
+            results["traces_received"], results["ingress_requests"], results["dropped_traces"]
+        )
+    )
+    print(
+        "bytes per trace         {:>9.1f} compressed, {:.1f} uncompressed".format(
+            results["bytes_per_trace"], results["uncompressed_bytes_per_trace"]
+        )
+    )
+    latency = results["flush_latency_ms"]
+    print(
+        "flush latency (ms)      {:>9.1f} p50 {:.1f} p99 {:.1f} max over {} flushes".format(
+            latency["p50"], latency["p99"], latency["max"], results["flushes"]
+        )
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Engine reporting agent against a local ingress."
+    )
+    parser.add_argument("--rps", type=float, default=200, help="the target request rate")
+    parser.add_argument(
+        "--duration", type=float, default=10, help="the seconds each phase runs for"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=64, help="the maximum requests in flight"
+    )
+    parser.add_argument("--report-interval-ms", type=int, default=1000)
+    parser.add_argument("--compression-level", type=int, default=None)
+    parser.add_argument(
+        "--report-stats", action="store_true", help="aggregate traces into stats reports"
+    )
+    parser.add_argument("--ingress-latency-ms", type=float, default=0)
+    parser.add_argument(
+        "--error-rate", type=float, default=0, help="the fraction of uploads answered with a 503"
+    )
+    parser.add_argument(
+        "--reset-rate", type=float, default=0, help="the fraction of uploads reset"
+    )
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = IOLoop.current().run_sync(lambda: run(args))
+    if args.json:
+        print(json.dumps(results, indent=2, sort_keys=True))
+    else:
+        _print(results)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,40 @@
+"""
+Compares print_compact with printing via graphql.print_ast and regular expressions.
+
+    python -m benchmarks.printer
+"""
+import timeit
+
+from graphql import parse
+
+from benchmarks.documents import DOCUMENTS
+from graphene_tornado.apollo_tooling.printer import print_compact
+from graphene_tornado.apollo_tooling.printer import print_compact_via_print_ast
+
+
+def _best_of(function, document, number, repeat=5):
+    return min(timeit.repeat(lambda: function(document), number=number, repeat=repeat)) / number
+
+
+def main():
+    print(
+        "{:<10} {:>8} {:>14} {:>14} {:>8}".format(
+            "document", "size", "print_ast (ms)", "compact (ms)", "speedup"
+        )
+    )
+    for name, (generate, _) in sorted(DOCUMENTS.items()):
+        query = generate()
+        document = parse(query)
+        assert print_compact(document) == print_compact_via_print_ast(document)
+
+        reference = _best_of(print_compact_via_print_ast, document, number=5)
+        compact = _best_of(print_compact, document, number=20)
+        print(
+            "{:<10} {:>7}K {:>14.2f} {:>14.2f} {:>7.1f}x".format(
+                name, len(query) // 1024, reference * 1000, compact * 1000, reference / compact
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Benchmarks the signature transforms on large generated documents and checks them against stored baselines.
+
+    python -m benchmarks.signature            # compare with benchmarks/baselines.json
+    python -m benchmarks.signature --update   # record new baselines
+
+Each transform and default_engine_reporting_signature are timed (best of several runs) and their peak
+allocations are measured with tracemalloc. Times are stored relative to a fixed pure Python workload, so
+that baselines recorded on one machine can be checked on another. The command exits with a non-zero status
+if any measurement is slower, or allocates more, than its baseline by more than the tolerance; anything
+that looks slower is measured again first, since timings are noisy.
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from functools import partial
+from typing import Callable
+from typing import Dict
+from typing import NamedTuple
+
+from graphql import parse
+
+from benchmarks.documents import DOCUMENTS
+from graphene_tornado.apollo_tooling.operation_id import (
+    default_engine_reporting_signature,
+)
+from graphene_tornado.apollo_tooling.printer import print_compact_via_print_ast
+from graphene_tornado.apollo_tooling.transforms import drop_unused_definitions
+from graphene_tornado.apollo_tooling.transforms import hide_literals
+from graphene_tornado.apollo_tooling.transforms import print_with_reduced_whitespace
+from graphene_tornado.apollo_tooling.transforms import remove_aliases
+from graphene_tornado.apollo_tooling.transforms import sort_ast
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+Measurement = NamedTuple(
+    "Measurement",
+    [
+        ("time", float),  # relative to the calibration workload
+        ("peak_kb", float),
+    ],
+)
+
+
+def _composed_signature(document, operation_name):
+    return print_compact_via_print_ast(
+        sort_ast(
+            remove_aliases(hide_literals(drop_unused_definitions(document, operation_name)))
+        )
+    )
+
+
+TRANSFORMS: Dict[str, Callable] = {
+    "drop_unused_definitions": drop_unused_definitions,
+    "hide_literals": lambda document, _: hide_literals(document),
+    "remove_aliases": lambda document, _: remove_aliases(document),
+    "sort_ast": lambda document, _: sort_ast(document),
+    "print_with_reduced_whitespace": lambda document, _: print_with_reduced_whitespace(
+        document
+    ),
+    "default_engine_reporting_signature": default_engine_reporting_signature,
+    "composed_transforms": _composed_signature,
+}
+
+
+def _calibrate() -> float:
+    def workload():
+        total = 0
+        for i in range(20000):
+            total += len(str(i))
+        return total
+
+    return min(timeit.repeat(workload, number=5, repeat=5)) / 5
+
+
+def _measure(function: Callable, calibration: float) -> Measurement:
+    # Run once to warm up and to pick a number of iterations that takes ~0.1s
+    number = max(1, int(0.1 / max(timeit.timeit(function, number=1), 1e-6)))
+    seconds = min(timeit.repeat(function, number=number, repeat=5)) / number
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(round(seconds / calibration, 4), round(peak / 1024.0, 1))
+
+
+def _benchmarks() -> Dict[str, Callable]:
+    benchmarks = {}
+    for document_name, (generate, operation_name) in sorted(DOCUMENTS.items()):
+        document = parse(generate())
+        for transform_name, transform in TRANSFORMS.items():
+            key = "{}/{}".format(document_name, transform_name)
+            benchmarks[key] = partial(transform, document, operation_name)
+    return benchmarks
+
+
+def run(benchmarks: Dict[str, Callable]) -> Dict[str, Measurement]:
+    return {
+        key: _measure(function, _calibrate()) for key, function in benchmarks.items()
+    }
+
+
+def compare(
+    results: Dict[str, Measurement],
+    baselines: Dict[str, Dict[str, float]],
+    tolerance: float,
+    memory_tolerance: float,
+) -> int:
+    regressions = 0
+    print(
+        "{:<50} {:>9} {:>9} {:>10} {:>10}".format(
+            "benchmark", "time", "baseline", "peak (KB)", "baseline"
+        )
+    )
+    for key, measurement in results.items():
+        baseline = baselines.get(key, None)
+        flags = []
+        if baseline is None:
+            flags.append("NEW")
+        else:
+            if measurement.time > baseline["time"] * tolerance:
+                flags.append("SLOWER")
+            if measurement.peak_kb > baseline["peak_kb"] * memory_tolerance:
+                flags.append("MORE MEMORY")
+        if flags and flags != ["NEW"]:
+            regressions += 1
+        print(
+            "{:<50} {:>9.2f} {:>9} {:>10.1f} {:>10} {}".format(
+                key,
+                measurement.time,
+                "{:.2f}".format(baseline["time"]) if baseline else "-",
+                measurement.peak_kb,
+                "{:.1f}".format(baseline["peak_kb"]) if baseline else "-",
+                " ".join(flags),
+            )
+        )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the signature transforms.")
+    parser.add_argument(
+        "--update", action="store_true", help="record the results as the new baselines"
+    )
+    parser.add_argument("--baselines", default=BASELINES, help="the baselines file")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=2.0,
+        help="the slowdown factor that counts as a regression",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=1.2,
+        help="the allocation growth factor that counts as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    benchmarks = _benchmarks()
+    results = run(benchmarks)
+    if args.update:
+        with open(args.baselines, "w") as f:
+            json.dump(
+                {key: measurement._asdict() for key, measurement in results.items()},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+        compare(results, {}, args.tolerance, args.memory_tolerance)
+        return 0
+
+    with open(args.baselines) as f:
+        baselines = json.load(f)
+    # Timings are noisy, so measure whatever looks slower again before failing
+    for _ in range(2):
+        slower = [
+            key
+            for key, measurement in results.items()
+            if key in baselines
+            and measurement.time > baselines[key]["time"] * args.tolerance
+        ]
+        for key, measurement in run({key: benchmarks[key] for key in slower}).items():
+            if measurement.time < results[key].time:
+                results[key] = measurement
+    regressions = compare(results, baselines, args.tolerance, args.memory_tolerance)
+    if regressions:
+        sys.stderr.write(
+            "{} benchmark(s) regressed against {}\n".format(regressions, args.baselines)
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
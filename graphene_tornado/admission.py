@@ -0,0 +1,138 @@
+"""
+Admission control for GraphQL requests.
+
+An AdmissionController limits the number of requests that a process executes at once. Requests over the
+limit wait in a bounded FIFO queue, and requests that find the queue full (or that wait longer than the
+queue timeout) are rejected with a 503 before their body is parsed. Requests can optionally be split into
+named lanes, e.g. to keep expensive operations from starving cheap ones.
+"""
+import asyncio
+from collections import deque
+from typing import Deque
+from typing import Dict
+from typing import Optional
+
+from tornado.web import HTTPError
+
+
+class AdmissionRejectedError(HTTPError):
+    def __init__(self, retry_after: int) -> None:
+        super(AdmissionRejectedError, self).__init__(
+            503, "Server is overloaded, retry later."
+        )
+        self.retry_after = retry_after
+
+
+class AdmissionLane:
+    """
+    Admits up to max_concurrent requests at once and queues up to max_queued more.
+
+    Args:
+        max_concurrent: The number of requests that can execute at once
+        max_queued: The number of requests that can wait for a slot
+        queue_timeout: How long, in seconds, a request can wait for a slot before being rejected
+        retry_after: The Retry-After value sent with rejections, in seconds
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queued: int = 0,
+        queue_timeout: Optional[float] = None,
+        retry_after: int = 1,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """
+        Waits for a slot in this lane.
+
+        Raises:
+            AdmissionRejectedError: If the queue is full or the queue timeout expires
+        """
+        if self.in_flight < self.max_concurrent and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.max_queued:
+            self.rejected += 1
+            raise AdmissionRejectedError(self.retry_after)
+
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise AdmissionRejectedError(self.retry_after)
+        except BaseException:
+            # We were handed a slot but cancelled before we could use it
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def release(self) -> None:
+        """
+        Frees a slot, handing it directly to the oldest waiting request if there is one.
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionController:
+    """
+    A set of admission lanes shared by all the handlers of a process.
+
+    Args:
+        max_concurrent: The concurrency limit of the default lane
+        max_queued: The queue size of the default lane
+        queue_timeout: The queue timeout of the default lane, in seconds
+        retry_after: The Retry-After value sent with rejections from the default lane, in seconds
+        lanes: Additional named lanes, selected by TornadoGraphQLHandler.get_admission_lane
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queued: int = 0,
+        queue_timeout: Optional[float] = None,
+        retry_after: int = 1,
+        lanes: Optional[Dict[str, AdmissionLane]] = None,
+    ) -> None:
+        self.default_lane = AdmissionLane(
+            max_concurrent, max_queued, queue_timeout, retry_after
+        )
+        self.lanes = lanes or {}
+
+    def lane(self, name: Optional[str] = None) -> AdmissionLane:
+        if name is None:
+            return self.default_lane
+        return self.lanes.get(name, self.default_lane)
+
+    @property
+    def in_flight(self) -> int:
+        return self.default_lane.in_flight + sum(
+            lane.in_flight for lane in self.lanes.values()
+        )
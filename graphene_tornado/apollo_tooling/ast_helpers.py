@@ -0,0 +1,76 @@
+"""
+Helpers shared by the transforms, the compact printer and the single pass signature.
+"""
+from copy import copy
+from typing import List
+
+from graphql import InlineFragmentNode
+from graphql import ListTypeNode
+from graphql import NamedTypeNode
+from graphql import NonNullTypeNode
+
+WORD_CHARACTERS = frozenset(
+    "_abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+)
+
+
+class UnsupportedNode(Exception):
+    """
+    Raised by the direct printers for nodes they do not print, so that the caller can fall back to the
+    reference implementation.
+    """
+
+
+def replace(node, **changes):
+    """
+    Returns a shallow copy of node with some attributes replaced. Visitors return the copy so that visit
+    copies the ancestors of the node rather than the node being modified in place.
+    """
+    node = copy(node)
+    for key, value in changes.items():
+        setattr(node, key, value)
+    return node
+
+
+def append_separated(out: List[str], text: str) -> None:
+    # Whitespace only survives between two word characters
+    if out and text and text[0] in WORD_CHARACTERS and out[-1][-1] in WORD_CHARACTERS:
+        out.append(" ")
+    if text:
+        out.append(text)
+
+
+def print_type(node) -> str:
+    if isinstance(node, NamedTypeNode):
+        return node.name.value
+    elif isinstance(node, ListTypeNode):
+        return "[" + print_type(node.type) + "]"
+    elif isinstance(node, NonNullTypeNode):
+        return print_type(node.type) + "!"
+    raise UnsupportedNode(node)
+
+
+def by_name(node):
+    if isinstance(node, InlineFragmentNode):
+        return by_type_definition(node)
+    elif node.name is not None:
+        return node.name.value
+    return None
+
+
+def by_type_definition(node):
+    if node.type_condition is not None and node.type_condition.name:
+        return node.type_condition.name.value
+    return None
+
+
+def by_variable_name(node):
+    if node.variable is not None and node.variable.name is not None:
+        return node.variable.name.value
+    return None
+
+
+def by_kind_and_name(node):
+    name = by_name(node)
+    # Unnamed nodes, e.g. inline fragments without a type condition, sort after named ones
+    return node.__class__.__name__, name is None, name or ""
@@ -0,0 +1,228 @@
+"""
+Extracts a manifest of operations from .graphql files or captured query logs.
+
+Usage::
+
+    python -m graphene_tornado.apollo_tooling.manifest --output manifest.json queries/ captured.jsonl
+
+Directories are searched recursively for .graphql files, and every operation in a file becomes an entry.
+Files ending in .jsonl hold one JSON object per line with a "query" and an optional "operationName". Each
+entry holds the id (the SHA-256 hash of the signature), the operation name, the normalized signature and
+the original text of the operation and the fragments it uses. Anonymous operations have a null name.
+Documents are processed in parallel across a process pool. Documents and log lines that cannot be read
+are reported with their source and skipped.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+from graphql import DocumentNode
+from graphql import GraphQLError
+from graphql import OperationDefinitionNode
+from graphql import parse
+
+from graphene_tornado.apollo_tooling.operation_id import (
+    default_engine_reporting_signature,
+)
+from graphene_tornado.apollo_tooling.query_hash import compute
+from graphene_tornado.apollo_tooling.transforms import drop_unused_definitions
+
+MANIFEST_VERSION = 1
+
+# (source, query text, operation name)
+Document = Tuple[str, str, Optional[str]]
+
+
+def find_documents(
+    paths: Iterable[str], errors: Optional[List[str]] = None
+) -> Iterator[Document]:
+    """
+    Args:
+        paths: Directories of .graphql files, .graphql files or .jsonl query logs
+        errors: Receives an error for each log line that does not hold a query, which is skipped
+
+    Yields:
+        The documents to extract operations from
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith(".graphql"):
+                        yield from find_documents([os.path.join(root, name)], errors)
+        elif path.endswith(".jsonl"):
+            with open(path) as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    source = "{}:{}".format(path, line_number)
+                    try:
+                        yield _read_log_entry(source, line)
+                    except ValueError as e:
+                        if errors is not None:
+                            errors.append("{}: {}".format(source, e))
+        else:
+            with open(path) as f:
+                yield path, f.read(), None
+
+
+def _read_log_entry(source: str, line: str) -> Document:
+    """
+    Raises:
+        ValueError: If the line is not a JSON object with a query string
+    """
+    try:
+        entry = json.loads(line)
+    except ValueError as e:
+        raise ValueError("Invalid JSON: {}".format(e))
+    query = entry.get("query", None) if isinstance(entry, dict) else None
+    if not isinstance(query, str):
+        raise ValueError('Expected an object with a "query" string.')
+    operation_name = entry.get("operationName", None)
+    if not isinstance(operation_name, str):
+        operation_name = None
+    return source, query, operation_name
+
+
+def _operation_body(body: str, ast: DocumentNode, operation_name: Optional[str]) -> str:
+    """
+    Returns:
+        The text of the operation and the fragments it uses, or the whole body if that is all it holds
+    """
+    used = drop_unused_definitions(ast, operation_name or "")
+    if len(used.definitions) == len(ast.definitions):
+        return body
+    return "\n\n".join(
+        body[definition.loc.start : definition.loc.end]  # type: ignore
+        for definition in used.definitions
+    )
+
+
+def extract_operations(document: Document) -> List[Dict[str, Any]]:
+    """
+    Signs the operations of a document. If the document does not name the operation to use, every
+    operation in it is extracted.
+
+    Returns:
+        The manifest entries for the document
+
+    Raises:
+        GraphQLError: If the document does not parse
+    """
+    source, body, operation_name = document
+    ast = parse(body)
+    if operation_name is not None:
+        operation_names: List[Optional[str]] = [operation_name or None]
+    else:
+        operation_names = [
+            definition.name.value if definition.name else None
+            for definition in ast.definitions
+            if isinstance(definition, OperationDefinitionNode)
+        ]
+
+    entries = []
+    for name in operation_names:
+        signature = default_engine_reporting_signature(ast, name or "")
+        entries.append(
+            {
+                "id": compute(signature),
+                "name": name,
+                "signature": signature,
+                "body": _operation_body(body, ast, name),
+            }
+        )
+    return entries
+
+
+def _extract_or_report(
+    document: Document,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    try:
+        return extract_operations(document), None
+    except GraphQLError as e:
+        return [], "{}: {}".format(document[0], e.message)
+
+
+def build_manifest(
+    documents: Iterable[Document], jobs: Optional[int] = None, chunk_size: int = 256
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Args:
+        documents: The documents to extract operations from
+        jobs: The number of worker processes, or 1 to extract in this process
+        chunk_size: The number of documents sent to a worker at once
+
+    Returns:
+        The manifest, with operations deduplicated by id and sorted, and the errors encountered
+    """
+    if jobs == 1:
+        results: Iterable = map(_extract_or_report, documents)
+        return _collect(results)
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(_extract_or_report, documents, chunksize=chunk_size)
+        return _collect(results)
+
+
+def _collect(results) -> Tuple[Dict[str, Any], List[str]]:
+    operations: Dict[str, Dict[str, Any]] = {}
+    errors = []
+    for entries, error in results:
+        if error is not None:
+            errors.append(error)
+        for entry in entries:
+            operations.setdefault(entry["id"], entry)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "operations": [operations[key] for key in sorted(operations)],
+    }
+    return manifest, errors
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Extract a manifest of GraphQL operations."
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="directories or .graphql files, or .jsonl query logs"
+    )
+    parser.add_argument("-o", "--output", help="the manifest file, stdout by default")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="the number of worker processes"
+    )
+    parser.add_argument(
+        "--strict", action="store_true", help="fail if any document cannot be read"
+    )
+    args = parser.parse_args(argv)
+
+    errors: List[str] = []
+    manifest, extraction_errors = build_manifest(
+        find_documents(args.paths, errors), args.jobs
+    )
+    errors.extend(extraction_errors)
+    for error in errors:
+        sys.stderr.write(error + "\n")
+    if errors and args.strict:
+        return 1
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(manifest, f, indent=2)
+    else:
+        json.dump(manifest, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Prints GraphQL documents with reduced whitespace.
+
+print_compact writes the reduced form directly into a single buffer. It produces exactly the output of
+printing with graphql.print_ast and then collapsing the whitespace with regular expressions, as
+print_compact_via_print_ast does, including the places where the pretty printer's layout shows through:
+field arguments that are longer than 80 characters and variable definitions that span lines are separated
+by whitespace rather than commas, and falsy values (such as hidden numeric literals) are dropped from lists
+and default values. Documents with type system definitions are printed with print_compact_via_print_ast.
+"""
+import re
+from typing import Any
+from typing import List
+from typing import Tuple
+
+import six
+from graphql import BooleanValueNode
+from graphql import DocumentNode
+from graphql import EnumValueNode
+from graphql import FieldNode
+from graphql import FloatValueNode
+from graphql import FragmentDefinitionNode
+from graphql import FragmentSpreadNode
+from graphql import IntValueNode
+from graphql import ListValueNode
+from graphql import NullValueNode
+from graphql import ObjectValueNode
+from graphql import OperationDefinitionNode
+from graphql import OperationType
+from graphql import print_ast
+from graphql import StringValueNode
+from graphql import VariableNode
+from graphql.language.printer import MAX_LINE_LENGTH
+from graphql.language.visitor import visit
+from graphql.language.visitor import Visitor
+
+from graphene_tornado.apollo_tooling.ast_helpers import append_separated
+from graphene_tornado.apollo_tooling.ast_helpers import print_type
+from graphene_tornado.apollo_tooling.ast_helpers import replace
+from graphene_tornado.apollo_tooling.ast_helpers import UnsupportedNode
+from graphene_tornado.apollo_tooling.ast_helpers import WORD_CHARACTERS
+
+
+# Block strings are hex encoded before pretty printing, and go on their own lines when longer than this
+_MAX_SINGLE_LINE_BLOCK_STRING = 70
+
+# A printed value: its reduced form (falsy if the pretty printer would drop it), its length when pretty
+# printed, and whether the pretty printed form spans lines
+PrintedValue = Tuple[Any, int, bool]
+
+
+def print_compact(ast: DocumentNode) -> str:
+    """
+    Like the graphql-js print function, but deleting whitespace wherever
+    feasible. Specifically, all whitespace (outside of string literals) is
+    reduced to at most one space, and even that space is removed anywhere except
+    for between two alphanumerics.
+    """
+    out: List[str] = []
+    try:
+        for definition in ast.definitions:
+            append_separated(out, _print_definition(definition))
+    except UnsupportedNode:
+        return print_compact_via_print_ast(ast)
+    return "".join(out)
+
+
+def print_compact_via_print_ast(ast: DocumentNode) -> str:
+    """
+    The reference implementation of print_compact: string values are hex encoded so that their whitespace
+    survives, the document is pretty printed, the whitespace is collapsed with regular expressions and
+    the strings are decoded again.
+    """
+    val = re.sub(r"\s+", " ", print_ast(visit(ast, _HEX_CONVERSION_VISITOR)))
+
+    val = re.sub(r"([^_a-zA-Z0-9]) ", _replace_with_first_group, val)
+    val = re.sub(r" ([^_a-zA-Z0-9])", _replace_with_first_group, val)
+    val = re.sub(r'"([a-f0-9]+)"', _from_hex, val)
+
+    return val
+
+
+def _replace_with_first_group(match):
+    return match.group(1)
+
+
+def _from_hex(match):
+    m = match.group(1)
+    if six.PY3:
+        m = bytes.fromhex(m).decode("utf-8")
+    else:
+        m = m.decode("hex").encode("utf-8")
+    return '"' + m + '"'
+
+
+class _HexConversionVisitor(Visitor):
+    def enter(self, node, key, parent, path, ancestors):
+        if isinstance(node, StringValueNode) and node.value:
+            if six.PY3:
+                encoded = node.value.encode("utf-8").hex()
+            else:
+                encoded = node.value.encode("hex")
+            return replace(node, value=encoded)
+        return None
+
+
+_HEX_CONVERSION_VISITOR = _HexConversionVisitor()
+
+
+def _print_definition(node) -> str:
+    if not isinstance(node, (OperationDefinitionNode, FragmentDefinitionNode)):
+        raise UnsupportedNode(node)
+    out: List[str] = []
+    if node.description is not None:
+        out.append(_print_value(node.description)[0])
+    if isinstance(node, OperationDefinitionNode):
+        variable_definitions = [
+            _print_variable_definition(variable_definition)
+            for variable_definition in node.variable_definitions or ()
+        ]
+        if (
+            node.description is not None
+            or node.operation != OperationType.QUERY
+            or node.name
+            or variable_definitions
+            or node.directives
+        ):
+            append_separated(out, node.operation.value)
+            if node.name:
+                out.append(" ")
+                out.append(node.name.value)
+            if variable_definitions:
+                multiline = any(printed[1] for printed in variable_definitions)
+                out.append("(")
+                for i, (printed, _) in enumerate(variable_definitions):
+                    if not i:
+                        out.append(printed)
+                    elif multiline:
+                        append_separated(out, printed)
+                    else:
+                        out.append(",")
+                        out.append(printed)
+                out.append(")")
+            _print_directives(node.directives, out)
+    else:
+        append_separated(out, "fragment ")
+        out.append(node.name.value)
+        if node.variable_definitions:
+            out.append("(")
+            out.append(
+                ",".join(
+                    _print_variable_definition(variable_definition)[0]
+                    for variable_definition in node.variable_definitions
+                )
+            )
+            out.append(")")
+        append_separated(out, "on ")
+        out.append(node.type_condition.name.value)
+        _print_directives(node.directives, out)
+    _print_selection_set(node.selection_set, out)
+    return "".join(out)
+
+
+def _print_variable_definition(node) -> Tuple[str, bool]:
+    """
+    Returns the reduced form of a variable definition and whether its pretty printed form spans lines.
+    """
+    out: List[str] = []
+    multiline = False
+    if node.description is not None:
+        out.append(_print_value(node.description)[0])
+        multiline = True
+    out.append("$")
+    out.append(node.variable.name.value)
+    out.append(":")
+    out.append(print_type(node.type))
+    if node.default_value is not None:
+        printed, _, value_multiline = _print_value(node.default_value)
+        if printed:
+            out.append("=")
+            out.append(printed)
+            multiline = multiline or value_multiline
+    multiline = _print_directives(node.directives, out) or multiline
+    return "".join(out), multiline
+
+
+def _print_value(node) -> PrintedValue:
+    if isinstance(node, VariableNode):
+        printed = "$" + node.name.value
+        return printed, len(printed), False
+    elif isinstance(node, (IntValueNode, FloatValueNode)):
+        value = node.value
+        if not value:
+            return value, len(str(value)), False
+        printed = str(value)
+        return printed, len(printed), False
+    elif isinstance(node, StringValueNode):
+        return _print_string(node.value, bool(node.block))
+    elif isinstance(node, BooleanValueNode):
+        printed = "true" if node.value else "false"
+        return printed, len(printed), False
+    elif isinstance(node, NullValueNode):
+        return "null", 4, False
+    elif isinstance(node, EnumValueNode):
+        return node.value, len(node.value), False
+    elif isinstance(node, ListValueNode):
+        values = [_print_value(value) for value in node.values]
+        values = [value for value in values if value[0]]
+        printed = "[" + ",".join(value[0] for value in values) + "]"
+        length = 2 + sum(value[1] + 2 for value in values) - (2 if values else 0)
+        return printed, length, any(value[2] for value in values)
+    elif isinstance(node, ObjectValueNode):
+        fields = [_print_argument(field) for field in node.fields]
+        printed = "{" + ",".join(field[0] for field in fields) + "}"
+        length = 2 + sum(field[1] + 2 for field in fields) - (2 if fields else 0)
+        return printed, length, any(field[2] for field in fields)
+    raise UnsupportedNode(node)
+
+
+def _print_string(value: str, block: bool) -> PrintedValue:
+    # Strings are pretty printed hex encoded and decoded again, so their contents are not escaped
+    quote = '"""' if block else '"'
+    if not value:
+        return quote + quote, 2 * len(quote), False
+    encoded_length = 2 * len(value.encode("utf-8"))
+    length = encoded_length + 2 * len(quote)
+    multiline = block and encoded_length > _MAX_SINGLE_LINE_BLOCK_STRING
+    if multiline:
+        length += 2
+    return quote + value + quote, length, multiline
+
+
+def _print_argument(node) -> PrintedValue:
+    """
+    Prints an argument or an object field.
+    """
+    value, length, multiline = _print_value(node.value)
+    name = node.name.value
+    return name + ":" + str(value), len(name) + 2 + length, multiline
+
+
+def _print_directives(directives, out: List[str]) -> bool:
+    """
+    Returns whether any of the directives span lines when pretty printed.
+    """
+    multiline = False
+    for directive in directives or ():
+        out.append("@")
+        out.append(directive.name.value)
+        if directive.arguments:
+            arguments = [_print_argument(argument) for argument in directive.arguments]
+            out.append("(")
+            out.append(",".join(argument[0] for argument in arguments))
+            out.append(")")
+            multiline = multiline or any(argument[2] for argument in arguments)
+    return multiline
+
+
+def _print_selection_set(node, out: List[str]) -> None:
+    if node is None or not node.selections:
+        return
+    out.append("{")
+    for selection in node.selections:
+        if isinstance(selection, FieldNode):
+            if out[-1][-1] in WORD_CHARACTERS:
+                out.append(" ")
+            _print_field(selection, out)
+        elif isinstance(selection, FragmentSpreadNode):
+            out.append("...")
+            out.append(selection.name.value)
+            _print_directives(selection.directives, out)
+        else:
+            out.append("...")
+            if selection.type_condition is not None:
+                out.append("on ")
+                out.append(selection.type_condition.name.value)
+            _print_directives(selection.directives, out)
+            _print_selection_set(selection.selection_set, out)
+    out.append("}")
+
+
+def _print_field(node: FieldNode, out: List[str]) -> None:
+    # The length of "alias: name(a: 0, b: 0)" as the pretty printer would lay it out
+    line_length = len(node.name.value)
+    if node.alias is not None:
+        out.append(node.alias.value)
+        out.append(":")
+        line_length += len(node.alias.value) + 2
+    out.append(node.name.value)
+    if node.arguments:
+        arguments = [_print_argument(argument) for argument in node.arguments]
+        line_length += sum(argument[1] + 2 for argument in arguments)
+        out.append("(")
+        for i, (printed, _, _) in enumerate(arguments):
+            if not i:
+                out.append(printed)
+            elif line_length > MAX_LINE_LENGTH:
+                append_separated(out, printed)
+            else:
+                out.append(",")
+                out.append(printed)
+        out.append(")")
+    _print_directives(node.directives, out)
+    _print_selection_set(node.selection_set, out)
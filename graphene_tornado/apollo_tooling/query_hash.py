@@ -1,15 +1,127 @@
 import hashlib
+import threading
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Union
 
+Query = Union[str, bytes]
 
-def compute(query: str) -> str:
-    # type (str) -> str
+DEFAULT_CAPACITY = 512
+DEFAULT_MAX_QUERY_LENGTH = 4096
+
+
+class QueryHasher:
     """
-    Computes the query hash via SHA-256.
+    Hashes queries, memoizing the digests of recently seen queries.
+
+    The memo is keyed by the query itself: strings cache their own hash, and a lookup with the same string
+    object is decided by identity, so hashing a query string that was seen before costs a dictionary lookup.
+    Raw request bytes can be hashed as well, without decoding them first. A str and its UTF-8 encoding have
+    the same digest.
+
+    The memo keeps the queries it is keyed by alive, so its memory is bounded by capacity times
+    max_query_length, about 2 MB by default. Longer queries are hashed every time: hashing runs at
+    hundreds of MB per second, so what the memo would save on them is small next to the memory it would
+    hold.
 
     Args:
-        query: The query
+        algorithm: sha256, which is compatible with automatic persisted queries and operation ids, or
+            blake2b, which is faster and suited to internal cache keys
+        digest_size: The digest size in bytes, blake2b only
+        capacity: The maximum number of digests memoized
+        max_query_length: The length of the longest query that is memoized, in characters or bytes
+    """
+
+    def __init__(
+        self,
+        algorithm: str = "sha256",
+        digest_size: Optional[int] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        max_query_length: int = DEFAULT_MAX_QUERY_LENGTH,
+    ) -> None:
+        self._hash: Callable[[bytes], Any]
+        if algorithm == "sha256":
+            if digest_size is not None:
+                raise ValueError("sha256 does not support a digest size")
+            self._hash = hashlib.sha256
+        elif algorithm == "blake2b":
+            size = digest_size or 32
+
+            def blake2b(data: bytes) -> Any:
+                return hashlib.blake2b(data, digest_size=size)
+
+            self._hash = blake2b
+        else:
+            raise ValueError("Unsupported hash algorithm: {}".format(algorithm))
+        self.algorithm = algorithm
+        self.capacity = capacity
+        self.max_query_length = max_query_length
+        self._digests: Dict[Query, bytes] = {}
+        self._lock = threading.Lock()
+
+    def digest(self, query: Query) -> bytes:
+        """
+        Returns:
+            The raw digest of the query
+        """
+        if len(query) > self.max_query_length:
+            return self._hash(
+                query.encode("utf-8") if isinstance(query, str) else query
+            ).digest()
+
+        digest = self._digests.get(query, None)
+        if digest is None:
+            data = query.encode("utf-8") if isinstance(query, str) else query
+            digest = self._hash(data).digest()
+            with self._lock:
+                if len(self._digests) >= self.capacity:
+                    # Evict the oldest entry, dictionaries keep their insertion order
+                    self._digests.pop(next(iter(self._digests)), None)
+                self._digests[query] = digest
+        return digest
+
+    def hexdigest(self, query: Query) -> str:
+        """
+        Returns:
+            The digest of the query as a hex string
+        """
+        return self.digest(query).hex()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._digests.clear()
+
+
+SHA256 = QueryHasher("sha256")
+BLAKE2B = QueryHasher("blake2b", digest_size=16)
+
+
+def compute(query: Query, hasher: QueryHasher = SHA256) -> str:
+    # type (Union[str, bytes], QueryHasher) -> str
+    """
+    Computes the query hash, via SHA-256 by default.
+
+    Args:
+        query: The query, as a string or as UTF-8 encoded bytes
+        hasher: The hasher to use
 
     Returns:
         The query hash
     """
-    return hashlib.sha256(query.encode()).hexdigest()
+    return hasher.hexdigest(query)
+
+
+def compute_digest(query: Query, hasher: QueryHasher = SHA256) -> bytes:
+    """
+    Computes the raw query hash, via SHA-256 by default.
+
+    Args:
+        query: The query, as a string or as UTF-8 encoded bytes
+        hasher: The hasher to use
+
+    Returns:
+        The raw query hash
+    """
+    return hasher.digest(query)
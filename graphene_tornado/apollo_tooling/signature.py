@@ -0,0 +1,259 @@
+"""
+A single pass implementation of the engine reporting signature.
+
+Produces exactly the same output as composing drop_unused_definitions, hide_literals, remove_aliases, sort_ast
+and print_with_reduced_whitespace, but prints the reduced form directly while walking the AST once: there is
+no intermediate pretty printing, no hex round trip of string values and no regular expressions. The document
+is not modified.
+
+The output reproduces the quirks of the composed transforms, e.g. hidden numeric default values of variables
+are dropped, field arguments whose pretty printed form is longer than 80 characters are separated by
+whitespace rather than commas, and field directives are not sorted.
+"""
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from graphql import BooleanValueNode
+from graphql import DocumentNode
+from graphql import EnumValueNode
+from graphql import FieldNode
+from graphql import FloatValueNode
+from graphql import FragmentDefinitionNode
+from graphql import FragmentSpreadNode
+from graphql import IntValueNode
+from graphql import ListValueNode
+from graphql import NullValueNode
+from graphql import ObjectValueNode
+from graphql import OperationDefinitionNode
+from graphql import OperationType
+from graphql import StringValueNode
+from graphql import VariableDefinitionNode
+from graphql import VariableNode
+from graphql.language.printer import MAX_LINE_LENGTH
+
+from graphene_tornado.apollo_tooling.ast_helpers import append_separated
+from graphene_tornado.apollo_tooling.ast_helpers import by_kind_and_name
+from graphene_tornado.apollo_tooling.ast_helpers import by_name
+from graphene_tornado.apollo_tooling.ast_helpers import by_variable_name
+from graphene_tornado.apollo_tooling.ast_helpers import print_type
+from graphene_tornado.apollo_tooling.ast_helpers import UnsupportedNode
+from graphene_tornado.apollo_tooling.ast_helpers import WORD_CHARACTERS
+from graphene_tornado.apollo_tooling.transforms import drop_unused_definitions
+from graphene_tornado.apollo_tooling.transforms import hide_literals
+from graphene_tornado.apollo_tooling.transforms import print_with_reduced_whitespace
+from graphene_tornado.apollo_tooling.transforms import remove_aliases
+from graphene_tornado.apollo_tooling.transforms import sort_ast
+
+
+def engine_reporting_signature(ast: DocumentNode, operation_name: Optional[str]) -> str:
+    """
+    Computes the engine reporting signature of an operation in a single traversal of the document.
+
+    Documents that contain anything other than operations and fragments, or that use descriptions, are
+    signed with the composed transforms instead.
+    """
+    try:
+        return _signature(ast, operation_name)
+    except UnsupportedNode:
+        return _transformed_signature(ast, operation_name)
+
+
+def _signature(ast: DocumentNode, operation_name: Optional[str]) -> str:
+    operation = None
+    fragments: Dict[str, List[FragmentDefinitionNode]] = {}
+    for definition in ast.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            if (definition.name.value if definition.name else "") == operation_name:
+                operation = definition
+        elif isinstance(definition, FragmentDefinitionNode):
+            fragments.setdefault(definition.name.value, []).append(definition)
+        else:
+            raise UnsupportedNode(definition)
+
+    printed: Dict[int, str] = {}
+    if operation is None:
+        # Like drop_unused_definitions, keep the whole document if the operation is not found
+        selected = list(ast.definitions)
+        for definition in selected:
+            printed[id(definition)] = _print_definition(definition, [])
+    else:
+        spreads: List[str] = []
+        printed[id(operation)] = _print_definition(operation, spreads)
+        # Only the dependencies of the last fragment with a name are followed, as in separate_operations
+        used = set()
+        while spreads:
+            name = spreads.pop()
+            if name in used:
+                continue
+            used.add(name)
+            definitions = fragments.get(name, None)
+            if definitions is None:
+                continue
+            for fragment in definitions:
+                fragment_spreads: List[str] = []
+                printed[id(fragment)] = _print_definition(fragment, fragment_spreads)
+            spreads.extend(fragment_spreads)
+        selected = [
+            definition for definition in ast.definitions if id(definition) in printed
+        ]
+
+    out: List[str] = []
+    for definition in sorted(selected, key=by_kind_and_name):
+        append_separated(out, printed[id(definition)])
+    return "".join(out)
+
+
+def _transformed_signature(ast: DocumentNode, operation_name: Optional[str]) -> str:
+    # Without a name no operation is found, and drop_unused_definitions keeps the whole document
+    if operation_name is not None:
+        ast = drop_unused_definitions(ast, operation_name)
+    return print_with_reduced_whitespace(sort_ast(remove_aliases(hide_literals(ast))))
+
+
+def _print_definition(node, spreads: List[str]) -> str:
+    if node.description is not None:
+        raise UnsupportedNode(node)
+    out: List[str] = []
+    if isinstance(node, OperationDefinitionNode):
+        variable_definitions: Sequence[
+            VariableDefinitionNode
+        ] = node.variable_definitions
+        if variable_definitions:
+            variable_definitions = sorted(variable_definitions, key=by_variable_name)
+        if (
+            node.operation != OperationType.QUERY
+            or node.name
+            or variable_definitions
+            or node.directives
+        ):
+            out.append(node.operation.value)
+            if node.name:
+                out.append(" ")
+                out.append(node.name.value)
+            _print_variable_definitions(variable_definitions, out)
+            _print_directives(node.directives, out)
+    else:
+        out.append("fragment ")
+        out.append(node.name.value)
+        _print_variable_definitions(node.variable_definitions, out)
+        append_separated(out, "on ")
+        out.append(node.type_condition.name.value)
+        _print_directives(_sorted_by_name(node.directives), out)
+    _print_selection_set(node.selection_set, out, spreads)
+    return "".join(out)
+
+
+def _print_variable_definitions(variable_definitions, out: List[str]) -> None:
+    if not variable_definitions:
+        return
+    out.append("(")
+    for i, variable_definition in enumerate(variable_definitions):
+        if i:
+            out.append(",")
+        if variable_definition.description is not None:
+            raise UnsupportedNode(variable_definition)
+        out.append("$")
+        out.append(variable_definition.variable.name.value)
+        out.append(":")
+        out.append(print_type(variable_definition.type))
+        default_value = variable_definition.default_value
+        # Hidden numbers print as a falsy 0, which the printer drops
+        if default_value is not None and not isinstance(
+            default_value, (IntValueNode, FloatValueNode)
+        ):
+            out.append("=")
+            out.append(_print_value(default_value))
+        _print_directives(variable_definition.directives, out)
+    out.append(")")
+
+
+def _print_value(node) -> str:
+    if isinstance(node, VariableNode):
+        return "$" + node.name.value
+    elif isinstance(node, (IntValueNode, FloatValueNode)):
+        return "0"
+    elif isinstance(node, StringValueNode):
+        return '""""""' if node.block else '""'
+    elif isinstance(node, BooleanValueNode):
+        return "true" if node.value else "false"
+    elif isinstance(node, NullValueNode):
+        return "null"
+    elif isinstance(node, EnumValueNode):
+        return node.value
+    elif isinstance(node, ListValueNode):
+        return "[]"
+    elif isinstance(node, ObjectValueNode):
+        return "{}"
+    raise UnsupportedNode(node)
+
+
+def _sorted_by_name(nodes):
+    if nodes:
+        return sorted(nodes, key=by_name)
+    return nodes
+
+
+def _print_arguments(arguments) -> List[str]:
+    return [
+        argument.name.value + ":" + _print_value(argument.value)
+        for argument in sorted(arguments, key=by_name)
+    ]
+
+
+def _print_directives(directives, out: List[str]) -> None:
+    if not directives:
+        return
+    for directive in directives:
+        out.append("@")
+        out.append(directive.name.value)
+        if directive.arguments:
+            out.append("(")
+            out.append(",".join(_print_arguments(directive.arguments)))
+            out.append(")")
+
+
+def _print_selection_set(node, out: List[str], spreads: List[str]) -> None:
+    if node is None or not node.selections:
+        return
+    out.append("{")
+    for selection in sorted(node.selections, key=by_kind_and_name):
+        if isinstance(selection, FieldNode):
+            if out[-1][-1] in WORD_CHARACTERS:
+                out.append(" ")
+            _print_field(selection, out, spreads)
+        elif isinstance(selection, FragmentSpreadNode):
+            out.append("...")
+            out.append(selection.name.value)
+            spreads.append(selection.name.value)
+            _print_directives(_sorted_by_name(selection.directives), out)
+        else:
+            out.append("...")
+            if selection.type_condition is not None:
+                out.append("on ")
+                out.append(selection.type_condition.name.value)
+            _print_directives(_sorted_by_name(selection.directives), out)
+            _print_selection_set(selection.selection_set, out, spreads)
+    out.append("}")
+
+
+def _print_field(node: FieldNode, out: List[str], spreads: List[str]) -> None:
+    name = node.name.value
+    out.append(name)
+    if node.arguments:
+        arguments = _print_arguments(node.arguments)
+        # The length of name(a: 0, b: 0) as the pretty printer would lay it out
+        line_length = len(name) + sum(len(argument) + 3 for argument in arguments)
+        out.append("(")
+        if line_length > MAX_LINE_LENGTH:
+            for i, argument in enumerate(arguments):
+                if i:
+                    append_separated(out, argument)
+                else:
+                    out.append(argument)
+        else:
+            out.append(",".join(arguments))
+        out.append(")")
+    _print_directives(node.directives, out)
+    _print_selection_set(node.selection_set, out, spreads)
@@ -0,0 +1,184 @@
+import json
+
+import pytest
+import tornado
+
+from graphene_tornado.apollo_tooling.manifest import build_manifest
+from graphene_tornado.apollo_tooling.manifest import find_documents
+from graphene_tornado.apollo_tooling.manifest import main
+from graphene_tornado.apollo_tooling.query_hash import compute
+from graphene_tornado.operation_registry import OperationRegistry
+from graphene_tornado.schema import schema
+from graphene_tornado.tests.http_helper import HttpHelper
+from graphene_tornado.tests.test_graphql import GRAPHQL_HEADER
+from graphene_tornado.tests.test_graphql import response_json
+from graphene_tornado.tests.test_graphql import url_string
+from graphene_tornado.tornado_graphql_handler import TornadoGraphQLHandler
+
+USER = """
+query User {
+  user(id: 5) {
+    name
+  }
+}
+"""
+
+TWO_OPERATIONS = """
+query A { a }
+query B { b }
+"""
+
+
+def _write_corpus(tmpdir):
+    queries = tmpdir.mkdir("queries")
+    queries.join("user.graphql").write(USER)
+    queries.mkdir("nested").join("two.graphql").write(TWO_OPERATIONS)
+    queries.join("ignored.txt").write("{ ignored }")
+    log = tmpdir.join("captured.jsonl")
+    log.write(
+        "\n".join(
+            [
+                json.dumps({"query": "query User { user(id: 7) { name } }"}),
+                json.dumps({"query": TWO_OPERATIONS, "operationName": "B"}),
+                json.dumps({"query": "{ c }"}),
+                "",
+            ]
+        )
+    )
+    return [str(queries), str(log)]
+
+
+def test_build_manifest(tmpdir):
+    manifest, errors = build_manifest(find_documents(_write_corpus(tmpdir)), jobs=1)
+
+    assert errors == []
+    assert manifest["version"] == 1
+    entries = {entry["signature"]: entry for entry in manifest["operations"]}
+    assert sorted(entries) == [
+        "query A{a}",
+        "query B{b}",
+        "query User{user(id:0){name}}",
+        "{c}",
+    ]
+    user = entries["query User{user(id:0){name}}"]
+    assert user["id"] == compute(user["signature"])
+    assert user["name"] == "User"
+    assert user["body"] == USER
+    assert entries["query A{a}"]["body"] == "query A { a }"
+    assert entries["query B{b}"]["body"] == "query B { b }"
+
+
+def test_operations_keep_the_fragments_they_use(tmpdir):
+    tmpdir.join("fragments.graphql").write(
+        """
+        query A { ...Name }
+        fragment Name on User { name }
+        query B { ...Id }
+        fragment Id on User { id }
+        """
+    )
+    manifest, errors = build_manifest(find_documents([str(tmpdir)]), jobs=1)
+
+    assert errors == []
+    assert {entry["name"]: entry["body"] for entry in manifest["operations"]} == {
+        "A": "query A { ...Name }\n\nfragment Name on User { name }",
+        "B": "query B { ...Id }\n\nfragment Id on User { id }",
+    }
+
+
+def test_unreadable_log_lines_are_reported(tmpdir):
+    log = tmpdir.join("captured.jsonl")
+    log.write(
+        "\n".join(
+            [
+                "{not json",
+                json.dumps({"operationName": "A"}),
+                json.dumps({"query": None}),
+                json.dumps(["{ a }"]),
+                json.dumps({"query": "{ good }"}),
+            ]
+        )
+    )
+    errors = []
+    manifest, extraction_errors = build_manifest(
+        find_documents([str(log)], errors), jobs=1
+    )
+
+    assert extraction_errors == []
+    assert [error.split(": ")[0] for error in errors] == [
+        "{}:{}".format(log, line) for line in range(1, 5)
+    ]
+    assert [e["signature"] for e in manifest["operations"]] == ["{good}"]
+
+
+def test_build_manifest_in_process_pool(tmpdir):
+    paths = _write_corpus(tmpdir)
+    serial, _ = build_manifest(find_documents(paths), jobs=1)
+    parallel, _ = build_manifest(find_documents(paths), jobs=2, chunk_size=1)
+
+    assert [e["id"] for e in serial["operations"]] == [
+        e["id"] for e in parallel["operations"]
+    ]
+
+
+def test_main_reports_invalid_documents(tmpdir, capsys):
+    tmpdir.join("bad.graphql").write("query {")
+    tmpdir.join("good.graphql").write("{ good }")
+    output = tmpdir.join("manifest.json")
+
+    assert main([str(tmpdir), "--output", str(output), "--jobs", "1"]) == 0
+    assert [e["signature"] for e in json.loads(output.read())["operations"]] == [
+        "{good}"
+    ]
+    assert "bad.graphql" in capsys.readouterr().err
+
+    assert main([str(tmpdir), "--output", str(output), "--jobs", "1", "--strict"]) == 1
+
+    tmpdir.join("bad.graphql").remove()
+    tmpdir.join("captured.jsonl").write("{not json\n")
+    assert main([str(tmpdir), str(tmpdir.join("captured.jsonl")), "--jobs", "1"]) == 0
+    assert "captured.jsonl:1" in capsys.readouterr().err
+
+
+ANONYMOUS = '{ test(who: "Anonymous") }'
+
+
+@pytest.fixture
+def registry(tmpdir):
+    tmpdir.join("anonymous.graphql").write(ANONYMOUS)
+    output = tmpdir.join("manifest.json")
+    assert main([str(tmpdir), "--output", str(output), "--jobs", "1"]) == 0
+    return OperationRegistry.from_manifest(schema, str(output))
+
+
+@pytest.fixture
+def app(registry):
+    return tornado.web.Application(
+        [
+            (
+                r"/graphql",
+                TornadoGraphQLHandler,
+                dict(schema=schema, operation_registry=registry),
+            )
+        ]
+    )
+
+
+@pytest.mark.gen_test
+def test_extracted_anonymous_operations_execute_by_id(
+    http_client, base_url, registry, tmpdir
+):
+    (entry,) = json.loads(tmpdir.join("manifest.json").read())["operations"]
+    assert entry["name"] is None
+    assert registry.get(entry["id"]) is not None
+
+    http_helper = HttpHelper(http_client, base_url)
+    response = yield http_helper.get(
+        url_string(operationId=entry["id"]), headers=GRAPHQL_HEADER
+    )
+    assert response.code == 200
+    assert response_json(response) == {"data": {"test": "Hello Anonymous"}}
+
+    response = yield http_helper.post_json(url_string(), dict(operationId=entry["id"]))
+    assert response.code == 200
+    assert response_json(response) == {"data": {"test": "Hello Anonymous"}}
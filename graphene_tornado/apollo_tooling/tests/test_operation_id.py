@@ -163,3 +163,25 @@ def test_basic_signature_with_inline_types():
         "query OpName{user{name(apple:[],bag:{},cat:ENUM_VALUE)}}"
         == default_engine_reporting_signature(doc, operation)
     )
+
+
+def test_basic_signature_with_inline_fragment_directives():
+    operation = ""
+    doc = parse(
+        """
+        {
+          user {
+            ... @skip(if: $a) {
+              name
+            }
+            ... on User @include(if: $b) @defer {
+              age
+            }
+          }
+        }
+    """
+    )
+    assert (
+        "{user{...on User@defer@include(if:$b){age}...@skip(if:$a){name}}}"
+        == default_engine_reporting_signature(doc, operation)
+    )
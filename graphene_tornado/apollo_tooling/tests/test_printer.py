@@ -0,0 +1,57 @@
+import random
+
+import pytest
+from graphql import parse
+
+from graphene_tornado.apollo_tooling.printer import print_compact
+from graphene_tornado.apollo_tooling.printer import print_compact_via_print_ast
+from graphene_tornado.apollo_tooling.tests.test_signature import _random_document
+from graphene_tornado.apollo_tooling.tests.test_signature import CORPUS
+from graphene_tornado.apollo_tooling.transforms import hide_literals
+from graphene_tornado.apollo_tooling.transforms import (
+    hide_string_and_numeric_literals,
+)
+
+LONG = "x" * 40
+
+DOCUMENTS = [query for query, _ in CORPUS] + [
+    'query Foo($a: Int) { user(name: "   tab->\tyay") { name } }',
+    '{ a: f(s: "with \\"quotes\\" and \\\\ slashes") b: f(s: "\\u00e9\\u4e2d") }',
+    '{{ f(s: """{}""") }}'.format(LONG),
+    '{{ f(s: """{}""", t: 1) }}'.format("y" * 30),
+    '{ f(s: """  leading\n  lines\n""") }',
+    '{{ f(a: "{}", b: "{}") }}'.format(LONG, LONG),
+    '{{ f(list: ["{}", 1, 2.5, ENUM, null, [true]]) }}'.format(LONG),
+    '{ f(object: {nested: {value: "x", list: [1, 2]}, other: $v}) }',
+    'query Q($a: String = """{}""", $b: Int = 1) {{ f(a: $a) }}'.format(LONG),
+    'query Q($a: String @d(x: """{}"""), $b: Int) {{ f(a: $a) }}'.format(LONG),
+    'query Q($a: String = "short", $b: [Int] = [1, 2]) { f(a: $a) }',
+    '"description" query Q { f }',
+    '"description" query { f }',
+    'query Q("description" $a: Int, $b: Int) { f }',
+    'fragment F on T @d(x: "y") { a ... on U { b } } { ...F @e }',
+    "{ alias: field(aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa: 1, bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb: 2) }",
+    "{ field(aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa: 1, bbbbbbbbbbbbbbbbbbbbbbbbbbbbbb: 2) }",
+    "type Query { a: Int } { a }",
+    "extend type Query { b: Int } { a }",
+]
+
+
+@pytest.mark.parametrize("query", DOCUMENTS)
+def test_print_compact_matches_print_ast(query):
+    document = parse(query)
+    assert print_compact(document) == print_compact_via_print_ast(document)
+
+
+@pytest.mark.parametrize("query", DOCUMENTS)
+def test_print_compact_matches_print_ast_with_hidden_literals(query):
+    for hide in (hide_literals, hide_string_and_numeric_literals):
+        document = hide(parse(query))
+        assert print_compact(document) == print_compact_via_print_ast(document)
+
+
+def test_print_compact_matches_print_ast_on_random_documents():
+    rng = random.Random(2003)
+    for _ in range(100):
+        document = parse(_random_document(rng))
+        assert print_compact(document) == print_compact_via_print_ast(document)
@@ -0,0 +1,54 @@
+import hashlib
+
+import pytest
+
+from graphene_tornado.apollo_tooling.query_hash import BLAKE2B
+from graphene_tornado.apollo_tooling.query_hash import compute
+from graphene_tornado.apollo_tooling.query_hash import compute_digest
+from graphene_tornado.apollo_tooling.query_hash import QueryHasher
+
+QUERY = "{ user { name } }"
+
+
+def test_compute_is_sha256_by_default():
+    assert compute(QUERY) == hashlib.sha256(QUERY.encode()).hexdigest()
+    assert compute_digest(QUERY) == hashlib.sha256(QUERY.encode()).digest()
+
+
+def test_strings_and_bytes_hash_the_same():
+    query = '{ user(name: "héllo") { name } }'
+    assert compute(query) == compute(query.encode("utf-8"))
+    assert compute(query, BLAKE2B) == compute(query.encode("utf-8"), BLAKE2B)
+
+
+def test_blake2b_digest_size():
+    hasher = QueryHasher("blake2b", digest_size=16)
+    assert (
+        hasher.digest(QUERY) == hashlib.blake2b(QUERY.encode(), digest_size=16).digest()
+    )
+    assert len(hasher.hexdigest(QUERY)) == 32
+
+
+def test_digests_are_memoized_and_bounded():
+    hasher = QueryHasher(capacity=2)
+    first = hasher.digest(QUERY)
+    assert hasher.digest(QUERY) is first
+
+    hasher.digest("{ a }")
+    hasher.digest("{ b }")
+    assert QUERY not in hasher._digests
+    assert len(hasher._digests) == 2
+    assert hasher.digest(QUERY) == first
+
+
+def test_long_queries_are_not_memoized():
+    hasher = QueryHasher(max_query_length=len(QUERY) - 1)
+    assert hasher.digest(QUERY) == hashlib.sha256(QUERY.encode()).digest()
+    assert hasher._digests == {}
+
+
+def test_unsupported_algorithm():
+    with pytest.raises(ValueError):
+        QueryHasher("md5")
+    with pytest.raises(ValueError):
+        QueryHasher("sha256", digest_size=16)
@@ -0,0 +1,229 @@
+import random
+
+import pytest
+from graphql import parse
+from graphql import print_ast
+
+from graphene_tornado.apollo_tooling.signature import engine_reporting_signature
+from graphene_tornado.apollo_tooling.transforms import drop_unused_definitions
+from graphene_tornado.apollo_tooling.transforms import hide_literals
+from graphene_tornado.apollo_tooling.transforms import print_with_reduced_whitespace
+from graphene_tornado.apollo_tooling.transforms import remove_aliases
+from graphene_tornado.apollo_tooling.transforms import sort_ast
+
+CORPUS = [
+    ("{ user { name } }", ""),
+    ("query { user { name } }", ""),
+    ("query OpName { user { name } }", "OpName"),
+    ("mutation { like(id: 1) { count } }", ""),
+    ("subscription OnLike { liked { id } }", "OnLike"),
+    ("query @live { user { name } }", ""),
+    ("query ($id: ID!) { user(id: $id) { name } }", ""),
+    (
+        "{ user { name ...Bar } } fragment Bar on User { asd } fragment Baz on User { jkl }",
+        "",
+    ),
+    (
+        "fragment Bar on User { asd } { user { name ...Bar } } fragment Baz on User { jkl }",
+        "",
+    ),
+    (
+        """
+        query Foo($b: Int, $a: Boolean) {
+          user(name: "hello", age: 5) {
+            ...Bar
+            ... on User { hello bee }
+            tz
+            aliased: name
+          }
+        }
+        fragment Baz on User { asd }
+        fragment Bar on User { age @skip(if: $a) ...Nested }
+        fragment Nested on User { blah }
+        """,
+        "Foo",
+    ),
+    (
+        "query OpName($c: Int!, $a: [[Boolean!]!], $b: EnumType) "
+        "{ user { name(apple: $a, cat: $c, bag: $b) } }",
+        "OpName",
+    ),
+    (
+        'query OpName { user { name(apple: [[10]], cat: ENUM_VALUE, bag: { input: "value" }) } }',
+        "OpName",
+    ),
+    (
+        'query Q($b: Int = 5, $a: String = "x", $c: [Int] = [1], $d: Float = 1.5, $e: E = A, '
+        "$f: In = {a: 1}, $g: Boolean = false, $h: Int = null) { f(a: $a) }",
+        "Q",
+    ),
+    ('query Q($a: String = """block""" @dir(x: 1)) { f(a: $a) }', "Q"),
+    (
+        '{ f(aaaaaaaaaaaaaaaaaaaa: 1, bbbbbbbbbbbbbbbbbbbbbbbbb: "x", '
+        "ccccccccccccccccccccccccc: $v, d: X) }",
+        "",
+    ),
+    (
+        "{ f(aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa: true, bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb: null) }",
+        "",
+    ),
+    (
+        "{ f(aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa: 1, bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb: 2) }",
+        "",
+    ),
+    (
+        "{ f(aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa: 1, bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb: 2) }",
+        "",
+    ),
+    ("{ f @b @a(y: 1, x: 2) { g } }", ""),
+    ("{ ... on T @include(if: true) @defer { a } ... @skip(if: $s) { b } }", ""),
+    ("{ ...F @b @a } fragment F on T @z @y { a }", ""),
+    ('query { f(s: """ block """, t: "\\u00e9 \\n tab\\t") }', ""),
+    ("query A { a } query B { b }", "A"),
+    ("query A { a } query B { b }", "C"),
+    ("query A { a } query A { b }", "A"),
+    (
+        "query Q @d { ...F } fragment F on T @z @y { a ...G } fragment G on T { b } fragment H on T { c }",
+        "Q",
+    ),
+    ("query Q { ...F ...G } fragment F on T { ...G } fragment G on T { ...F a }", "Q"),
+    ("query Q { ...Missing ...F } fragment F on T { a }", "Q"),
+    (
+        "query Q { ...F } fragment F on T { a } fragment F on T { b ...G } fragment G on T { c }",
+        "Q",
+    ),
+    (
+        "{ b a c: a d: b ...X ... on Y { y } ...W z } fragment X on T { x } fragment W on T { w }",
+        "",
+    ),
+    ("{ a { b { c { d(e: [1, 2], f: {g: {h: 1}}) } } } }", ""),
+    ("{ a(x: 1) @d b }", ""),
+    ("{ a @d(x: 1) b }", ""),
+    ("{ a @d c }", ""),
+    ("{ a(x: ENUM) b(x: $v) c(x: true) d(x: null) e }", ""),
+]
+
+
+def _transformed_signature(query, operation_name):
+    return print_with_reduced_whitespace(
+        sort_ast(
+            remove_aliases(
+                hide_literals(drop_unused_definitions(parse(query), operation_name))
+            )
+        )
+    )
+
+
+@pytest.mark.parametrize("query, operation_name", CORPUS)
+def test_signature_matches_transforms(query, operation_name):
+    assert engine_reporting_signature(
+        parse(query), operation_name
+    ) == _transformed_signature(query, operation_name)
+
+
+def test_signature_does_not_modify_document():
+    query = CORPUS[9][0]
+    document = parse(query)
+    printed = print_ast(document)
+
+    engine_reporting_signature(document, "Foo")
+
+    assert print_ast(document) == printed
+
+
+def test_signature_of_type_system_definitions_uses_transforms():
+    query = "type Query { a: Int } query Q { a }"
+    assert engine_reporting_signature(parse(query), "Q") == _transformed_signature(
+        query, "Q"
+    )
+
+
+def _random_value(rng, depth):
+    choice = rng.randrange(9 if depth < 2 else 7)
+    if choice == 0:
+        return str(rng.randrange(1000))
+    elif choice == 1:
+        return "1.5e3"
+    elif choice == 2:
+        return '"value {}"'.format(rng.randrange(10))
+    elif choice == 3:
+        return rng.choice(["true", "false", "null"])
+    elif choice == 4:
+        return rng.choice(["RED", "GREEN"])
+    elif choice in (5, 6):
+        return "$" + rng.choice(["a", "b", "c"])
+    elif choice == 7:
+        return "[{}]".format(", ".join(_random_value(rng, depth + 1) for _ in range(2)))
+    return "{{k: {}}}".format(_random_value(rng, depth + 1))
+
+
+def _random_arguments(rng):
+    names = rng.sample(["id", "first", "after", "filterByNameOrDescription", "z"], 3)
+    arguments = [
+        "{}: {}".format(name, _random_value(rng, 0))
+        for name in names[: rng.randrange(4)]
+    ]
+    return "({})".format(", ".join(arguments)) if arguments else ""
+
+
+def _random_directives(rng):
+    return "".join(
+        rng.choice(
+            [" @skip(if: $a)", " @include(if: true)", " @live", " @b(y: 1, x: 2)"]
+        )
+        for _ in range(rng.randrange(3))
+    )
+
+
+def _random_selection_set(rng, depth, fragments):
+    selections = []
+    for _ in range(rng.randrange(1, 5)):
+        kind = rng.randrange(6 if depth < 3 else 3)
+        name = rng.choice(["a", "b", "node", "edges", "id", "name"])
+        if kind in (0, 1, 2):
+            alias = rng.choice(["", "alias: ", "other: "])
+            selections.append(
+                alias + name + _random_arguments(rng) + _random_directives(rng)
+            )
+        elif kind == 3:
+            selections.append(
+                name
+                + _random_arguments(rng)
+                + _random_directives(rng)
+                + _random_selection_set(rng, depth + 1, fragments)
+            )
+        elif kind == 4:
+            selections.append("..." + rng.choice(fragments) + _random_directives(rng))
+        else:
+            selections.append(
+                "..."
+                + rng.choice([" on User", " on Node", ""])
+                + _random_directives(rng)
+                + _random_selection_set(rng, depth + 1, fragments)
+            )
+    return " { " + "\n".join(selections) + " }"
+
+
+def _random_document(rng):
+    fragments = ["F", "G", "H"]
+    definitions = [
+        "fragment {} on User{}".format(name, _random_selection_set(rng, 2, fragments))
+        for name in fragments
+    ]
+    variables = '($c: Int = 5, $a: Boolean!, $b: [String] = ["x"])'
+    definitions.insert(
+        rng.randrange(len(definitions) + 1),
+        "query Random{}{}".format(
+            rng.choice(["", variables]), _random_selection_set(rng, 0, fragments)
+        ),
+    )
+    return "\n".join(definitions)
+
+
+def test_signature_matches_transforms_on_random_documents():
+    rng = random.Random(2002)
+    for _ in range(100):
+        query = _random_document(rng)
+        assert engine_reporting_signature(
+            parse(query), "Random"
+        ) == _transformed_signature(query, "Random"), query
@@ -1,7 +1,10 @@
 from graphql import parse
+from graphql import print_ast
 
 from graphene_tornado.apollo_tooling.transforms import hide_literals
 from graphene_tornado.apollo_tooling.transforms import print_with_reduced_whitespace
+from graphene_tornado.apollo_tooling.transforms import remove_aliases
+from graphene_tornado.apollo_tooling.transforms import sort_ast
 
 
 def test_print_with_reduced_whitespace():
@@ -49,3 +52,36 @@ def test_hide_literals():
         "Bar on User{age@skip(if:$a)...Nested}fragment Nested on User{blah}"
         == transformed
     )
+
+
+def test_transforms_do_not_modify_the_document():
+    doc = parse(
+        """
+        query Foo($b: Int = 5, $a: Boolean) {
+          user(name: "hello", age: 5, tags: ["a"]) {
+            b: name
+            a
+          }
+          other {
+            id
+          }
+        }
+    """
+    )
+    printed = print_ast(doc)
+
+    transformed = sort_ast(remove_aliases(hide_literals(doc)))
+    print_with_reduced_whitespace(transformed)
+
+    assert print_ast(doc) == printed
+    assert print_ast(transformed) != printed
+    # Nodes that did not change are shared with the original document
+    original_other = doc.definitions[0].selection_set.selections[1]
+    transformed_other = transformed.definitions[0].selection_set.selections[0]
+    assert transformed_other.name.value == "other"
+    assert transformed_other is original_other
+
+
+def test_unchanged_document_is_returned_as_is():
+    doc = parse("{ a b { c } }")
+    assert sort_ast(remove_aliases(hide_literals(doc))) is doc
@@ -1,9 +1,10 @@
 """
 Ported from https://github.com/apollographql/apollo-tooling/blob/master/packages/apollo-graphql/src/transforms.ts
+
+The transforms do not modify the document they are given. They return a new document that shares every node
+which did not change, so a parsed document can be used for execution and reporting at the same time.
 """
-import re
 
-import six
 from graphql import DirectiveNode
 from graphql import DocumentNode
 from graphql import FieldNode
@@ -15,13 +16,18 @@ from graphql import IntValueNode
 from graphql import ListValueNode
 from graphql import ObjectValueNode
 from graphql import OperationDefinitionNode
-from graphql import print_ast
 from graphql import SelectionSetNode
 from graphql import separate_operations
 from graphql import StringValueNode
 from graphql.language.visitor import visit
 from graphql.language.visitor import Visitor
 
+from graphene_tornado.apollo_tooling.ast_helpers import by_kind_and_name
+from graphene_tornado.apollo_tooling.ast_helpers import by_name
+from graphene_tornado.apollo_tooling.ast_helpers import by_variable_name
+from graphene_tornado.apollo_tooling.ast_helpers import replace
+from graphene_tornado.apollo_tooling.printer import print_compact
+
 
 def hide_literals(ast: DocumentNode) -> DocumentNode:
     """
@@ -32,8 +38,7 @@ def hide_literals(ast: DocumentNode) -> DocumentNode:
     your query (say, a hardcoded API key) from Engine servers, but in general
     avoiding those situations is better than working around them.
     """
-    visit(ast, _HIDE_LITERALS_VISITOR)
-    return ast
+    return visit(ast, _HIDE_LITERALS_VISITOR)
 
 
 def hide_string_and_numeric_literals(ast: DocumentNode) -> DocumentNode:
@@ -41,8 +46,7 @@ def hide_string_and_numeric_literals(ast: DocumentNode) -> DocumentNode:
     In the same spirit as the similarly named `hideLiterals` function, only
     hide string and numeric literals.
     """
-    visit(ast, _HIDE_ONLY_STRING_AND_NUMERIC_LITERALS_VISITOR)
-    return ast
+    return visit(ast, _HIDE_ONLY_STRING_AND_NUMERIC_LITERALS_VISITOR)
 
 
 def drop_unused_definitions(ast: DocumentNode, operation_name: str) -> DocumentNode:
@@ -67,8 +71,7 @@ def sort_ast(ast: DocumentNode) -> DocumentNode:
     QraphQL client generates query strings with elements in nondeterministic
     order, it can make sure the queries are treated as identical.
     """
-    visit(ast, _SORTING_VISITOR)
-    return ast
+    return visit(ast, _SORTING_VISITOR)
 
 
 def remove_aliases(ast: DocumentNode) -> DocumentNode:
@@ -78,8 +81,7 @@ def remove_aliases(ast: DocumentNode) -> DocumentNode:
     name. Maybe this is useful if somebody somewhere inserts random aliases into
     their queries.
     """
-    visit(ast, _REMOVE_ALIAS_VISITOR)
-    return ast
+    return visit(ast, _REMOVE_ALIAS_VISITOR)
 
 
 def print_with_reduced_whitespace(ast: DocumentNode) -> str:
@@ -89,32 +91,17 @@ def print_with_reduced_whitespace(ast: DocumentNode) -> str:
     reduced to at most one space, and even that space is removed anywhere except
     for between two alphanumerics.
     """
-    visit(ast, _HEX_CONVERSION_VISITOR)
-    val = re.sub(r"\s+", " ", print_ast(ast))
-
-    val = re.sub(r"([^_a-zA-Z0-9]) ", _replace_with_first_group, val)
-    val = re.sub(r" ([^_a-zA-Z0-9])", _replace_with_first_group, val)
-    val = re.sub(r'"([a-f0-9]+)"', _from_hex, val)
-
-    return val
-
-
-def _replace_with_first_group(match):
-    return match.group(1)
-
-
-def _from_hex(match):
-    m = match.group(1)
-    if six.PY3:
-        m = bytes.fromhex(m).decode("utf-8")
-    else:
-        m = m.decode("hex").encode("utf-8")
-    return '"' + m + '"'
+    return print_compact(ast)
 
 
 def _sorted(items, key):
-    if items is not None:
-        return sorted(items, key=key)
+    """
+    Returns the items sorted by key, or None if they are already in order.
+    """
+    if items:
+        sorted_items = tuple(sorted(items, key=key))
+        if any(a is not b for a, b in zip(sorted_items, items)):
+            return sorted_items
     return None
 
 
@@ -124,17 +111,22 @@ class _HideLiteralsVisitor(Visitor):
         self._only_string_and_numeric = only_string_and_numeric
 
     def enter(self, node, key, parent, path, ancestors):
-        if isinstance(node, IntValueNode):
-            node.value = 0
-        elif isinstance(node, FloatValueNode):
-            node.value = 0
+        if isinstance(node, (IntValueNode, FloatValueNode)):
+            # Hidden numbers are the int 0 rather than "0", which the printer drops from default values
+            if node.value != 0:
+                return replace(node, value=0)
         elif isinstance(node, StringValueNode):
-            node.value = ""
-        elif not self._only_string_and_numeric and isinstance(node, ListValueNode):
-            node.values = []
-        elif not self._only_string_and_numeric and isinstance(node, ObjectValueNode):
-            node.fields = []
-        return node
+            if node.value:
+                return replace(node, value="")
+        elif self._only_string_and_numeric:
+            return None
+        elif isinstance(node, ListValueNode):
+            if node.values:
+                return replace(node, values=())
+        elif isinstance(node, ObjectValueNode):
+            if node.fields:
+                return replace(node, fields=())
+        return None
 
 
 _HIDE_LITERALS_VISITOR = _HideLiteralsVisitor()
@@ -145,69 +137,38 @@ _HIDE_ONLY_STRING_AND_NUMERIC_LITERALS_VISITOR = _HideLiteralsVisitor(
 
 class _RemoveAliasesVisitor(Visitor):
     def enter(self, node, key, parent, path, ancestors):
-        if isinstance(node, FieldNode):
-            node.alias = None
-        return node
+        if isinstance(node, FieldNode) and node.alias is not None:
+            return replace(node, alias=None)
+        return None
 
 
 _REMOVE_ALIAS_VISITOR = _RemoveAliasesVisitor()
 
 
-class _HexConversionVisitor(Visitor):
-    def enter(self, node, key, parent, path, ancestors):
-        if isinstance(node, StringValueNode) and node.value is not None:
-            if six.PY3:
-                encoded = node.value.encode("utf-8").hex()
-            else:
-                encoded = node.value.encode("hex")
-            node.value = encoded
-        return node
-
-
-_HEX_CONVERSION_VISITOR = _HexConversionVisitor()
-
-
 class _SortingVisitor(Visitor):
     def enter(self, node, key, parent, path, ancestors):
         if isinstance(node, DocumentNode):
-            node.definitions = _sorted(
-                node.definitions, lambda x: (x.__class__.__name__, self._by_name(x))
-            )
+            definitions = _sorted(node.definitions, by_kind_and_name)
+            if definitions is not None:
+                return replace(node, definitions=definitions)
         elif isinstance(node, OperationDefinitionNode):
-            node.variable_definitions = _sorted(
-                node.variable_definitions, self._by_variable_name
-            )
+            variable_definitions = _sorted(node.variable_definitions, by_variable_name)
+            if variable_definitions is not None:
+                return replace(node, variable_definitions=variable_definitions)
         elif isinstance(node, SelectionSetNode):
-            node.selections = _sorted(
-                node.selections, lambda x: (x.__class__.__name__, self._by_name(x))
-            )
-        elif isinstance(node, FieldNode):
-            node.arguments = _sorted(node.arguments, self._by_name)
-        elif isinstance(node, FragmentSpreadNode):
-            node.directives = _sorted(node.directives, self._by_name)
-        elif isinstance(node, InlineFragmentNode):
-            node.directives = _sorted(node.directives, self._by_type_definition)
-        elif isinstance(node, FragmentDefinitionNode):
-            node.directives = _sorted(node.directives, self._by_name)
-        elif isinstance(node, DirectiveNode):
-            node.arguments = _sorted(node.arguments, self._by_name)
-        return node
-
-    def _by_name(self, node):
-        if isinstance(node, InlineFragmentNode):
-            return self._by_type_definition(node)
-        elif node.name is not None:
-            return node.name.value
-        return None
-
-    def _by_type_definition(self, node):
-        if node.type_condition is not None and node.type_condition.name:
-            return node.type_condition.name.value
-        return None
-
-    def _by_variable_name(self, node):
-        if node.variable is not None and node.variable.name is not None:
-            return node.variable.name.value
+            selections = _sorted(node.selections, by_kind_and_name)
+            if selections is not None:
+                return replace(node, selections=selections)
+        elif isinstance(node, (FieldNode, DirectiveNode)):
+            arguments = _sorted(node.arguments, by_name)
+            if arguments is not None:
+                return replace(node, arguments=arguments)
+        elif isinstance(
+            node, (FragmentSpreadNode, InlineFragmentNode, FragmentDefinitionNode)
+        ):
+            directives = _sorted(node.directives, by_name)
+            if directives is not None:
+                return replace(node, directives=directives)
         return None
 
 
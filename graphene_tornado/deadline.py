@@ -0,0 +1,50 @@
+"""
+Cooperative enforcement of per-request deadlines.
+
+The deadline of a request is stored on its RequestContext. deadline_middleware bounds every awaitable
+resolver by the time remaining and refuses to start resolvers once the deadline has passed, so a request
+that runs out of time returns the fields that did resolve along with a timeout error for each field that
+did not. Resolvers can read get_request_context().time_remaining() to pass the budget on to backend calls.
+"""
+import asyncio
+from typing import Any
+from typing import Awaitable
+
+from graphql import GraphQLError
+from graphql.pyutils import is_awaitable
+
+from graphene_tornado.request_context import get_request_context
+from graphene_tornado.request_context import RequestContext
+
+# How long execution may continue past the deadline before it is cancelled outright. Resolvers are
+# normally stopped by the middleware at the deadline itself; this only catches work it cannot see.
+DEADLINE_GRACE_PERIOD = 0.1
+
+
+class DeadlineExceededError(GraphQLError):
+    def __init__(self, message: str = "Request deadline exceeded.") -> None:
+        super(DeadlineExceededError, self).__init__(message)
+
+
+def deadline_middleware(next, root, info, **args):
+    """
+    Graphene middleware that enforces the deadline of the current request, if it has one.
+    """
+    request_context = get_request_context()
+    if request_context is None or request_context.deadline is None:
+        return next(root, info, **args)
+
+    if request_context.time_remaining() <= 0:
+        raise DeadlineExceededError()
+
+    result = next(root, info, **args)
+    if is_awaitable(result):
+        return _await_with_deadline(result, request_context)
+    return result
+
+
+async def _await_with_deadline(result: Awaitable, request_context: RequestContext) -> Any:
+    try:
+        return await asyncio.wait_for(result, request_context.time_remaining())
+    except asyncio.TimeoutError:
+        raise DeadlineExceededError()
@@ -1,23 +1,42 @@
+import asyncio
 import gzip
 import logging
 import os
+import random
+import signal
 import socket
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
 from typing import Callable
+from typing import Dict
+from typing import List
 from typing import NamedTuple
 from typing import Optional
+from typing import Set
+from typing import Tuple
 
 from google.protobuf.json_format import MessageToJson
-from google.protobuf.message import Message
-from six import BytesIO
+from tornado import gen
 from tornado.httpclient import AsyncHTTPClient
-from tornado_retry_client import RetryClient
-
-from .reports_pb2 import FullTracesReport
+from tornado.httpclient import HTTPClientError
+from tornado.httpclient import HTTPRequest
+from tornado.httpclient import HTTPResponse
+from tornado.ioloop import IOLoop
+from tornado.ioloop import PeriodicCallback
+from tornado.locks import Semaphore
+
+from .operation_registry_stats import client_name_stats
+from .report_builder import FullTracesReportBuilder
 from .reports_pb2 import ReportHeader
+from .spool import DEFAULT_SPOOL_MAX_BYTES
+from .spool import ReportSpool
+from .stats_aggregator import StatsAggregator
 from graphene_tornado.apollo_tooling.operation_id import (
     default_engine_reporting_signature,
 )
+from graphene_tornado.ext.extension_helpers import SIGNATURE_CACHE
+from graphene_tornado.operation_registry import OperationRegistry
 
 LOGGER = logging.getLogger(__name__)
 
@@ -28,6 +47,57 @@ SERVICE_HEADER_DEFAULTS = {
     "uname": " ".join(os.uname()),
 }
 
+DEFAULT_REPORT_INTERVAL_MS = 10 * 1000
+DEFAULT_MAX_UNCOMPRESSED_REPORT_SIZE = 4 * 1024 * 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_MINIMUM_RETRY_DELAY_MS = 100
+DEFAULT_MAX_CONCURRENT_UPLOADS = 4
+DEFAULT_REQUEST_TIMEOUT_MS = 20 * 1000
+DEFAULT_TRACE_SAMPLE_RATE = 0.01
+DEFAULT_SPOOL_REPLAY_INTERVAL_MS = 1000
+
+# What happens to traces once the buffer is full
+OVERFLOW_DROP = "drop"
+# Traces are sampled at a falling rate from half the limits, and dropped at the limits
+OVERFLOW_SAMPLE = "sample"
+# Traces are aggregated into a StatsReport instead of being buffered
+OVERFLOW_STATS = "stats"
+OVERFLOW_POLICIES = (OVERFLOW_DROP, OVERFLOW_SAMPLE, OVERFLOW_STATS)
+
+DEFAULT_SHUTDOWN_TIMEOUT_MS = 5 * 1000
+SHUTDOWN_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+class ReportRejectedError(ValueError):
+    """
+    Raised when the Engine servers answer an upload with a status other than 2xx, after retrying.
+
+    Attributes:
+        code: The HTTP status code
+    """
+
+    def __init__(self, code: int, body: Optional[bytes]) -> None:
+        ValueError.__init__(
+            self,
+            "Error sending report to Engine servers (HTTP status {}): {}".format(
+                code, body.decode("utf-8", "replace") if body else ""
+            ),
+        )
+        self.code = code
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """
+    Returns:
+        Whether an upload that failed with the error may succeed later: network errors, timeouts and 5xx
+        responses. Any other rejection would be repeated forever.
+    """
+    if isinstance(error, ReportRejectedError):
+        return error.code >= 500
+    return isinstance(error, (HTTPClientError, OSError, asyncio.TimeoutError))
+
+
 GenerateClientInfo = NamedTuple(
     "GenerateClientInfo",
     [
@@ -42,41 +112,109 @@ EngineReportingOptions = NamedTuple(
     [
         ("api_key", Optional[str]),
         ("calculate_signature", Optional[Callable]),
-        # ('report_interval_ms', Optional[int]),
-        # ('max_uncompressed_report_size', Optional[int]),
+        ("report_interval_ms", Optional[int]),
+        ("max_uncompressed_report_size", Optional[int]),
         ("endpoint_url", Optional[str]),
         ("debug_print_reports", Optional[bool]),
         ("request_agent", Optional[bool]),
-        # ('max_attempts', Optional[int]),
-        # ('minimum_retry_delay_ms', Optional[int]),
+        ("max_attempts", Optional[int]),
+        ("minimum_retry_delay_ms", Optional[int]),
         ("report_error_function", Optional[Callable]),
         # ('private_variables', Optional[List[str]]),
         # ('private_headers', Optional[List[str]]),
-        # ('handle_signals', Optional[bool]),
+        ("handle_signals", Optional[bool]),
         # ('send_reports_immediately', Optional[bool]),
         ("mask_errors_details", Optional[bool]),
         ("schema_tag", Optional[str]),
         ("generate_client_info", Optional[GenerateClientInfo]),
+        ("field_trace_threshold_ms", Optional[int]),
+        ("field_trace_buffer_size", Optional[int]),
+        ("compression_level", Optional[int]),
+        ("http_client", Optional[AsyncHTTPClient]),
+        ("max_concurrent_uploads", Optional[int]),
+        ("request_timeout_ms", Optional[int]),
+        ("report_stats", Optional[bool]),
+        ("trace_sample_rate", Optional[float]),
+        ("stats_endpoint_url", Optional[str]),
+        ("spool_directory", Optional[str]),
+        ("spool_max_bytes", Optional[int]),
+        ("spool_replay_interval_ms", Optional[int]),
+        ("max_buffered_traces", Optional[int]),
+        ("max_buffered_bytes", Optional[int]),
+        ("overflow_policy", Optional[str]),
+        ("shutdown_timeout_ms", Optional[int]),
+        ("operation_registry", Optional[OperationRegistry]),
     ],
 )
 EngineReportingOptions.__new__.__defaults__ = (None,) * len(EngineReportingOptions._fields)  # type: ignore
 
 
-def _serialize(message: Message) -> bytes:
-    out = BytesIO()
-    with gzip.GzipFile(fileobj=out, mode="w") as f:
-        f.write(message.SerializeToString())
-    return out.getvalue()
+def _serialize(report: FullTracesReportBuilder, compression_level: int) -> bytes:
+    # zlib releases the GIL while compressing, so this runs in parallel with the IOLoop
+    return gzip.compress(report.serialize(), compresslevel=compression_level)
+
+
+def _serialize_stats(
+    stats: StatsAggregator, header: ReportHeader, compression_level: int
+) -> bytes:
+    return gzip.compress(
+        stats.to_message(header).SerializeToString(), compresslevel=compression_level
+    )
+
+
+def _create_http_client(max_clients: int) -> AsyncHTTPClient:
+    # The curl client keeps connections alive between uploads, use it if pycurl is installed
+    try:
+        from tornado.curl_httpclient import CurlAsyncHTTPClient
+    except ImportError:
+        return AsyncHTTPClient(force_instance=True, max_clients=max_clients)
+    return CurlAsyncHTTPClient(force_instance=True, max_clients=max_clients)
 
 
-def _get_trace_signature(operation_name, document, query_string):
+def _get_trace_signature(operation_name, document, query_string, trace=None):
+    if trace is not None and trace.signature:
+        return trace.signature
     if not document:
         return query_string
-    else:
+    elif not query_string:
         return default_engine_reporting_signature(document, operation_name)
+    return SIGNATURE_CACHE.get_or_compute(query_string, operation_name, document)
 
 
 class EngineReportingAgent:
+    """
+    Buffers traces into a report that is sent every report_interval_ms, or in the background as soon as its
+    uncompressed size reaches max_uncompressed_report_size. Traces are serialized as they are added, and reports are
+    compressed with gzip at compression_level (6 by default) on a single worker thread, off the IOLoop.
+
+    Reports are uploaded with a long-lived HTTP client, either the http_client option or one created on
+    first use, with at most max_concurrent_uploads uploads in flight. Each attempt times out after
+    request_timeout_ms, and failed uploads are attempted up to max_attempts times.
+
+    With report_stats, every trace is aggregated into a StatsReport sent to stats_endpoint_url, and only a
+    trace_sample_rate fraction of the traces (1% by default) is sent in full.
+
+    With spool_directory, reports that fail to upload are written to a ReportSpool of at most
+    spool_max_bytes on disk, and replayed one report every spool_replay_interval_ms (1 second by default)
+    once uploads succeed again.
+
+    The traces buffered in the report and in reports waiting to be uploaded are bounded by
+    max_buffered_traces and max_buffered_bytes (by default 8 times max_uncompressed_report_size). Beyond
+    them, traces are handled by the overflow_policy: OVERFLOW_DROP (the default), OVERFLOW_SAMPLE or
+    OVERFLOW_STATS.
+
+    shutdown() stops accepting traces and sends the buffered ones within shutdown_timeout_ms (5 seconds by
+    default), spooling what cannot be sent in time. With handle_signals, SIGINT and SIGTERM shut the agent
+    down before the signal is handled as usual.
+
+    With operation_registry, the registry's counts of registered and forbidden operations are taken on
+    every flush and sent as per-client stats in the StatsReport.
+
+    Attributes:
+        dropped_traces: The number of traces dropped because the buffer was full
+        aggregated_traces: The number of traces only reported as stats because the buffer was full
+    """
+
     def __init__(self, options: EngineReportingOptions, schema_hash: str) -> None:
         self.options = options
         self.api_key = options.api_key or os.getenv("ENGINE_API_KEY", None)
@@ -91,10 +229,15 @@ class EngineReportingAgent:
             self.options.endpoint_url
             or "https://engine-report.apollodata.com/api/ingress/traces"
         )
+        self.stats_endpoint_url = (
+            self.options.stats_endpoint_url
+            or "https://engine-report.apollodata.com/api/ingress/stats"
+        )
         self.request_headers = {
             "user-agent": "apollo-engine-reporting",
             "x-api-key": self.api_key,
             "content-encoding": "gzip",
+            "content-type": "application/protobuf",
         }
 
         self._stopped = False
@@ -109,8 +252,88 @@ class EngineReportingAgent:
             options.schema_tag or os.getenv("ENGINE_SCHEMA_TAG", None) or ""
         )
 
-        self.report = FullTracesReport(header=self.report_header)
-        self.report_size = 0
+        self.report = FullTracesReportBuilder(self.report_header)
+        self.stats: Optional[StatsAggregator] = (
+            StatsAggregator() if options.report_stats else None
+        )
+        self.trace_sample_rate = (
+            DEFAULT_TRACE_SAMPLE_RATE
+            if options.trace_sample_rate is None
+            else options.trace_sample_rate
+        )
+
+        self.report_interval_ms = (
+            options.report_interval_ms or DEFAULT_REPORT_INTERVAL_MS
+        )
+        self.max_uncompressed_report_size = (
+            options.max_uncompressed_report_size or DEFAULT_MAX_UNCOMPRESSED_REPORT_SIZE
+        )
+        self.max_buffered_traces = options.max_buffered_traces
+        self.max_buffered_bytes = (
+            options.max_buffered_bytes or 8 * self.max_uncompressed_report_size
+        )
+        self.overflow_policy = options.overflow_policy or OVERFLOW_DROP
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(
+                "Unknown overflow policy {}, expected one of {}".format(
+                    self.overflow_policy, ", ".join(OVERFLOW_POLICIES)
+                )
+            )
+        self.dropped_traces = 0
+        self.aggregated_traces = 0
+        # The size and number of traces in reports that are being uploaded
+        self._pending_bytes = 0
+        self._pending_traces = 0
+
+        self.compression_level = (
+            DEFAULT_COMPRESSION_LEVEL
+            if options.compression_level is None
+            else options.compression_level
+        )
+        self.max_attempts = options.max_attempts or DEFAULT_MAX_ATTEMPTS
+        self.minimum_retry_delay_ms = (
+            DEFAULT_MINIMUM_RETRY_DELAY_MS
+            if options.minimum_retry_delay_ms is None
+            else options.minimum_retry_delay_ms
+        )
+        self.max_concurrent_uploads = (
+            options.max_concurrent_uploads or DEFAULT_MAX_CONCURRENT_UPLOADS
+        )
+        self.request_timeout_ms = (
+            options.request_timeout_ms or DEFAULT_REQUEST_TIMEOUT_MS
+        )
+        self._http_client: Optional[AsyncHTTPClient] = options.http_client
+        self._upload_semaphore = Semaphore(self.max_concurrent_uploads)
+        self._report_timer: Optional[PeriodicCallback] = None
+        # Compresses reports and reads and writes the spool
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="engine-report"
+        )
+        self.spool: Optional[ReportSpool] = None
+        if options.spool_directory:
+            self.spool = ReportSpool(
+                options.spool_directory,
+                max_bytes=options.spool_max_bytes or DEFAULT_SPOOL_MAX_BYTES,
+            )
+        self.spool_replay_interval_ms = (
+            options.spool_replay_interval_ms or DEFAULT_SPOOL_REPLAY_INTERVAL_MS
+        )
+        self._replay_timer: Optional[PeriodicCallback] = None
+        self._replaying = False
+        self.shutdown_timeout_ms = (
+            options.shutdown_timeout_ms or DEFAULT_SHUTDOWN_TIMEOUT_MS
+        )
+        self._signal_handlers_installed = False
+        # The handlers the application had installed, restored once the agent has shut down
+        self._previous_signal_handlers: Dict[int, Any] = {}
+        # The handlers the application had added with loop.add_signal_handler, which replaces them
+        self._previous_loop_signal_handlers: Dict[
+            int, Tuple[Callable[..., Any], Tuple[Any, ...]]
+        ] = {}
+        # Reports being serialized and uploaded, awaited on shutdown
+        self._uploads: Set[asyncio.Future] = set()
+        # The flush started when the report reached max_uncompressed_report_size
+        self._size_flush: Optional[asyncio.Future] = None
 
     def _options(self) -> EngineReportingOptions:
         return self.options
@@ -121,78 +344,382 @@ class EngineReportingAgent:
         if self._stopped:
             return
 
-        signature = _get_trace_signature(operation_name, document, query_string)
-        stats_report_key = "# " + operation_name + "\n" + signature
-        traces_per_query = self.report.traces_per_query.get(stats_report_key, None)
-        if not traces_per_query:
-            traces_per_query = self.report.traces_per_query[stats_report_key]
-        traces_per_query.trace.extend([trace])
-
-        await self.send_report_and_report_errors()
+        self._start_background_tasks()
 
-    async def send_report(self):
+        signature = _get_trace_signature(operation_name, document, query_string, trace)
+        stats_report_key = "# " + operation_name + "\n" + signature
+        if self.stats is not None and self.options.report_stats:
+            self.stats.add_trace(stats_report_key, trace)
+            if random.random() >= self.trace_sample_rate:
+                trace = None
+
+        if trace is not None:
+            if self._accepts_trace():
+                self.report.add_trace(stats_report_key, trace)
+            elif (
+                self.overflow_policy == OVERFLOW_STATS and not self.options.report_stats
+            ):
+                if self.stats is None:
+                    self.stats = StatsAggregator()
+                self.stats.add_trace(stats_report_key, trace)
+                self.aggregated_traces += 1
+            else:
+                self.dropped_traces += 1
+
+        if (
+            self.report_size >= self.max_uncompressed_report_size
+            and self._size_flush is None
+        ):
+            # The request that filled the report must not wait for its upload
+            self._size_flush = asyncio.ensure_future(
+                self.send_report_and_report_errors()
+            )
+            self._size_flush.add_done_callback(self._size_flush_done)
+
+    def _size_flush_done(self, future: asyncio.Future) -> None:
+        self._size_flush = None
+
+    def _accepts_trace(self) -> bool:
+        usage = (self.report.size + self._pending_bytes) / self.max_buffered_bytes
+        if self.max_buffered_traces:
+            traces = self.report.trace_count + self._pending_traces
+            usage = max(usage, traces / self.max_buffered_traces)
+        if self.overflow_policy == OVERFLOW_SAMPLE and 0.5 < usage < 1:
+            return random.random() < 2 * (1 - usage)
+        return usage < 1
+
+    def _start_background_tasks(self) -> None:
+        # Started with the first trace, so that the agent can be created before the IOLoop runs
+        if self.options.handle_signals and not self._signal_handlers_installed:
+            self.install_signal_handlers()
+        if self._report_timer is None:
+            self._report_timer = PeriodicCallback(
+                self.send_report_and_report_errors, self.report_interval_ms
+            )
+            self._report_timer.start()
+        if self.spool is not None and self._replay_timer is None:
+            self._replay_timer = PeriodicCallback(
+                self.replay_spooled_report, self.spool_replay_interval_ms
+            )
+            self._replay_timer.start()
+
+    def _take_reports(
+        self,
+    ) -> Tuple[FullTracesReportBuilder, Optional[StatsAggregator]]:
+        """
+        Returns:
+            The buffered report and stats, with the counts of the operation registry, and resets them
+        """
         report = self.report
+        stats = self.stats
         self.reset_report()
+        if self.options.operation_registry is not None:
+            client_stats = client_name_stats(self.options.operation_registry)
+            if client_stats:
+                if stats is None:
+                    stats = StatsAggregator()
+                stats.add_client_name_stats(client_stats)
+        return report, stats
 
-        if len(report.traces_per_query) == 0:
-            return
-
-        if self.options.debug_print_reports:
-            LOGGER.info("Engine sending report: " + MessageToJson(report))
-
-        await self.post_data(_serialize(report))
+    async def send_report(self):
+        report, stats = self._take_reports()
+        self._pending_bytes += report.size
+        self._pending_traces += report.trace_count
+        upload = asyncio.ensure_future(self._send(report, stats))
+        self._uploads.add(upload)
+        upload.add_done_callback(self._uploads.discard)
+        try:
+            await upload
+        finally:
+            self._pending_bytes -= report.size
+            self._pending_traces -= report.trace_count
+
+    async def _send(
+        self, report: FullTracesReportBuilder, stats: Optional[StatsAggregator]
+    ) -> None:
+        error = None
+        for endpoint_url, data in await self._serialize_reports(report, stats):
+            error = await self._upload(data, endpoint_url) or error
+        if error is not None:
+            raise error
+
+    async def _serialize_reports(
+        self, report: FullTracesReportBuilder, stats: Optional[StatsAggregator]
+    ) -> List[Tuple[str, bytes]]:
+        """
+        Returns:
+            The endpoint url and compressed data of the stats and traces reports that are not empty
+        """
+        payloads = []
+        if stats is not None and len(stats):
+            if self.options.debug_print_reports:
+                LOGGER.info(
+                    "Engine sending stats: "
+                    + MessageToJson(stats.to_message(self.report_header))
+                )
+            data = await IOLoop.current().run_in_executor(
+                self._executor,
+                _serialize_stats,
+                stats,
+                self.report_header,
+                self.compression_level,
+            )
+            payloads.append((self.stats_endpoint_url, data))
 
-    async def post_data(self, data):
-        headers = {"Content-Length": len(data)}
-        headers.update(self.request_headers)
+        if len(report):
+            if self.options.debug_print_reports:
+                LOGGER.info(
+                    "Engine sending report: " + MessageToJson(report.to_message())
+                )
+            data = await IOLoop.current().run_in_executor(
+                self._executor, _serialize, report, self.compression_level
+            )
+            payloads.append((self.endpoint_url, data))
+        return payloads
 
-        http_client = AsyncHTTPClient()
-        retry_client = RetryClient(
-            http_client=http_client,
-            retry_attempts=3,
-            retry_start_timeout=0.5,
-            retry_max_timeout=10,
-            retry_factor=2,
-        )
+    async def _upload(self, data: bytes, endpoint_url: str) -> Optional[Exception]:
+        """
+        Uploads a report, spooling it if the upload fails with an error that may not be repeated later.
 
+        Returns:
+            The error, if the upload failed
+        """
         try:
-            response = await retry_client.fetch(
-                self.endpoint_url,
-                method="POST",
-                headers=headers,
-                body=data,
-                raise_error=False,
+            await self.post_data(data, endpoint_url)
+            return None
+        except Exception as e:
+            if self.spool is not None and _is_retryable(e):
+                await IOLoop.current().run_in_executor(
+                    self._executor, self.spool.append, endpoint_url, data
+                )
+            return e
+
+    async def replay_spooled_report(self) -> bool:
+        """
+        Uploads the oldest report in the spool. A report the Engine servers reject with a 4xx is dropped,
+        so that it does not hold back the reports behind it.
+
+        Returns:
+            Whether a report was uploaded
+        """
+        if self.spool is None or self._replaying:
+            return False
+        self._replaying = True
+        try:
+            record = await IOLoop.current().run_in_executor(
+                self._executor, self.spool.peek
             )
-
+            if record is None:
+                return False
+            endpoint_url, data = record
+            try:
+                await self.post_data(data, endpoint_url)
+            except Exception as e:
+                if _is_retryable(e):
+                    # Still unavailable, the report is tried again on the next interval
+                    return False
+                LOGGER.warning("Dropping a spooled Apollo Engine report: %s", e)
+                await IOLoop.current().run_in_executor(self._executor, self.spool.drop)
+                return False
+            await IOLoop.current().run_in_executor(self._executor, self.spool.advance)
+            return True
         finally:
-            http_client.close()
+            self._replaying = False
 
-        if 500 <= response.code < 600:
-            raise ValueError(response.code + ": " + response.body)
+    async def post_data(self, data, endpoint_url=None):
+        headers = {"Content-Length": str(len(data))}
+        headers.update(self.request_headers)
+        request = HTTPRequest(
+            endpoint_url or self.endpoint_url,
+            method="POST",
+            headers=headers,
+            body=data,
+            request_timeout=self.request_timeout_ms / 1000.0,
+        )
+
+        async with self._upload_semaphore:
+            response = await self._fetch_with_retries(request)
 
         if response.code < 200 or response.code >= 300:
-            raise ValueError(
-                "Error sending report to Engine servers (HTTP status {}): {}".format(
-                    response.code, response.body
-                )
-            )
+            raise ReportRejectedError(response.code, response.body)
 
         if self.options.debug_print_reports:
-            LOGGER.info("Engine report: status " + response.code)
+            LOGGER.info("Engine report: status {}".format(response.code))
+
+    async def _fetch_with_retries(self, request: HTTPRequest) -> HTTPResponse:
+        """
+        Retries network errors, timeouts and 5xx responses, with exponential backoff from
+        minimum_retry_delay_ms and jitter.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = await self.http_client.fetch(request, raise_error=False)
+                if response.code < 500 or attempt == self.max_attempts:
+                    return response
+            except (HTTPClientError, OSError):
+                if attempt == self.max_attempts:
+                    raise
+            delay = self.minimum_retry_delay_ms / 1000.0 * 2 ** (attempt - 1)
+            await gen.sleep(delay / 2 + random.uniform(0, delay / 2))
+        raise AssertionError("unreachable")
+
+    @property
+    def http_client(self) -> AsyncHTTPClient:
+        """
+        The HTTP client that uploads reports. It is created on first use and kept for the lifetime of the
+        agent, so that connections can be reused.
+        """
+        if self._http_client is None:
+            self._http_client = _create_http_client(self.max_concurrent_uploads)
+        return self._http_client
+
+    def close(self) -> None:
+        """
+        Closes the HTTP client, unless it was passed in the options, and shuts down the executor that
+        compresses reports. The agent cannot send reports afterwards.
+        """
+        if self._http_client is not None and self.options.http_client is None:
+            self._http_client.close()
+        self._http_client = None
+        self._executor.shutdown(wait=True)
 
     def stop(self):
         self._stopped = True
+        if self._report_timer is not None:
+            self._report_timer.stop()
+            self._report_timer = None
+        if self._replay_timer is not None:
+            self._replay_timer.stop()
+            self._replay_timer = None
+
+    async def shutdown(self, timeout_ms: Optional[int] = None) -> None:
+        """
+        Stops accepting traces, sends the buffered ones and waits for the reports already being sent.
+        Buffered reports that cannot be sent before the timeout, or that fail with a retryable error, are
+        written to the spool, if there is one.
+
+        Args:
+            timeout_ms: The time allowed for sending, shutdown_timeout_ms by default
+        """
+        self.stop()
+        io_loop = IOLoop.current()
+        deadline = io_loop.time() + (timeout_ms or self.shutdown_timeout_ms) / 1000.0
+
+        report, stats = self._take_reports()
+        for endpoint_url, data in await self._serialize_reports(report, stats):
+            try:
+                await asyncio.wait_for(
+                    self.post_data(data, endpoint_url),
+                    max(deadline - io_loop.time(), 0),
+                )
+            except Exception as e:
+                if self.spool is not None and _is_retryable(e):
+                    await io_loop.run_in_executor(
+                        self._executor, self.spool.append, endpoint_url, data
+                    )
+                else:
+                    self._report_error()
+
+        uploads = set(self._uploads)
+        if uploads:
+            _, pending = await asyncio.wait(
+                uploads, timeout=max(deadline - io_loop.time(), 0)
+            )
+            if pending:
+                LOGGER.warning(
+                    "%d Apollo Engine reports were still being sent at shutdown",
+                    len(pending),
+                )
+                # Uploads still running may spool from the executor, close() shuts it down
+                return
+        self._executor.shutdown(wait=True)
+
+    def install_signal_handlers(self) -> None:
+        """
+        Shuts the agent down on SIGINT and SIGTERM, then restores the handlers that were installed before
+        and passes the signal on to them. Handlers added with loop.add_signal_handler are restored and
+        called as well. Must be called on the main thread, with the IOLoop current.
+        """
+        asyncio_loop = IOLoop.current().asyncio_loop  # type: ignore
+        # Only the selector event loops on Unix keep their signal handlers here
+        loop_handlers = getattr(asyncio_loop, "_signal_handlers", {})
+        try:
+            for signum in SHUTDOWN_SIGNALS:
+                self._previous_signal_handlers[signum] = signal.getsignal(signum)
+                handle = loop_handlers.get(signum, None)
+                if handle is not None:
+                    self._previous_loop_signal_handlers[signum] = (
+                        handle._callback,
+                        handle._args,
+                    )
+                asyncio_loop.add_signal_handler(
+                    signum, IOLoop.current().spawn_callback, self._handle_signal, signum
+                )
+        except (NotImplementedError, RuntimeError, ValueError):
+            LOGGER.warning(
+                "Could not install signal handlers for Apollo Engine reporting"
+            )
+            return
+        self._signal_handlers_installed = True
+
+    async def _handle_signal(self, signum: int) -> None:
+        LOGGER.info(
+            "Received signal %s, sending the remaining Apollo Engine reports", signum
+        )
+        try:
+            await self.shutdown()
+        finally:
+            asyncio_loop = IOLoop.current().asyncio_loop  # type: ignore
+            for handled in SHUTDOWN_SIGNALS:
+                asyncio_loop.remove_signal_handler(handled)
+                loop_handler = self._previous_loop_signal_handlers.get(handled, None)
+                if loop_handler is not None:
+                    callback, args = loop_handler
+                    asyncio_loop.add_signal_handler(handled, callback, *args)
+                    continue
+                previous = self._previous_signal_handlers.get(handled, None)
+                if previous is not None:
+                    # None when the handler was not installed from Python, remove_signal_handler reset it
+                    signal.signal(handled, previous)
+            self._signal_handlers_installed = False
+            self._chain_signal(signum)
+
+    def _chain_signal(self, signum: int) -> None:
+        loop_handler = self._previous_loop_signal_handlers.get(signum, None)
+        if loop_handler is not None:
+            callback, args = loop_handler
+            callback(*args)
+            return
+        handler = signal.getsignal(signum)
+        if handler == signal.SIG_IGN:
+            return
+        if callable(handler) and handler is not signal.default_int_handler:
+            handler(signum, None)
+        else:
+            # The default action, or KeyboardInterrupt raised on the main thread rather than in this callback.
+            # signal.raise_signal is only available from Python 3.8.
+            os.kill(os.getpid(), signum)
 
     async def send_report_and_report_errors(self):
         try:
             await self.send_report()
         except:
-            exception = sys.exc_info()[1]
-            if self.options.report_error_function:
-                self.options.report_error_function(exception)
-            else:
-                LOGGER.exception("Error sending reports to Apollo Engine")
+            self._report_error()
+
+    def _report_error(self) -> None:
+        exception = sys.exc_info()[1]
+        if self.options.report_error_function:
+            self.options.report_error_function(exception)
+        else:
+            LOGGER.exception("Error sending reports to Apollo Engine")
+
+    @property
+    def report_size(self) -> int:
+        """
+        The exact size of the serialized report
+        """
+        return self.report.size
 
     def reset_report(self):
-        self.report = FullTracesReport(header=self.report_header)
-        self.report_size: int = 0
+        self.report = FullTracesReportBuilder(self.report_header)
+        self.stats = StatsAggregator() if self.options.report_stats else None
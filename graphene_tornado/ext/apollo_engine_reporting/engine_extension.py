@@ -3,6 +3,7 @@ from __future__ import print_function
 
 import json
 import time
+from collections import deque
 from numbers import Number
 from typing import Any
 from typing import Callable
@@ -21,10 +22,13 @@ from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
 )
 from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import Trace
 from graphene_tornado.graphql_extension import GraphQLExtension
+from graphene_tornado.request_context import CLIENT_NAME_HEADER
+from graphene_tornado.request_context import CLIENT_REFERENCE_HEADER_KEY
+from graphene_tornado.request_context import CLIENT_VERSION_HEADER_KEY
+from graphene_tornado.request_context import REGISTERED_OPERATION
+from graphene_tornado.request_context import SIGNATURE
 
-CLIENT_NAME_HEADER = "apollographql-client-name"
-CLIENT_REFERENCE_HEADER_KEY = "apollographql-client-reference-id"
-CLIENT_VERSION_HEADER_KEY = "apollographql-client-version"
+DEFAULT_FIELD_TRACE_BUFFER_SIZE = 1024
 
 
 ClientInfo = NamedTuple(
@@ -69,6 +73,28 @@ class EngineReportingExtension(GraphQLExtension):
         self.generate_client_info = options.generate_client_info or generate_client_info
         self.resolver_stats: List[Any] = list()
 
+        # When a threshold is configured, resolver timings are kept in a bounded ring
+        # buffer and only turned into trace nodes if the request ends up being slow.
+        self.field_trace_threshold_ns: Optional[int] = None
+        if options.field_trace_threshold_ms is not None:
+            self.field_trace_threshold_ns = options.field_trace_threshold_ms * 1000000
+        self.resolver_timings: deque = deque(
+            maxlen=options.field_trace_buffer_size or DEFAULT_FIELD_TRACE_BUFFER_SIZE
+        )
+
+    def reset(self) -> None:
+        # Reuse the trace and the root node rather than allocating new ones. This is safe
+        # because add_trace copies the trace into the report before the extension is released.
+        self.operation_name = None
+
+        root = self.nodes[response_path_as_string(None)]
+        root.Clear()
+        self.trace.Clear()
+        self.nodes.clear()
+        self.nodes[response_path_as_string(None)] = root
+        self.resolver_stats.clear()
+        self.resolver_timings.clear()
+
     async def request_started(
         self,
         request,
@@ -79,12 +105,14 @@ class EngineReportingExtension(GraphQLExtension):
         context,
         request_context,
     ):
+        self.start_time = now_ns()
+        self.nodes[response_path_as_string(None)].start_time = self.start_time
         self.trace.start_time.GetCurrentTime()
         self.query_string = query_string
         self.document = parsed_query
         self.trace.http.method = self._get_http_method(request)
 
-        client_info = generate_client_info(request)
+        client_info = self.generate_client_info(request)
         if client_info:
             self.trace.client_version = client_info.client_version or ""
             self.trace.client_reference_id = client_info.client_reference_id or ""
@@ -97,8 +125,15 @@ class EngineReportingExtension(GraphQLExtension):
             self.trace.duration_ns = now.ToNanoseconds() - start_nanos
             self.trace.end_time.GetCurrentTime()
 
+            if self._is_slow(self.trace.duration_ns):
+                self._materialize_resolver_timings()
+            self.resolver_timings.clear()
+
             op_name = self.operation_name or ""
             self.trace.root.MergeFrom(self.nodes.get(""))
+            if request_context.get(REGISTERED_OPERATION, False):
+                self.trace.registered_operation = True
+                self.trace.signature = request_context[SIGNATURE]
             await self.add_trace(
                 op_name,
                 request_context.get("document", None),
@@ -134,6 +169,21 @@ class EngineReportingExtension(GraphQLExtension):
                 "" if not info.operation.name else info.operation.name.value
             )
 
+        if self.field_trace_threshold_ns is not None:
+            timing = [
+                info.path,
+                info.return_type,
+                info.parent_type,
+                now_ns() - self.start_time,
+                0,
+            ]
+            self.resolver_timings.append(timing)
+
+            async def on_timing_end(errors=None, result=None):
+                timing[4] = now_ns() - self.start_time
+
+            return on_timing_end
+
         node = self._new_node(info.path)
         node.start_time = now_ns() - self.start_time
         node.type = str(info.return_type)
@@ -145,6 +195,10 @@ class EngineReportingExtension(GraphQLExtension):
         return on_end
 
     async def will_send_response(self, response, context):
+        if self._is_slow(now_ns() - self.start_time):
+            # Materialize early so that errors can be attached to their field nodes
+            self._materialize_resolver_timings()
+
         root = self.nodes.get("", None)
         root.end_time = now_ns()
 
@@ -166,6 +220,25 @@ class EngineReportingExtension(GraphQLExtension):
                     error_info = {"message": str(error), "json": json.dumps(error)}
                 node.error.add(error=Trace.Error(**error_info))
 
+    def _is_slow(self, duration_ns: int) -> bool:
+        return (
+            self.field_trace_threshold_ns is not None
+            and duration_ns >= self.field_trace_threshold_ns
+        )
+
+    def _materialize_resolver_timings(self) -> None:
+        """
+        Converts the buffered resolver timings into trace nodes. Timings that were
+        evicted from the ring buffer are lost, but their parents are still created.
+        """
+        while self.resolver_timings:
+            path, return_type, parent_type, start, end = self.resolver_timings.popleft()
+            node = self._new_node(path)
+            node.start_time = start
+            node.end_time = end
+            node.type = str(return_type)
+            node.parent_type = str(parent_type)
+
     def _get_http_method(self, request):
         try:
             return getattr(Trace.HTTP, request.method.upper())
@@ -0,0 +1,35 @@
+from typing import Dict
+
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import ClientNameStats
+from graphene_tornado.operation_registry import OperationRegistry
+
+# Safelist counts are not tied to an operation, forbidden requests never executed one
+OPERATION_REGISTRY_STATS_KEY = "## OperationRegistry\n"
+
+
+def client_name_stats(registry: OperationRegistry) -> Dict[str, ClientNameStats]:
+    """
+    Converts the safelist counters of an operation registry into per-client Engine stats and resets them.
+    Requests with unknown operation ids are reported as forbidden operations.
+
+    Args:
+        registry: The operation registry
+
+    Returns:
+        The stats keyed by client name
+    """
+    stats: Dict[str, ClientNameStats] = {}
+    registered, forbidden, unregistered = registry.take_counts()
+
+    for (client_name, client_version), count in registered.items():
+        client_stats = stats.setdefault(client_name, ClientNameStats())
+        client_stats.registered_operation_count_per_version[client_version] += count
+        client_stats.requests_count_per_version[client_version] += count
+
+    for counter in (forbidden, unregistered):
+        for (client_name, client_version), count in counter.items():
+            client_stats = stats.setdefault(client_name, ClientNameStats())
+            client_stats.forbidden_operation_count_per_version[client_version] += count
+            client_stats.requests_count_per_version[client_version] += count
+
+    return stats
@@ -0,0 +1,112 @@
+"""
+Builds serialized FullTracesReports incrementally.
+
+Each trace is serialized when it is added and appended to a byte buffer for its stats report key, as the
+wire encoding of a repeated Traces.trace field. The report is assembled by concatenating the encoded header
+and one traces_per_query map entry per key, so no protobuf message holds the traces and the exact size of
+the serialized report is always known.
+"""
+from typing import Dict
+
+from .reports_pb2 import FullTracesReport
+from .reports_pb2 import ReportHeader
+from .reports_pb2 import Trace
+
+# Tags of length delimited fields: (field number << 3) | 2
+_FULL_TRACES_REPORT_HEADER_TAG = b"\x0a"
+_FULL_TRACES_REPORT_TRACES_PER_QUERY_TAG = b"\x2a"
+_MAP_ENTRY_KEY_TAG = b"\x0a"
+_MAP_ENTRY_VALUE_TAG = b"\x12"
+_TRACES_TRACE_TAG = b"\x0a"
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field_size(length: int) -> int:
+    # A one byte tag, the length and the contents
+    return 1 + len(_varint(length)) + length
+
+
+class FullTracesReportBuilder:
+    """
+    Args:
+        header: The header of the report
+
+    Attributes:
+        size: The exact size of the serialized report in bytes
+    """
+
+    def __init__(self, header: ReportHeader) -> None:
+        encoded_header = header.SerializeToString()
+        self._header = (
+            _FULL_TRACES_REPORT_HEADER_TAG + _varint(len(encoded_header)) + encoded_header
+        )
+        self._keys: Dict[str, bytes] = {}
+        self._traces: Dict[str, bytearray] = {}
+        self.trace_count = 0
+        self.size = len(self._header)
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            The number of stats report keys in the report
+        """
+        return len(self._traces)
+
+    def add_trace(self, stats_report_key: str, trace: Trace) -> None:
+        """
+        Serializes a trace into the report. Later changes to the trace are not reflected in the report.
+        """
+        traces = self._traces.get(stats_report_key, None)
+        if traces is None:
+            self._keys[stats_report_key] = stats_report_key.encode("utf-8")
+            traces = self._traces[stats_report_key] = bytearray()
+        else:
+            self.size -= self._entry_size(stats_report_key)
+
+        encoded_trace = trace.SerializeToString()
+        traces += _TRACES_TRACE_TAG
+        traces += _varint(len(encoded_trace))
+        traces += encoded_trace
+        self.trace_count += 1
+        self.size += self._entry_size(stats_report_key)
+
+    def _entry_length(self, stats_report_key: str) -> int:
+        return _field_size(len(self._keys[stats_report_key])) + _field_size(
+            len(self._traces[stats_report_key])
+        )
+
+    def _entry_size(self, stats_report_key: str) -> int:
+        return _field_size(self._entry_length(stats_report_key))
+
+    def serialize(self) -> bytes:
+        """
+        Returns:
+            The serialized FullTracesReport
+        """
+        out = bytearray(self._header)
+        for stats_report_key, traces in self._traces.items():
+            key = self._keys[stats_report_key]
+            out += _FULL_TRACES_REPORT_TRACES_PER_QUERY_TAG
+            out += _varint(self._entry_length(stats_report_key))
+            out += _MAP_ENTRY_KEY_TAG
+            out += _varint(len(key))
+            out += key
+            out += _MAP_ENTRY_VALUE_TAG
+            out += _varint(len(traces))
+            out += traces
+        return bytes(out)
+
+    def to_message(self) -> FullTracesReport:
+        """
+        Returns:
+            The report as a protobuf message, e.g. for printing
+        """
+        return FullTracesReport.FromString(self.serialize())
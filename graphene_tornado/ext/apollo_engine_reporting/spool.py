@@ -0,0 +1,245 @@
+"""
+A bounded on-disk spool for reports that could not be uploaded.
+
+Reports are appended to segment files in a directory. Each record holds the endpoint the report was meant
+for and the compressed report, with a CRC32 so that a record torn by a crash is detected rather than sent.
+Segments are closed once they reach segment_size and deleted once every report in them has been replayed.
+When the spool grows beyond max_bytes the oldest segments are evicted, and the reports in them are counted
+as dropped. Segments left behind by a previous process are replayed too, so delivery is at least once.
+"""
+import collections
+import mmap
+import os
+import struct
+import zlib
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+DEFAULT_SPOOL_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_SPOOL_SEGMENT_SIZE = 4 * 1024 * 1024
+
+_SEGMENT_SUFFIX = ".spool"
+# The lengths of the endpoint url and of the report, and the CRC32 of both
+_RECORD_HEADER = struct.Struct(">III")
+
+# (endpoint url, report, record length)
+_Record = Tuple[str, bytes, int]
+
+
+class ReportSpool:
+    """
+    The spool is not thread safe; the agent only uses it from its worker thread.
+
+    Args:
+        directory: The directory of the segment files, created if needed
+        max_bytes: The disk budget of the spool
+        segment_size: The size at which segments are closed
+        use_mmap: Whether to read segments with mmap
+
+    Attributes:
+        spooled: The number of reports written to the spool
+        replayed: The number of reports read back and uploaded
+        dropped: The number of reports evicted, too large to spool, unreadable or rejected on replay
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = DEFAULT_SPOOL_MAX_BYTES,
+        segment_size: int = DEFAULT_SPOOL_SEGMENT_SIZE,
+        use_mmap: bool = False,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_size = min(segment_size, max_bytes)
+        self.use_mmap = use_mmap
+        self.spooled = 0
+        self.replayed = 0
+        self.dropped = 0
+
+        os.makedirs(directory, exist_ok=True)
+        # Segment sequence number -> [size, number of reports not yet replayed], oldest first
+        self._segments: "collections.OrderedDict[int, List[int]]" = (
+            collections.OrderedDict()
+        )
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(_SEGMENT_SUFFIX):
+                sequence = int(name[: -len(_SEGMENT_SUFFIX)])
+                self._segments[sequence] = [
+                    os.path.getsize(self._path(sequence)),
+                    self._count_records(sequence),
+                ]
+        self._next_sequence = max(self._segments, default=-1) + 1
+        # Segments from a previous process are only read, never appended to
+        self._active: Optional[int] = None
+        # The replay position in the oldest segment, and the length of the record last peeked
+        self._position = (-1, 0)
+        self._peeked = 0
+        self._enforce_budget()
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            The number of reports waiting to be replayed
+        """
+        return sum(records for _, records in self._segments.values())
+
+    @property
+    def size(self) -> int:
+        """
+        The size of the spool on disk in bytes
+        """
+        return sum(size for size, _ in self._segments.values())
+
+    def _path(self, sequence: int) -> str:
+        return os.path.join(
+            self.directory, "{:020d}{}".format(sequence, _SEGMENT_SUFFIX)
+        )
+
+    def append(self, endpoint_url: str, report: bytes) -> bool:
+        """
+        Spools a report, evicting the oldest segments if the spool grows beyond its budget.
+
+        Returns:
+            Whether the report was spooled
+        """
+        encoded_url = endpoint_url.encode("utf-8")
+        record = (
+            _RECORD_HEADER.pack(
+                len(encoded_url),
+                len(report),
+                zlib.crc32(report, zlib.crc32(encoded_url)),
+            )
+            + encoded_url
+            + report
+        )
+        if len(record) > self.max_bytes:
+            self.dropped += 1
+            return False
+
+        if self._active is None or self._segments[self._active][0] >= self.segment_size:
+            self._active = self._next_sequence
+            self._next_sequence += 1
+            self._segments[self._active] = [0, 0]
+        with open(self._path(self._active), "ab") as f:
+            f.write(record)
+        segment = self._segments[self._active]
+        segment[0] += len(record)
+        segment[1] += 1
+        self.spooled += 1
+
+        self._enforce_budget()
+        return True
+
+    def _enforce_budget(self) -> None:
+        # The newest segment is kept even if it alone exceeds the budget by its last report
+        while len(self._segments) > 1 and self.size > self.max_bytes:
+            sequence = next(iter(self._segments))
+            self.dropped += self._segments[sequence][1]
+            self._remove(sequence)
+
+    def _remove(self, sequence: int) -> None:
+        del self._segments[sequence]
+        os.remove(self._path(sequence))
+        if self._active == sequence:
+            self._active = None
+
+    def peek(self) -> Optional[Tuple[str, bytes]]:
+        """
+        Returns:
+            The endpoint url and the oldest report in the spool, or None if the spool is empty
+        """
+        while self._segments:
+            sequence = next(iter(self._segments))
+            size, records = self._segments[sequence]
+            if self._position[0] != sequence:
+                self._position = (sequence, 0)
+            offset = self._position[1]
+
+            if offset >= size:
+                self._remove(sequence)
+                continue
+            record = self._read_record(sequence, offset, size)
+            if record is None:
+                # The rest of a torn or corrupted segment cannot be read
+                self.dropped += records
+                self._remove(sequence)
+                continue
+
+            endpoint_url, report, self._peeked = record
+            return endpoint_url, report
+        return None
+
+    def advance(self) -> None:
+        """
+        Removes the report last returned by peek, once it has been uploaded.
+        """
+        if self._advance():
+            self.replayed += 1
+
+    def drop(self) -> None:
+        """
+        Removes the report last returned by peek, once it has been rejected for good.
+        """
+        if self._advance():
+            self.dropped += 1
+
+    def _advance(self) -> bool:
+        sequence, offset = self._position
+        segment = self._segments.get(sequence, None)
+        if segment is None or not self._peeked:
+            # The segment was evicted in the meantime
+            return False
+        self._position = (sequence, offset + self._peeked)
+        self._peeked = 0
+        segment[1] -= 1
+        if self._position[1] >= segment[0]:
+            self._remove(sequence)
+        return True
+
+    def _read_record(self, sequence: int, offset: int, size: int) -> Optional[_Record]:
+        with open(self._path(sequence), "rb") as f:
+            if self.use_mmap:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return _parse_record(
+                        lambda start, length: mapped[start : start + length],
+                        offset,
+                        size,
+                    )
+
+            def read(start: int, length: int) -> bytes:
+                f.seek(start)
+                return f.read(length)
+
+            return _parse_record(read, offset, size)
+
+    def _count_records(self, sequence: int) -> int:
+        count = 0
+        offset = 0
+        size = os.path.getsize(self._path(sequence))
+        with open(self._path(sequence), "rb") as f:
+            while offset + _RECORD_HEADER.size <= size:
+                f.seek(offset)
+                url_length, report_length, _ = _RECORD_HEADER.unpack(
+                    f.read(_RECORD_HEADER.size)
+                )
+                offset += _RECORD_HEADER.size + url_length + report_length
+                if offset <= size:
+                    count += 1
+        return count
+
+
+def _parse_record(read, offset: int, size: int) -> Optional[_Record]:
+    if offset + _RECORD_HEADER.size > size:
+        return None
+    url_length, report_length, crc = _RECORD_HEADER.unpack(
+        read(offset, _RECORD_HEADER.size)
+    )
+    length = _RECORD_HEADER.size + url_length + report_length
+    if offset + length > size:
+        return None
+    body = read(offset + _RECORD_HEADER.size, url_length + report_length)
+    if zlib.crc32(body) != crc:
+        return None
+    return body[:url_length].decode("utf-8"), body[url_length:], length
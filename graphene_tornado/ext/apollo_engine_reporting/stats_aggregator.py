@@ -0,0 +1,192 @@
+"""
+Aggregates traces into a StatsReport.
+
+Every trace updates the QueryLatencyStats of its stats report key and client context, and the FieldStats
+of each field it resolved, keyed by parent type and field name. Latencies are kept in LatencyHistograms.
+The safelist counts of an operation registry are reported as per_client_name stats under their own key.
+"""
+from typing import Dict
+from typing import Tuple
+
+from google.protobuf.timestamp_pb2 import Timestamp
+
+from .operation_registry_stats import OPERATION_REGISTRY_STATS_KEY
+from .reports_pb2 import ClientNameStats
+from .reports_pb2 import ContextualizedQueryLatencyStats
+from .reports_pb2 import ContextualizedTypeStats
+from .reports_pb2 import FieldStat
+from .reports_pb2 import QueryLatencyStats
+from .reports_pb2 import ReportHeader
+from .reports_pb2 import StatsContext
+from .reports_pb2 import StatsReport
+from .reports_pb2 import Trace
+from graphene_tornado.ext.latency_histogram import LatencyHistogram
+
+# (client reference id, client name, client version)
+ContextKey = Tuple[str, str, str]
+
+
+class _QueryStats:
+    __slots__ = (
+        "latency",
+        "request_count",
+        "requests_with_errors_count",
+        "registered_operation_count",
+        "forbidden_operation_count",
+    )
+
+    def __init__(self) -> None:
+        self.latency = LatencyHistogram()
+        self.request_count = 0
+        self.requests_with_errors_count = 0
+        self.registered_operation_count = 0
+        self.forbidden_operation_count = 0
+
+
+class _FieldStats:
+    __slots__ = (
+        "return_type",
+        "latency",
+        "count",
+        "errors_count",
+        "requests_with_errors_count",
+    )
+
+    def __init__(self, return_type: str) -> None:
+        self.return_type = return_type
+        self.latency = LatencyHistogram()
+        self.count = 0
+        self.errors_count = 0
+        self.requests_with_errors_count = 0
+
+
+class StatsAggregator:
+    """
+    Accumulates the stats of a StatsReport. Traces are aggregated as they are added and are not retained.
+    """
+
+    def __init__(self) -> None:
+        self.start_time = Timestamp()
+        self.start_time.GetCurrentTime()
+        self._queries: Dict[str, Dict[ContextKey, _QueryStats]] = {}
+        self._fields: Dict[
+            str, Dict[ContextKey, Dict[str, Dict[str, _FieldStats]]]
+        ] = {}
+        self._client_name_stats: Dict[str, ClientNameStats] = {}
+        self.trace_count = 0
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            The number of stats report keys with stats
+        """
+        return len(self._queries) + bool(self._client_name_stats)
+
+    def add_client_name_stats(self, client_name_stats: Dict[str, ClientNameStats]) -> None:
+        """
+        Adds the safelist counts of an operation registry, see operation_registry_stats.client_name_stats.
+        """
+        for client_name, stats in client_name_stats.items():
+            merged = self._client_name_stats.setdefault(client_name, ClientNameStats())
+            for field in (
+                "requests_count_per_version",
+                "registered_operation_count_per_version",
+                "forbidden_operation_count_per_version",
+            ):
+                counts = getattr(merged, field)
+                for client_version, count in getattr(stats, field).items():
+                    counts[client_version] += count
+
+    def add_trace(self, stats_report_key: str, trace: Trace) -> None:
+        context = (trace.client_reference_id, trace.client_name, trace.client_version)
+        query_stats = self._queries.setdefault(stats_report_key, {}).get(context, None)
+        if query_stats is None:
+            query_stats = self._queries[stats_report_key][context] = _QueryStats()
+
+        query_stats.request_count += 1
+        query_stats.latency.record(trace.duration_ns)
+        if trace.registered_operation:
+            query_stats.registered_operation_count += 1
+        if trace.forbidden_operation:
+            query_stats.forbidden_operation_count += 1
+
+        per_type = self._fields.setdefault(stats_report_key, {}).setdefault(context, {})
+        has_errors = bool(trace.root.error)
+        # Walk the tree iteratively, trees of large lists can be deeper than the recursion limit
+        nodes = list(trace.root.child)
+        while nodes:
+            node = nodes.pop()
+            nodes.extend(node.child)
+            if node.error:
+                has_errors = True
+            if not node.parent_type:
+                # List elements have no field of their own
+                continue
+            field_name = node.original_field_name or node.response_name
+            per_field = per_type.setdefault(node.parent_type, {})
+            field_stats = per_field.get(field_name, None)
+            if field_stats is None:
+                field_stats = per_field[field_name] = _FieldStats(node.type)
+            field_stats.count += 1
+            field_stats.latency.record(node.end_time - node.start_time)
+            if node.error:
+                field_stats.errors_count += len(node.error)
+                field_stats.requests_with_errors_count += 1
+        if has_errors:
+            query_stats.requests_with_errors_count += 1
+        self.trace_count += 1
+
+    def to_message(self, header: ReportHeader) -> StatsReport:
+        """
+        Returns:
+            The aggregated stats as a StatsReport
+        """
+        report = StatsReport(header=header)
+        report.start_time.CopyFrom(self.start_time)
+        report.end_time.GetCurrentTime()
+        for stats_report_key, contexts in self._queries.items():
+            query_stats = report.per_query[stats_report_key]
+            for context, stats in contexts.items():
+                query_stats.query_stats_with_context.append(
+                    ContextualizedQueryLatencyStats(
+                        context=_stats_context(context),
+                        query_latency_stats=QueryLatencyStats(
+                            latency_count=stats.latency.to_array(),
+                            request_count=stats.request_count,
+                            requests_with_errors_count=stats.requests_with_errors_count,
+                            registered_operation_count=stats.registered_operation_count,
+                            forbidden_operation_count=stats.forbidden_operation_count,
+                        ),
+                    )
+                )
+            for context, per_type in self._fields[stats_report_key].items():
+                if not per_type:
+                    continue
+                type_stats = ContextualizedTypeStats(context=_stats_context(context))
+                for parent_type, per_field in per_type.items():
+                    per_field_stat = type_stats.per_type_stat[parent_type].per_field_stat
+                    for field_name, field_stats in per_field.items():
+                        per_field_stat[field_name].CopyFrom(
+                            FieldStat(
+                                return_type=field_stats.return_type,
+                                count=field_stats.count,
+                                errors_count=field_stats.errors_count,
+                                requests_with_errors_count=field_stats.requests_with_errors_count,
+                                latency_count=field_stats.latency.to_array(),
+                            )
+                        )
+                query_stats.type_stats_with_context.append(type_stats)
+        if self._client_name_stats:
+            per_client_name = report.per_query[OPERATION_REGISTRY_STATS_KEY].per_client_name
+            for client_name, stats in self._client_name_stats.items():
+                per_client_name[client_name].CopyFrom(stats)
+        return report
+
+
+def _stats_context(context: ContextKey) -> StatsContext:
+    client_reference_id, client_name, client_version = context
+    return StatsContext(
+        client_reference_id=client_reference_id,
+        client_name=client_name,
+        client_version=client_version,
+    )
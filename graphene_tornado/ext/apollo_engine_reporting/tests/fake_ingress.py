@@ -0,0 +1,168 @@
+"""
+A local stand-in for the Engine ingress, for tests and benchmarks.
+
+It accepts gzip compressed FullTracesReports on /api/ingress/traces and StatsReports on /api/ingress/stats,
+checks the headers the agent sends and keeps the decoded reports. Latency, server errors and connection
+resets can be injected to exercise the agent's retries, timeouts and spool.
+"""
+import gzip
+import random
+from typing import List
+from typing import Optional
+from typing import Union
+
+import tornado.gen
+import tornado.web
+from google.protobuf.message import DecodeError
+
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import FullTracesReport
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import StatsReport
+
+TRACES_PATH = "/api/ingress/traces"
+STATS_PATH = "/api/ingress/stats"
+
+# A failure that closes the connection without a response
+RESET = "reset"
+
+Failure = Union[int, str]
+
+
+class FakeIngress:
+    """
+    Args:
+        api_key: The api key reports must be sent with, any key is accepted if None
+        latency: The seconds every request waits before it is answered
+        error_rate: The fraction of requests answered with a 503
+        reset_rate: The fraction of requests whose connection is reset
+        seed: The seed of the random injected errors and resets
+
+    Attributes:
+        failures: Statuses or RESET, used in order for the next requests before the error and reset rates
+        requests: The number of requests received
+        max_concurrent: The largest number of requests handled at once
+        bodies: The compressed body of every accepted report, in order
+        traces_reports: The accepted FullTracesReports
+        stats_reports: The accepted StatsReports
+        received_bytes: The size of the accepted reports, compressed
+        decoded_bytes: The size of the accepted reports, uncompressed
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        latency: float = 0,
+        error_rate: float = 0,
+        reset_rate: float = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.latency = latency
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.failures: List[Failure] = []
+        self._random = random.Random(seed)
+
+        self.requests = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.bodies: List[bytes] = []
+        self.traces_reports: List[FullTracesReport] = []
+        self.stats_reports: List[StatsReport] = []
+        self.received_bytes = 0
+        self.decoded_bytes = 0
+
+    @property
+    def trace_count(self) -> int:
+        """
+        The number of traces in the accepted FullTracesReports
+        """
+        return sum(
+            len(traces.trace)
+            for report in self.traces_reports
+            for traces in report.traces_per_query.values()
+        )
+
+    @property
+    def stats_request_count(self) -> int:
+        """
+        The number of requests counted in the accepted StatsReports
+        """
+        return sum(
+            context.query_latency_stats.request_count
+            for report in self.stats_reports
+            for query_stats in report.per_query.values()
+            for context in query_stats.query_stats_with_context
+        )
+
+    def handlers(self) -> list:
+        return [
+            (TRACES_PATH, IngressHandler, dict(ingress=self, report_type=FullTracesReport)),
+            (STATS_PATH, IngressHandler, dict(ingress=self, report_type=StatsReport)),
+        ]
+
+    def application(self) -> tornado.web.Application:
+        return tornado.web.Application(self.handlers())
+
+    def next_failure(self) -> Optional[Failure]:
+        if self.failures:
+            return self.failures.pop(0)
+        if self.reset_rate and self._random.random() < self.reset_rate:
+            return RESET
+        if self.error_rate and self._random.random() < self.error_rate:
+            return 503
+        return None
+
+    def accept(self, report_type, body: bytes) -> bool:
+        """
+        Decodes and keeps a report.
+
+        Returns:
+            Whether the body held a report
+        """
+        try:
+            data = gzip.decompress(body)
+            report = report_type.FromString(data)
+        except (OSError, EOFError, DecodeError):
+            return False
+        if report_type is StatsReport:
+            self.stats_reports.append(report)
+        else:
+            self.traces_reports.append(report)
+        self.bodies.append(body)
+        self.received_bytes += len(body)
+        self.decoded_bytes += len(data)
+        return True
+
+
+class IngressHandler(tornado.web.RequestHandler):
+    def initialize(self, ingress: FakeIngress, report_type) -> None:
+        self.ingress = ingress
+        self.report_type = report_type
+
+    async def post(self) -> None:
+        ingress = self.ingress
+        ingress.requests += 1
+        ingress.concurrent += 1
+        ingress.max_concurrent = max(ingress.max_concurrent, ingress.concurrent)
+        try:
+            if ingress.latency:
+                await tornado.gen.sleep(ingress.latency)
+        finally:
+            ingress.concurrent -= 1
+
+        failure = ingress.next_failure()
+        if failure == RESET:
+            # Drop the connection without answering, the client sees a network error
+            self._auto_finish = False
+            self.request.connection.detach().close()
+            return
+        if failure is not None:
+            self.set_status(failure)
+            return
+
+        if ingress.api_key is not None and self.request.headers.get("x-api-key") != ingress.api_key:
+            self.set_status(403)
+        elif self.request.headers.get("content-encoding") != "gzip":
+            self.set_status(415)
+        elif not ingress.accept(self.report_type, self.request.body):
+            self.set_status(400)
@@ -1,10 +1,13 @@
 from __future__ import absolute_import
 
 import gzip
+import threading
 
 import pytest
 import six
 import tornado
+import tornado.gen
+import tornado.locks
 from graphql import parse
 from six import BytesIO
 from six import StringIO
@@ -12,6 +15,7 @@ from six import StringIO
 from graphene_tornado.apollo_tooling.operation_id import (
     default_engine_reporting_signature,
 )
+from graphene_tornado.ext.apollo_engine_reporting import engine_agent
 from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
     EngineReportingAgent,
 )
@@ -24,11 +28,18 @@ from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
 from graphene_tornado.ext.apollo_engine_reporting.engine_extension import (
     EngineReportingExtension,
 )
+from graphene_tornado.ext.apollo_engine_reporting.operation_registry_stats import (
+    OPERATION_REGISTRY_STATS_KEY,
+)
 from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import FullTracesReport
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import StatsReport
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import Trace
 from graphene_tornado.ext.apollo_engine_reporting.tests.schema import schema
 from graphene_tornado.ext.apollo_engine_reporting.tests.test_engine_extension import (
     QUERY,
 )
+from graphene_tornado.operation_registry import ForbiddenOperationError
+from graphene_tornado.operation_registry import OperationRegistry
 from graphene_tornado.tests.http_helper import HttpHelper
 from graphene_tornado.tests.test_graphql import GRAPHQL_HEADER
 from graphene_tornado.tests.test_graphql import response_json
@@ -41,7 +52,7 @@ class RecordingEngineReportingAgent(EngineReportingAgent):
         EngineReportingAgent.__init__(self, options, schema_hash)
         self.data = []
 
-    async def post_data(self, data):
+    async def post_data(self, data, endpoint_url=None):
         self.data.append(data)
 
     def reset(self):
@@ -91,7 +102,9 @@ def reset():
 @pytest.mark.gen_test
 def test_can_send_report_to_engine(http_helper):
     response = yield http_helper.get(url_string(query=QUERY), headers=GRAPHQL_HEADER)
+    assert not agent.data
 
+    yield agent.send_report_and_report_errors()
     report = _deserialize(agent.data[0])
 
     assert report.header.hostname == SERVICE_HEADER_DEFAULTS.get("hostname")
@@ -111,6 +124,292 @@ def test_can_send_report_to_engine(http_helper):
     assert "data" in response_json(response)
 
 
+@pytest.mark.gen_test
+def test_traces_are_buffered_until_the_size_threshold():
+    agent = RecordingEngineReportingAgent(EngineReportingOptions(api_key="test"), "hash")
+    agent.max_uncompressed_report_size = agent.report_size + 200
+    document = parse(QUERY)
+    try:
+        yield agent.add_trace("", document, QUERY, _trace())
+        assert not agent.data
+        assert len(agent.report) == 1
+
+        # The full report is taken as soon as its flush starts in the background
+        while len(agent.report):
+            yield agent.add_trace("", document, QUERY, _trace())
+        while not agent.data:
+            yield tornado.gen.sleep(0.01)
+        assert len(agent.report) == 0
+
+        report = _deserialize(agent.data[0])
+        (traces_per_query,) = report.traces_per_query.values()
+        assert len(traces_per_query.trace) > 1
+    finally:
+        agent.stop()
+
+
+@pytest.mark.gen_test
+def test_full_reports_are_sent_without_blocking_add_trace():
+    class BlockedAgent(EngineReportingAgent):
+        def __init__(self, options, schema_hash):
+            EngineReportingAgent.__init__(self, options, schema_hash)
+            self.uploading = tornado.locks.Event()
+            self.unblock = tornado.locks.Event()
+            self.uploads = 0
+
+        async def post_data(self, data, endpoint_url=None):
+            self.uploads += 1
+            self.uploading.set()
+            await self.unblock.wait()
+
+    agent = BlockedAgent(EngineReportingOptions(api_key="test"), "hash")
+    agent.max_uncompressed_report_size = agent.report_size + 200
+    document = parse(QUERY)
+    try:
+        while not agent.uploading.is_set():
+            yield agent.add_trace("", document, QUERY, _trace())
+
+        # The upload is stuck, but traces are still accepted and no second flush starts
+        while agent.report_size < agent.max_uncompressed_report_size:
+            yield agent.add_trace("", document, QUERY, _trace())
+        yield agent.add_trace("", document, QUERY, _trace())
+        yield tornado.gen.sleep(0.01)
+        assert agent.uploads == 1
+        assert agent.report_size > agent.max_uncompressed_report_size
+
+        agent.unblock.set()
+        while agent.uploads < 2:
+            yield agent.add_trace("", document, QUERY, _trace())
+            yield tornado.gen.sleep(0.01)
+    finally:
+        agent.stop()
+
+
+@pytest.mark.gen_test
+def test_traces_are_sent_on_the_report_interval():
+    agent = RecordingEngineReportingAgent(
+        EngineReportingOptions(api_key="test", report_interval_ms=10), "hash"
+    )
+    document = parse(QUERY)
+    try:
+        yield agent.add_trace("", document, QUERY, _trace())
+        yield agent.add_trace("", document, QUERY, _trace())
+        assert not agent.data
+
+        while not agent.data:
+            yield tornado.gen.sleep(0.01)
+        report = _deserialize(agent.data[0])
+        (traces_per_query,) = report.traces_per_query.values()
+        assert len(traces_per_query.trace) == 2
+    finally:
+        agent.stop()
+
+
+@pytest.mark.gen_test
+def test_reports_are_compressed_off_the_ioloop(monkeypatch):
+    threads = []
+    serialize = engine_agent._serialize
+
+    def recording_serialize(report, compression_level):
+        threads.append(threading.current_thread())
+        return serialize(report, compression_level)
+
+    monkeypatch.setattr(engine_agent, "_serialize", recording_serialize)
+    agent = RecordingEngineReportingAgent(EngineReportingOptions(api_key="test"), "hash")
+    yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+    yield agent.send_report()
+
+    assert threads and threads[0] is not threading.current_thread()
+    assert len(_deserialize(agent.data[0]).traces_per_query) == 1
+
+
+@pytest.mark.gen_test
+def test_compression_level_is_configurable():
+    sizes = []
+    for level in (0, 9):
+        agent = RecordingEngineReportingAgent(
+            EngineReportingOptions(api_key="test", compression_level=level), "hash"
+        )
+        for _ in range(20):
+            yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+        report_size = agent.report_size
+        yield agent.send_report()
+
+        assert len(_deserialize(agent.data[0]).traces_per_query) == 1
+        sizes.append((len(agent.data[0]), report_size))
+
+    (stored, report_size), (compressed, _) = sizes
+    assert stored > report_size > compressed
+
+
+@pytest.mark.gen_test
+def test_stats_are_reported_with_sampled_traces():
+    class StatsRecordingAgent(EngineReportingAgent):
+        def __init__(self, options, schema_hash):
+            EngineReportingAgent.__init__(self, options, schema_hash)
+            self.posts = []
+
+        async def post_data(self, data, endpoint_url=None):
+            self.posts.append((endpoint_url or self.endpoint_url, data))
+
+    agent = StatsRecordingAgent(
+        EngineReportingOptions(
+            api_key="test", report_stats=True, trace_sample_rate=0.5
+        ),
+        "hash",
+    )
+    document = parse(QUERY)
+    try:
+        for _ in range(100):
+            yield agent.add_trace("", document, QUERY, _trace())
+        yield agent.send_report()
+    finally:
+        agent.stop()
+
+    (stats_url, stats_data), (traces_url, traces_data) = agent.posts
+    assert stats_url == agent.stats_endpoint_url
+    assert traces_url == agent.endpoint_url
+
+    stats = StatsReport.FromString(gzip.decompress(stats_data))
+    (query_stats,) = stats.per_query.values()
+    assert query_stats.query_stats_with_context[0].query_latency_stats.request_count == 100
+
+    (traces,) = _deserialize(traces_data).traces_per_query.values()
+    assert 0 < len(traces.trace) < 100
+
+
+@pytest.mark.gen_test
+def test_operation_registry_counts_are_reported_as_stats():
+    registry = OperationRegistry(schema, [{"body": QUERY}])
+    agent = RecordingEngineReportingAgent(
+        EngineReportingOptions(api_key="test", operation_registry=registry), "hash"
+    )
+    with pytest.raises(ForbiddenOperationError):
+        registry.resolve("unknown", None, None, ("web", "1.0"))
+    registry.resolve(None, QUERY, None, ("web", "1.0"))
+
+    yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+    yield agent.send_report()
+    agent.stop()
+
+    stats_data, traces_data = agent.data
+    stats = StatsReport.FromString(gzip.decompress(stats_data))
+    web = stats.per_query[OPERATION_REGISTRY_STATS_KEY].per_client_name["web"]
+    assert web.registered_operation_count_per_version == {"1.0": 1}
+    assert web.forbidden_operation_count_per_version == {"1.0": 1}
+    assert not registry.registered and not registry.unregistered
+    assert len(_deserialize(traces_data).traces_per_query) == 1
+
+
+@pytest.mark.gen_test
+def test_traces_beyond_the_buffer_limits_are_dropped():
+    agent = RecordingEngineReportingAgent(
+        EngineReportingOptions(api_key="test", max_buffered_traces=3), "hash"
+    )
+    document = parse(QUERY)
+    try:
+        for _ in range(5):
+            yield agent.add_trace("", document, QUERY, _trace())
+        assert agent.report.trace_count == 3
+        assert agent.dropped_traces == 2
+    finally:
+        agent.stop()
+
+
+@pytest.mark.gen_test
+def test_reports_being_uploaded_count_towards_the_limits():
+    class BlockedAgent(RecordingEngineReportingAgent):
+        async def post_data(self, data, endpoint_url=None):
+            await uploaded.wait()
+            self.data.append(data)
+
+    uploaded = tornado.locks.Event()
+    agent = BlockedAgent(
+        EngineReportingOptions(api_key="test", max_buffered_traces=2), "hash"
+    )
+    document = parse(QUERY)
+    try:
+        yield agent.add_trace("", document, QUERY, _trace())
+        yield agent.add_trace("", document, QUERY, _trace())
+        send = agent.send_report()
+        yield tornado.gen.moment
+
+        yield agent.add_trace("", document, QUERY, _trace())
+        assert agent.dropped_traces == 1
+
+        uploaded.set()
+        yield send
+        yield agent.add_trace("", document, QUERY, _trace())
+        assert agent.report.trace_count == 1
+        assert agent.dropped_traces == 1
+    finally:
+        agent.stop()
+
+
+@pytest.mark.gen_test
+def test_traces_beyond_the_buffer_limits_are_downsampled():
+    agent = RecordingEngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test", max_buffered_traces=100, overflow_policy="sample"
+        ),
+        "hash",
+    )
+    document = parse(QUERY)
+    try:
+        for _ in range(300):
+            yield agent.add_trace("", document, QUERY, _trace())
+        assert 50 < agent.report.trace_count <= 100
+        assert agent.dropped_traces == 300 - agent.report.trace_count
+    finally:
+        agent.stop()
+
+
+@pytest.mark.gen_test
+def test_traces_beyond_the_buffer_limits_are_aggregated():
+    class StatsRecordingAgent(RecordingEngineReportingAgent):
+        async def post_data(self, data, endpoint_url=None):
+            self.data.append((endpoint_url, data))
+
+    agent = StatsRecordingAgent(
+        EngineReportingOptions(
+            api_key="test", max_buffered_traces=2, overflow_policy="stats"
+        ),
+        "hash",
+    )
+    document = parse(QUERY)
+    try:
+        for _ in range(5):
+            yield agent.add_trace("", document, QUERY, _trace())
+        assert agent.aggregated_traces == 3
+        assert agent.dropped_traces == 0
+        yield agent.send_report()
+        assert agent.stats is None
+    finally:
+        agent.stop()
+
+    (stats_url, stats_data), (traces_url, traces_data) = agent.data
+    assert stats_url == agent.stats_endpoint_url
+    stats = StatsReport.FromString(gzip.decompress(stats_data))
+    (query_stats,) = stats.per_query.values()
+    assert query_stats.query_stats_with_context[0].query_latency_stats.request_count == 3
+    (traces,) = _deserialize(traces_data).traces_per_query.values()
+    assert len(traces.trace) == 2
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(ValueError):
+        EngineReportingAgent(
+            EngineReportingOptions(api_key="test", overflow_policy="block"), "hash"
+        )
+
+
+def _trace():
+    trace = Trace()
+    trace.start_time.GetCurrentTime()
+    trace.end_time.GetCurrentTime()
+    return trace
+
+
 def _deserialize(message):
     fileobj = BytesIO(message) if six.PY3 else StringIO(message)
     content = gzip.GzipFile(fileobj=fileobj).read()
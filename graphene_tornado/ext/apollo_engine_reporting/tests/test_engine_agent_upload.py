@@ -0,0 +1,455 @@
+import gzip
+import os
+import signal
+
+import pytest
+import tornado
+import tornado.gen
+from graphql import parse
+from tornado.httpclient import AsyncHTTPClient
+from tornado.httpclient import HTTPClientError
+from tornado.ioloop import IOLoop
+
+from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
+    EngineReportingAgent,
+)
+from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
+    EngineReportingOptions,
+)
+from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
+    ReportRejectedError,
+)
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import FullTracesReport
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import ReportHeader
+from graphene_tornado.ext.apollo_engine_reporting.tests.fake_ingress import FakeIngress
+from graphene_tornado.ext.apollo_engine_reporting.tests.fake_ingress import RESET
+from graphene_tornado.ext.apollo_engine_reporting.tests.fake_ingress import STATS_PATH
+from graphene_tornado.ext.apollo_engine_reporting.tests.fake_ingress import (
+    TRACES_PATH,
+)
+from graphene_tornado.ext.apollo_engine_reporting.tests.test_engine_agent import (
+    _deserialize,
+)
+from graphene_tornado.ext.apollo_engine_reporting.tests.test_engine_agent import (
+    _trace,
+)
+from graphene_tornado.ext.apollo_engine_reporting.tests.test_engine_extension import (
+    QUERY,
+)
+
+
+def _report(schema_hash: str) -> bytes:
+    return gzip.compress(
+        FullTracesReport(header=ReportHeader(schema_hash=schema_hash)).SerializeToString()
+    )
+
+
+def _schema_hashes(ingress):
+    return [report.header.schema_hash for report in ingress.traces_reports]
+
+
+@pytest.fixture
+def ingress():
+    return FakeIngress(api_key="test")
+
+
+@pytest.fixture
+def app(ingress):
+    return ingress.application()
+
+
+@pytest.fixture
+def agent(http_server, base_url):
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test",
+            endpoint_url=base_url + TRACES_PATH,
+            minimum_retry_delay_ms=1,
+            max_attempts=3,
+        ),
+        "hash",
+    )
+    yield agent
+    agent.stop()
+    agent.close()
+
+
+@pytest.mark.gen_test
+def test_uploads_reuse_the_http_client(agent, ingress):
+    yield agent.post_data(_report("one"))
+    http_client = agent.http_client
+    yield agent.post_data(_report("two"))
+
+    assert agent.http_client is http_client
+    assert _schema_hashes(ingress) == ["one", "two"]
+
+
+@pytest.mark.gen_test
+def test_server_errors_are_retried(agent, ingress):
+    ingress.failures = [503, 500]
+    yield agent.post_data(_report("report"))
+
+    assert ingress.requests == 3
+    assert _schema_hashes(ingress) == ["report"]
+
+
+@pytest.mark.gen_test
+def test_retries_are_bounded_by_max_attempts(agent, ingress):
+    ingress.failures = [503, 503, 503, 503]
+    with pytest.raises(ValueError):
+        yield agent.post_data(_report("report"))
+
+    assert ingress.requests == 3
+
+
+@pytest.mark.gen_test
+def test_client_errors_are_not_retried(agent, ingress):
+    ingress.failures = [400]
+    with pytest.raises(ValueError):
+        yield agent.post_data(_report("report"))
+
+    assert ingress.requests == 1
+
+
+@pytest.mark.gen_test
+def test_connection_resets_are_retried(agent, ingress):
+    ingress.failures = [RESET, RESET]
+    yield agent.post_data(_report("report"))
+
+    assert ingress.requests == 3
+    assert _schema_hashes(ingress) == ["report"]
+
+
+@pytest.mark.gen_test
+def test_reports_with_another_api_key_are_rejected(agent, ingress):
+    ingress.api_key = "other"
+    with pytest.raises(ValueError):
+        yield agent.post_data(_report("report"))
+
+    assert ingress.traces_reports == []
+
+
+@pytest.mark.gen_test
+def test_stats_reports_are_sent_to_the_stats_endpoint(http_server, base_url, ingress):
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test",
+            endpoint_url=base_url + TRACES_PATH,
+            stats_endpoint_url=base_url + STATS_PATH,
+            report_stats=True,
+            trace_sample_rate=0,
+        ),
+        "hash",
+    )
+    try:
+        for _ in range(3):
+            yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+        yield agent.send_report()
+
+        assert ingress.traces_reports == []
+        (report,) = ingress.stats_reports
+        assert report.header.schema_hash == "hash"
+        assert ingress.stats_request_count == 3
+    finally:
+        agent.stop()
+        agent.close()
+
+
+@pytest.mark.gen_test
+def test_attempts_time_out(http_server, base_url, ingress):
+    ingress.latency = 0.5
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test",
+            endpoint_url=base_url + TRACES_PATH,
+            request_timeout_ms=50,
+            minimum_retry_delay_ms=1,
+            max_attempts=2,
+        ),
+        "hash",
+    )
+    try:
+        with pytest.raises(HTTPClientError):
+            yield agent.post_data(_report("report"))
+        assert ingress.requests == 2
+    finally:
+        agent.close()
+
+
+@pytest.mark.gen_test
+def test_concurrent_uploads_are_bounded(http_server, base_url, ingress):
+    ingress.latency = 0.05
+    http_client = AsyncHTTPClient(force_instance=True)
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test",
+            endpoint_url=base_url + TRACES_PATH,
+            http_client=http_client,
+            max_concurrent_uploads=2,
+        ),
+        "hash",
+    )
+    try:
+        yield [agent.post_data(_report("report")) for _ in range(6)]
+
+        assert ingress.requests == 6
+        assert ingress.max_concurrent == 2
+        assert agent.http_client is http_client
+    finally:
+        agent.close()
+        http_client.close()
+
+
+@pytest.mark.gen_test
+def test_failed_reports_are_spooled_and_replayed(http_server, base_url, ingress, tmpdir):
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test",
+            endpoint_url=base_url + TRACES_PATH,
+            max_attempts=1,
+            spool_directory=str(tmpdir),
+        ),
+        "hash",
+    )
+    try:
+        ingress.failures = [503, 503]
+        for operation_name in ("first", "second"):
+            yield agent.add_trace(operation_name, parse(QUERY), QUERY, _trace())
+            with pytest.raises(ValueError):
+                yield agent.send_report()
+        assert len(agent.spool) == 2
+
+        ingress.failures = [503]
+        assert not (yield agent.replay_spooled_report())
+        assert len(agent.spool) == 2
+
+        assert (yield agent.replay_spooled_report())
+        assert (yield agent.replay_spooled_report())
+        assert not (yield agent.replay_spooled_report())
+        assert [
+            list(_deserialize(body).traces_per_query)[0].split("\n")[0]
+            for body in ingress.bodies
+        ] == ["# first", "# second"]
+        assert agent.spool.replayed == 2
+        assert len(agent.spool) == 0
+    finally:
+        agent.close()
+
+
+@pytest.mark.gen_test
+def test_rejected_reports_are_not_spooled(http_server, base_url, ingress, tmpdir):
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test",
+            endpoint_url=base_url + TRACES_PATH,
+            spool_directory=str(tmpdir),
+        ),
+        "hash",
+    )
+    try:
+        ingress.failures = [400]
+        yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+        with pytest.raises(ReportRejectedError) as info:
+            yield agent.send_report()
+        assert info.value.code == 400
+        assert str(info.value) == (
+            "Error sending report to Engine servers (HTTP status 400): "
+        )
+        assert len(agent.spool) == 0
+        assert ingress.requests == 1
+    finally:
+        agent.close()
+
+
+@pytest.mark.gen_test
+def test_spooled_reports_rejected_on_replay_are_dropped(
+    http_server, base_url, ingress, tmpdir
+):
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test",
+            endpoint_url=base_url + TRACES_PATH,
+            max_attempts=1,
+            spool_directory=str(tmpdir),
+        ),
+        "hash",
+    )
+    try:
+        ingress.failures = [503, 503]
+        for operation_name in ("first", "second"):
+            yield agent.add_trace(operation_name, parse(QUERY), QUERY, _trace())
+            with pytest.raises(ValueError):
+                yield agent.send_report()
+        assert len(agent.spool) == 2
+
+        # A 400 at the head of the spool does not hold back the report behind it
+        ingress.failures = [400]
+        assert not (yield agent.replay_spooled_report())
+        assert agent.spool.dropped == 1
+        assert len(agent.spool) == 1
+
+        assert (yield agent.replay_spooled_report())
+        assert [
+            list(_deserialize(body).traces_per_query)[0].split("\n")[0]
+            for body in ingress.bodies
+        ] == ["# second"]
+        assert agent.spool.replayed == 1
+        assert len(agent.spool) == 0
+    finally:
+        agent.close()
+
+
+@pytest.mark.gen_test
+def test_shutdown_sends_buffered_traces(agent, ingress):
+    yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+    yield agent.shutdown()
+
+    (body,) = ingress.bodies
+    (traces,) = _deserialize(body).traces_per_query.values()
+    assert len(traces.trace) == 1
+
+    yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+    assert len(agent.report) == 0
+
+
+@pytest.mark.gen_test
+def test_shutdown_stops_the_executor(agent, ingress):
+    yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+    yield agent.shutdown()
+
+    assert len(ingress.bodies) == 1
+    with pytest.raises(RuntimeError):
+        agent._executor.submit(len, "")
+
+
+@pytest.mark.gen_test
+def test_shutdown_spools_what_cannot_be_sent_in_time(http_server, base_url, ingress, tmpdir):
+    ingress.latency = 1
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test",
+            endpoint_url=base_url + TRACES_PATH,
+            spool_directory=str(tmpdir),
+            shutdown_timeout_ms=50,
+        ),
+        "hash",
+    )
+    try:
+        yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+        yield agent.shutdown()
+
+        assert len(agent.spool) == 1
+        endpoint_url, data = agent.spool.peek()
+        assert endpoint_url == agent.endpoint_url
+        assert len(_deserialize(data).traces_per_query) == 1
+    finally:
+        agent.close()
+
+
+@pytest.fixture
+def sigterm_handler():
+    previous = signal.getsignal(signal.SIGTERM)
+    yield
+    signal.signal(signal.SIGTERM, previous)
+
+
+@pytest.mark.gen_test
+def test_signals_shut_the_agent_down(http_server, base_url, ingress, sigterm_handler):
+    received = []
+
+    def handle_sigterm(signum, frame):
+        received.append(signum)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test", endpoint_url=base_url + TRACES_PATH, handle_signals=True
+        ),
+        "hash",
+    )
+    try:
+        yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+        os.kill(os.getpid(), signal.SIGTERM)
+        while not received:
+            yield tornado.gen.sleep(0.01)
+
+        # The application's handler is restored and called once the reports are sent
+        assert received == [signal.SIGTERM]
+        assert signal.getsignal(signal.SIGTERM) is handle_sigterm
+        assert len(ingress.bodies) == 1
+        assert agent._stopped
+    finally:
+        agent.stop()
+        agent.close()
+
+
+@pytest.mark.gen_test
+def test_signals_chain_to_loop_signal_handlers(
+    http_server, base_url, ingress, sigterm_handler
+):
+    received = []
+    asyncio_loop = IOLoop.current().asyncio_loop
+    asyncio_loop.add_signal_handler(signal.SIGTERM, received.append, signal.SIGTERM)
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test", endpoint_url=base_url + TRACES_PATH, handle_signals=True
+        ),
+        "hash",
+    )
+    try:
+        yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+        os.kill(os.getpid(), signal.SIGTERM)
+        while not received:
+            yield tornado.gen.sleep(0.01)
+
+        # The application's loop handler is added back and called once the reports are sent
+        assert received == [signal.SIGTERM]
+        assert len(ingress.bodies) == 1
+        os.kill(os.getpid(), signal.SIGTERM)
+        while len(received) < 2:
+            yield tornado.gen.sleep(0.01)
+        assert len(ingress.bodies) == 1
+    finally:
+        asyncio_loop.remove_signal_handler(signal.SIGTERM)
+        agent.stop()
+        agent.close()
+
+
+@pytest.mark.gen_test
+def test_signals_take_their_default_action_after_shutdown(
+    http_server, base_url, ingress, sigterm_handler, monkeypatch
+):
+    kill = os.kill
+    raised = []
+    monkeypatch.setattr(os, "kill", lambda pid, signum: raised.append((pid, signum)))
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    agent = EngineReportingAgent(
+        EngineReportingOptions(
+            api_key="test", endpoint_url=base_url + TRACES_PATH, handle_signals=True
+        ),
+        "hash",
+    )
+    try:
+        yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+        kill(os.getpid(), signal.SIGTERM)
+        while not raised:
+            yield tornado.gen.sleep(0.01)
+
+        assert raised == [(os.getpid(), signal.SIGTERM)]
+        assert signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
+        assert len(ingress.bodies) == 1
+    finally:
+        agent.stop()
+        agent.close()
+
+
+@pytest.mark.gen_test
+def test_shutdown_waits_for_reports_being_sent(agent, ingress):
+    ingress.latency = 0.1
+    yield agent.add_trace("", parse(QUERY), QUERY, _trace())
+    IOLoop.current().spawn_callback(agent.send_report_and_report_errors)
+    while not ingress.concurrent:
+        yield tornado.gen.sleep(0.01)
+
+    yield agent.shutdown()
+    assert len(ingress.bodies) == 1
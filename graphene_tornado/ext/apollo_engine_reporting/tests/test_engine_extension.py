@@ -8,10 +8,12 @@ from graphql import parse
 from graphene_tornado.ext.apollo_engine_reporting.engine_agent import (
     EngineReportingOptions,
 )
+from graphene_tornado.ext.apollo_engine_reporting.engine_extension import ClientInfo
 from graphene_tornado.ext.apollo_engine_reporting.engine_extension import (
     EngineReportingExtension,
 )
 from graphene_tornado.ext.apollo_engine_reporting.tests.schema import schema
+from graphene_tornado.operation_registry import OperationRegistry
 from graphene_tornado.tests.http_helper import HttpHelper
 from graphene_tornado.tests.test_graphql import GRAPHQL_HEADER
 from graphene_tornado.tests.test_graphql import response_json
@@ -33,9 +35,23 @@ QUERY = """
 
 
 engine_options = EngineReportingOptions(api_key="test")
+slow_request_options = EngineReportingOptions(
+    api_key="test", field_trace_threshold_ms=0
+)
+fast_request_options = EngineReportingOptions(
+    api_key="test", field_trace_threshold_ms=60000
+)
+client_info_options = EngineReportingOptions(
+    api_key="test",
+    generate_client_info=lambda request: ClientInfo(
+        request.headers.get("X-App", ""), "ref", "1.0"
+    ),
+)
 
 traces = []
 
+registry = OperationRegistry(schema, [{"body": QUERY}])
+
 
 async def add_trace(operation_name, document_ast, query_string, trace):
     traces.append((operation_name, document_ast, query_string, trace))
@@ -44,12 +60,45 @@ async def add_trace(operation_name, document_ast, query_string, trace):
 class ExampleEngineReportingApplication(tornado.web.Application):
     def __init__(self):
         engine_extension = lambda: EngineReportingExtension(engine_options, add_trace)
+        slow_extension = lambda: EngineReportingExtension(
+            slow_request_options, add_trace
+        )
+        fast_extension = lambda: EngineReportingExtension(
+            fast_request_options, add_trace
+        )
+        client_info_extension = lambda: EngineReportingExtension(
+            client_info_options, add_trace
+        )
         handlers = [
             (
                 r"/graphql",
                 TornadoGraphQLHandler,
                 dict(graphiql=True, schema=schema, extensions=[engine_extension]),
             ),
+            (
+                r"/graphql/slow",
+                TornadoGraphQLHandler,
+                dict(graphiql=True, schema=schema, extensions=[slow_extension]),
+            ),
+            (
+                r"/graphql/registered",
+                TornadoGraphQLHandler,
+                dict(
+                    schema=schema,
+                    extensions=[engine_extension],
+                    operation_registry=registry,
+                ),
+            ),
+            (
+                r"/graphql/fast",
+                TornadoGraphQLHandler,
+                dict(graphiql=True, schema=schema, extensions=[fast_extension]),
+            ),
+            (
+                r"/graphql/client",
+                TornadoGraphQLHandler,
+                dict(schema=schema, extensions=[client_info_extension]),
+            ),
             (
                 r"/graphql/batch",
                 TornadoGraphQLHandler,
@@ -91,3 +140,82 @@ def test_can_send_report_to_engine(http_helper, snapshot):
     )
 
     snapshot.assert_match(trace_json)
+
+
+@pytest.mark.gen_test()
+def test_tail_tracing_records_fields_for_slow_requests(http_helper):
+    traces.clear()
+    response = yield http_helper.get(
+        url_string("/graphql/slow", query=QUERY),
+        headers=GRAPHQL_HEADER,
+    )
+    assert response.code == 200
+
+    assert len(traces) == 1
+    trace = traces[0][3]
+    assert [child.response_name for child in trace.root.child[0:2]] == [
+        "author",
+        "aBoolean",
+    ]
+    author = trace.root.child[0]
+    assert author.parent_type == "Query"
+    assert author.type == "User"
+    assert author.end_time >= author.start_time
+    assert {"name", "posts", "id"} <= _response_names(trace.root)
+
+
+@pytest.mark.gen_test()
+def test_tail_tracing_skips_fields_for_fast_requests(http_helper):
+    traces.clear()
+    response = yield http_helper.get(
+        url_string("/graphql/fast", query=QUERY),
+        headers=GRAPHQL_HEADER,
+    )
+    assert response.code == 200
+
+    assert len(traces) == 1
+    operation_name, document_ast, query_string, trace = traces[0]
+    assert QUERY == query_string
+    assert trace.duration_ns > 0
+    assert len(trace.root.child) == 0
+
+
+@pytest.mark.gen_test()
+def test_registered_operations_are_flagged(http_helper):
+    traces.clear()
+    operation = next(iter(registry.operations.values()))
+    response = yield http_helper.get(
+        url_string("/graphql/registered", operationId=operation.id),
+        headers=GRAPHQL_HEADER,
+    )
+    assert response.code == 200
+
+    operation_name, document_ast, query_string, trace = traces[0]
+    assert QUERY == query_string
+    assert document_ast is operation.document
+    assert trace.registered_operation
+    assert trace.signature == operation.signature
+
+
+@pytest.mark.gen_test()
+def test_client_info_is_generated_by_the_options(http_helper):
+    traces.clear()
+    response = yield http_helper.get(
+        url_string("/graphql/client", query=QUERY),
+        headers=dict(GRAPHQL_HEADER, **{"X-App": "web"}),
+    )
+    assert response.code == 200
+
+    operation_name, document_ast, query_string, trace = traces[0]
+    assert trace.client_name == "web"
+    assert trace.client_reference_id == "ref"
+    assert trace.client_version == "1.0"
+
+
+def _response_names(node):
+    names = set()
+    for child in node.child:
+        if child.response_name:
+            names.add(child.response_name)
+        names |= _response_names(child)
+    return names
@@ -0,0 +1,23 @@
+from graphene_tornado.ext.apollo_engine_reporting.operation_registry_stats import (
+    client_name_stats,
+)
+from graphene_tornado.operation_registry import OperationRegistry
+from graphene_tornado.schema import schema
+
+
+def test_client_name_stats():
+    registry = OperationRegistry(schema)
+    registry.registered[("web", "1.0")] += 3
+    registry.forbidden[("web", "1.0")] += 1
+    registry.unregistered[("web", "1.0")] += 1
+    registry.unregistered[("ios", "2.0")] += 2
+
+    stats = client_name_stats(registry)
+
+    assert stats["web"].registered_operation_count_per_version == {"1.0": 3}
+    assert stats["web"].forbidden_operation_count_per_version == {"1.0": 2}
+    assert stats["ios"].forbidden_operation_count_per_version == {"2.0": 2}
+    assert stats["web"].requests_count_per_version == {"1.0": 5}
+
+    # The counters are reset once they have been converted
+    assert client_name_stats(registry) == {}
@@ -0,0 +1,53 @@
+from graphene_tornado.ext.apollo_engine_reporting.report_builder import (
+    FullTracesReportBuilder,
+)
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import FullTracesReport
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import ReportHeader
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import Trace
+
+
+def _header():
+    return ReportHeader(hostname="host", agent_version="1", schema_hash="hash")
+
+
+def _trace(duration_ns, field_name="user"):
+    trace = Trace(duration_ns=duration_ns)
+    trace.start_time.FromNanoseconds(1000)
+    trace.root.child.add(response_name=field_name, type="User", end_time=duration_ns)
+    return trace
+
+
+def test_serialized_report_matches_protobuf():
+    builder = FullTracesReportBuilder(_header())
+    expected = FullTracesReport(header=_header())
+    keys = ["# A\n{a}", "# B\n{b}", "# ü\n{" + "x" * 300 + "}"]
+    for i in range(200):
+        key = keys[i % len(keys)]
+        trace = _trace(i * 1000000, "f" * (i % 150))
+        builder.add_trace(key, trace)
+        expected.traces_per_query[key].trace.extend([trace])
+
+        assert builder.size == len(builder.serialize())
+
+    assert FullTracesReport.FromString(builder.serialize()) == expected
+    assert builder.to_message() == expected
+    assert builder.size == expected.ByteSize()
+    assert len(builder) == 3
+    assert builder.trace_count == 200
+
+
+def test_empty_report():
+    builder = FullTracesReportBuilder(_header())
+    assert len(builder) == 0
+    assert builder.to_message() == FullTracesReport(header=_header())
+    assert builder.size == len(builder.serialize())
+
+
+def test_later_changes_to_traces_are_not_reported():
+    builder = FullTracesReportBuilder(_header())
+    trace = _trace(5)
+    builder.add_trace("# -\n{a}", trace)
+    trace.duration_ns = 10
+
+    (traces,) = builder.to_message().traces_per_query.values()
+    assert traces.trace[0].duration_ns == 5
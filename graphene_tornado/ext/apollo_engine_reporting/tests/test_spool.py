@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from graphene_tornado.ext.apollo_engine_reporting.spool import ReportSpool
+
+URL = "http://localhost/ingress"
+
+
+def _drain(spool):
+    reports = []
+    while True:
+        record = spool.peek()
+        if record is None:
+            return reports
+        reports.append(record)
+        spool.advance()
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_reports_are_replayed_in_order(tmpdir, use_mmap):
+    spool = ReportSpool(str(tmpdir), segment_size=100, use_mmap=use_mmap)
+    reports = [("{}/{}".format(URL, i), bytes([i]) * 40) for i in range(10)]
+    for url, report in reports:
+        assert spool.append(url, report)
+
+    assert len(spool) == 10
+    assert len(os.listdir(str(tmpdir))) > 1
+
+    assert spool.peek() == reports[0]
+    assert spool.peek() == reports[0]
+    assert _drain(spool) == reports
+    assert spool.replayed == 10
+    assert len(spool) == 0
+    assert os.listdir(str(tmpdir)) == []
+
+
+def test_oldest_segments_are_evicted_beyond_the_budget(tmpdir):
+    spool = ReportSpool(str(tmpdir), max_bytes=1000, segment_size=200)
+    for i in range(30):
+        spool.append(URL, bytes([i]) * 80)
+
+    assert spool.size <= 1000 + 200
+    assert spool.dropped == 30 - len(spool)
+    assert _drain(spool)[-1] == (URL, bytes([29]) * 80)
+
+
+def test_reports_larger_than_the_budget_are_dropped(tmpdir):
+    spool = ReportSpool(str(tmpdir), max_bytes=100)
+    assert not spool.append(URL, b"x" * 100)
+    assert spool.dropped == 1
+    assert len(spool) == 0
+
+
+def test_rejected_reports_are_dropped(tmpdir):
+    spool = ReportSpool(str(tmpdir))
+    spool.append(URL, b"rejected")
+    spool.append(URL, b"accepted")
+
+    assert spool.peek() == (URL, b"rejected")
+    spool.drop()
+    assert spool.dropped == 1
+    assert _drain(spool) == [(URL, b"accepted")]
+    assert spool.replayed == 1
+
+
+def test_spool_is_recovered_by_a_new_process(tmpdir):
+    spool = ReportSpool(str(tmpdir), segment_size=100)
+    for i in range(5):
+        spool.append(URL, bytes([i]) * 40)
+    spool.peek()
+    spool.advance()
+
+    # Progress within a segment is not persisted, so its replayed reports are delivered again
+    recovered = ReportSpool(str(tmpdir), segment_size=100)
+    assert len(recovered) == 5
+    recovered.append(URL, b"new")
+    assert [report for _, report in _drain(recovered)] == [
+        bytes([i]) * 40 for i in range(5)
+    ] + [b"new"]
+
+
+def test_torn_records_are_dropped(tmpdir):
+    spool = ReportSpool(str(tmpdir))
+    spool.append(URL, b"complete")
+    spool.append(URL, b"torn" * 10)
+    (name,) = os.listdir(str(tmpdir))
+    path = os.path.join(str(tmpdir), name)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+
+    recovered = ReportSpool(str(tmpdir))
+    assert len(recovered) == 1
+    assert _drain(recovered) == [(URL, b"complete")]
+
+
+def test_corrupted_records_are_dropped(tmpdir):
+    spool = ReportSpool(str(tmpdir))
+    spool.append(URL, b"corrupted")
+    spool.append(URL, b"lost")
+    (name,) = os.listdir(str(tmpdir))
+    path = os.path.join(str(tmpdir), name)
+    with open(path, "r+b") as f:
+        f.seek(20)
+        f.write(b"X")
+
+    assert _drain(spool) == []
+    assert spool.dropped == 2
@@ -0,0 +1,99 @@
+from graphene_tornado.ext.apollo_engine_reporting.operation_registry_stats import (
+    OPERATION_REGISTRY_STATS_KEY,
+)
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import ClientNameStats
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import ReportHeader
+from graphene_tornado.ext.apollo_engine_reporting.reports_pb2 import Trace
+from graphene_tornado.ext.apollo_engine_reporting.stats_aggregator import (
+    StatsAggregator,
+)
+
+KEY = "# Q\nquery Q{user{name}}"
+
+
+def _trace(duration_ns, client_name="web", error=False):
+    trace = Trace(duration_ns=duration_ns, client_name=client_name, client_version="1")
+    user = trace.root.child.add(
+        response_name="user", type="User", parent_type="Query", end_time=duration_ns
+    )
+    friends = user.child.add(
+        response_name="friends",
+        type="[User]",
+        parent_type="User",
+        end_time=duration_ns,
+    )
+    for i in range(2):
+        friend = friends.child.add(index=i)
+        name = friend.child.add(
+            response_name="alias",
+            original_field_name="name",
+            type="String",
+            parent_type="User",
+            start_time=1000,
+            end_time=3000,
+        )
+        if error:
+            name.error.add(message="boom")
+    return trace
+
+
+def test_query_latency_stats_per_context():
+    stats = StatsAggregator()
+    stats.add_trace(KEY, _trace(1000))
+    stats.add_trace(KEY, _trace(1000))
+    stats.add_trace(KEY, _trace(1100, error=True))
+    stats.add_trace(KEY, _trace(1000, client_name="ios"))
+
+    report = stats.to_message(ReportHeader(hostname="host"))
+    assert report.header.hostname == "host"
+    assert list(report.per_query) == [KEY]
+    assert report.end_time.ToNanoseconds() >= report.start_time.ToNanoseconds()
+
+    query_stats = report.per_query[KEY].query_stats_with_context
+    by_client = {s.context.client_name: s.query_latency_stats for s in query_stats}
+    assert by_client["web"].request_count == 3
+    assert by_client["web"].requests_with_errors_count == 1
+    assert list(by_client["web"].latency_count) == [2, 1]
+    assert by_client["ios"].request_count == 1
+
+
+def test_field_stats_are_keyed_by_parent_type_and_field_name():
+    stats = StatsAggregator()
+    stats.add_trace(KEY, _trace(5000000))
+    stats.add_trace(KEY, _trace(5000000, error=True))
+
+    report = stats.to_message(ReportHeader())
+    (type_stats,) = report.per_query[KEY].type_stats_with_context
+    assert type_stats.context.client_name == "web"
+    assert set(type_stats.per_type_stat) == {"Query", "User"}
+    assert set(type_stats.per_type_stat["User"].per_field_stat) == {"friends", "name"}
+
+    name = type_stats.per_type_stat["User"].per_field_stat["name"]
+    assert name.return_type == "String"
+    assert name.count == 4
+    assert name.errors_count == 2
+    assert name.requests_with_errors_count == 2
+    # 2 microseconds is bucket 8
+    assert list(name.latency_count) == [-8, 4]
+
+    user = type_stats.per_type_stat["Query"].per_field_stat["user"]
+    assert user.return_type == "User"
+    assert user.count == 2
+    assert len(stats) == 1
+    assert stats.trace_count == 2
+
+
+def test_client_name_stats_are_merged_under_their_own_key():
+    stats = StatsAggregator()
+    assert len(stats) == 0
+    for count in (2, 3):
+        client_stats = ClientNameStats()
+        client_stats.forbidden_operation_count_per_version["1"] = count
+        client_stats.requests_count_per_version["1"] = count
+        stats.add_client_name_stats({"web": client_stats})
+    assert len(stats) == 1
+
+    report = stats.to_message(ReportHeader())
+    web = report.per_query[OPERATION_REGISTRY_STATS_KEY].per_client_name["web"]
+    assert web.forbidden_operation_count_per_version == {"1": 5}
+    assert web.requests_count_per_version == {"1": 5}
@@ -1,34 +1,85 @@
 import collections
+import threading
+from typing import Optional
+from typing import Tuple
+
+from graphql import DocumentNode
 
 from graphene_tornado.apollo_tooling.operation_id import (
     default_engine_reporting_signature,
 )
+from graphene_tornado.apollo_tooling.query_hash import BLAKE2B
+from graphene_tornado.apollo_tooling.query_hash import compute
+from graphene_tornado.apollo_tooling.query_hash import compute_digest
 from graphene_tornado.request_context import SIGNATURE
+from graphene_tornado.request_context import SIGNATURE_HASH_KEY
+
+
+class SignatureCache:
+    """
+    A process-wide LRU cache of engine reporting signatures, so that each distinct operation is normalized
+    once. Entries are keyed by the BLAKE2b hash of the query text and the operation name. The cache is thread safe,
+    so it can be shared with signatures computed in executors.
 
+    Args:
+        capacity: The maximum number of signatures kept
 
-class _LRUCache:
-    def __init__(self, capacity):
+    Attributes:
+        hits: The number of lookups that found a signature
+        misses: The number of lookups that had to compute the signature
+    """
+
+    def __init__(self, capacity: int = 10000) -> None:
         self.capacity = capacity
-        self.cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._cache: "collections.OrderedDict[Tuple[bytes, str], str]" = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get_or_compute(
+        self, query_string: str, operation_name: Optional[str], document: DocumentNode
+    ) -> str:
+        """
+        Returns the cached signature of an operation, computing and caching it on a miss. Anonymous
+        operations are signed with an empty operation name, as Apollo does.
+        """
+        operation_name = operation_name or ""
+        key = (compute_digest(query_string, BLAKE2B), operation_name)
+        with self._lock:
+            signature = self._cache.get(key, None)
+            if signature is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return signature
+            self.misses += 1
 
-    def get(self, key, default=None):
-        try:
-            value = self.cache.pop(key)
-            self.cache[key] = value
-            return value
-        except KeyError:
-            return default
+        # Computed outside the lock; concurrent misses for the same key compute the same value
+        signature = default_engine_reporting_signature(document, operation_name)
+        with self._lock:
+            self._cache[key] = signature
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+        return signature
 
-    def set(self, key, value):
-        try:
-            self.cache.pop(key)
-        except KeyError:
-            if len(self.cache) >= self.capacity:
-                self.cache.popitem(last=False)
-        self.cache[key] = value
+    def resize(self, capacity: int) -> None:
+        with self._lock:
+            self.capacity = capacity
+            while len(self._cache) > capacity:
+                self._cache.popitem(last=False)
 
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
 
-_SIGNATURE_CACHE = _LRUCache(10000)
+
+SIGNATURE_CACHE = SignatureCache()
 
 
 def get_signature(request_context, operation_name, document, query_string):
@@ -43,12 +94,35 @@ def get_signature(request_context, operation_name, document, query_string):
     """
     signature = request_context.get(SIGNATURE, None)
     if signature is None:
-        signature = _SIGNATURE_CACHE.get(query_string)
-    if signature is None:
-        if document:
-            calculate_signature = default_engine_reporting_signature
-            signature = calculate_signature(document, operation_name)
+        if document and query_string:
+            signature = SIGNATURE_CACHE.get_or_compute(
+                query_string, operation_name, document
+            )
+        elif document:
+            signature = default_engine_reporting_signature(
+                document, operation_name or ""
+            )
         elif query_string:
             signature = query_string
         request_context[SIGNATURE] = signature
     return signature
+
+
+def get_signature_hash(request_context, operation_name, document, query_string):
+    """
+    Args:
+        request_context: The request context
+        operation_name: The operation name
+        document: The document
+        query_string: The query string
+    Returns:
+        The SHA-256 hash of the signature for the query
+    """
+    signature_hash = request_context.get(SIGNATURE_HASH_KEY, None)
+    if signature_hash is None:
+        signature = get_signature(
+            request_context, operation_name, document, query_string
+        )
+        signature_hash = compute(signature)
+        request_context[SIGNATURE_HASH_KEY] = signature_hash
+    return signature_hash
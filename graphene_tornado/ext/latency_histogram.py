@@ -0,0 +1,127 @@
+"""
+A compact latency histogram using Apollo's log-scale buckets (see Apollo's docs/histograms.md).
+
+Bucket i counts durations of up to 1.1^i microseconds, with 384 buckets in all. Only the range of buckets
+between the lowest and the highest recorded one is stored, in an array of signed 64 bit integers, so a
+histogram of similar latencies takes a few hundred bytes rather than a list of 384 Python ints.
+"""
+import math
+from array import array
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+BUCKET_COUNT = 384
+_EXPONENT_LOG = math.log(1.1)
+
+
+def duration_to_bucket(duration_ns: int) -> int:
+    """
+    Returns:
+        The histogram bucket of a duration
+    """
+    if duration_ns <= 1000:
+        return 0
+    bucket = math.ceil(math.log(duration_ns / 1000.0) / _EXPONENT_LOG)
+    return min(bucket, BUCKET_COUNT - 1)
+
+
+class LatencyHistogram:
+    """
+    Recording and merging are O(1) per bucket, apart from growing the stored range.
+    """
+
+    __slots__ = ("_offset", "_counts")
+
+    def __init__(self) -> None:
+        # The bucket of _counts[0]
+        self._offset = 0
+        self._counts = array("q")
+
+    def record(self, duration_ns: int, count: int = 1) -> None:
+        self.increment_bucket(duration_to_bucket(duration_ns), count)
+
+    def increment_bucket(self, bucket: int, count: int = 1) -> None:
+        self._ensure_range(bucket, bucket)
+        self._counts[bucket - self._offset] += count
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """
+        Adds the counts of another histogram to this one.
+        """
+        if not other._counts:
+            return
+        self._ensure_range(other._offset, other._offset + len(other._counts) - 1)
+        start = other._offset - self._offset
+        counts = self._counts
+        for i, count in enumerate(other._counts, start):
+            if count:
+                counts[i] += count
+
+    def _ensure_range(self, low: int, high: int) -> None:
+        counts = self._counts
+        if not counts:
+            self._offset = low
+            self._counts = array("q", bytes(8 * (high - low + 1)))
+            return
+        if low < self._offset:
+            grown = array("q", bytes(8 * (self._offset - low)))
+            grown.extend(counts)
+            self._counts = counts = grown
+            self._offset = low
+        missing = high - self._offset + 1 - len(counts)
+        if missing > 0:
+            counts.frombytes(bytes(8 * missing))
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        """
+        Yields:
+            The bucket and count of every non-empty bucket
+        """
+        for i, count in enumerate(self._counts, self._offset):
+            if count:
+                yield i, count
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            The number of recorded durations
+        """
+        return sum(self._counts)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, LatencyHistogram) and list(self) == list(other)
+
+    def to_array(self) -> List[int]:
+        """
+        Encodes the histogram in the latency_count format of QueryLatencyStats and FieldStat: a single empty
+        bucket is written as 0 and a run of n empty buckets as -n, and trailing empty buckets are omitted.
+        """
+        out: List[int] = []
+        previous = -1
+        for bucket, count in self:
+            zeroes = bucket - previous - 1
+            if zeroes == 1:
+                out.append(0)
+            elif zeroes:
+                out.append(-zeroes)
+            out.append(count)
+            previous = bucket
+        return out
+
+    @classmethod
+    def from_array(cls, encoded: Iterable[int]) -> "LatencyHistogram":
+        """
+        Decodes a histogram in the latency_count format.
+        """
+        histogram = cls()
+        bucket = 0
+        for value in encoded:
+            if value < 0:
+                bucket -= value
+                continue
+            if value:
+                histogram.increment_bucket(bucket, value)
+            bucket += 1
+        return histogram
@@ -3,10 +3,9 @@ import json
 from opencensus.trace import execution_context
 from opencensus.trace.tracers.noop_tracer import NoopTracer
 
-from graphene_tornado.apollo_tooling.query_hash import compute
 from graphene_tornado.ext.extension_helpers import get_signature
+from graphene_tornado.ext.extension_helpers import get_signature_hash
 from graphene_tornado.extension_stack import GraphQLExtension
-from graphene_tornado.request_context import SIGNATURE_HASH_KEY
 
 
 async def _pass(*args):
@@ -19,6 +18,11 @@ class OpenCensusExtension(GraphQLExtension):
         self.query_string = None
         self.document = None
 
+    def reset(self):
+        self.operation_name = None
+        self.query_string = None
+        self.document = None
+
     async def request_started(
         self,
         request,
@@ -45,13 +49,13 @@ class OpenCensusExtension(GraphQLExtension):
                 request_context, operation_name, document, query_string
             )
 
-            tracer = execution_context.get_opencensus_tracer()
-            if SIGNATURE_HASH_KEY not in request_context:
-                request_context[SIGNATURE_HASH_KEY] = compute(signature)
-            tracer.current_span().name = "gql[{}]".format(
-                request_context[SIGNATURE_HASH_KEY][0:12]
+            signature_hash = get_signature_hash(
+                request_context, operation_name, document, query_string
             )
 
+            tracer = execution_context.get_opencensus_tracer()
+            tracer.current_span().name = "gql[{}]".format(signature_hash[0:12])
+
             tracer.add_attribute_to_current_span("gql_operation_name", op_name)
             tracer.add_attribute_to_current_span("signature", signature)
             tracer.end_span()
@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from graphql import parse
+
+from graphene_tornado.ext.extension_helpers import get_signature
+from graphene_tornado.ext.extension_helpers import SignatureCache
+from graphene_tornado.ext.extension_helpers import SIGNATURE_CACHE
+from graphene_tornado.request_context import SIGNATURE
+
+QUERY = "query A { a(x: 1) } query B { b }"
+
+
+def test_signatures_are_cached_per_query_and_operation_name():
+    cache = SignatureCache()
+    document = parse(QUERY)
+
+    assert cache.get_or_compute(QUERY, "A", document) == "query A{a(x:0)}"
+    assert cache.get_or_compute(QUERY, "A", document) == "query A{a(x:0)}"
+    assert cache.get_or_compute(QUERY, "B", document) == "query B{b}"
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache) == 2
+
+
+def test_least_recently_used_signatures_are_evicted():
+    cache = SignatureCache(capacity=2)
+    for query in ["{ a }", "{ b }", "{ a }", "{ c }"]:
+        cache.get_or_compute(query, None, parse(query))
+
+    assert len(cache) == 2
+    cache.get_or_compute("{ a }", None, parse("{ a }"))
+    assert cache.hits == 2
+
+    cache.resize(1)
+    assert len(cache) == 1
+
+
+def test_cache_is_thread_safe():
+    cache = SignatureCache(capacity=8)
+    queries = ["{{ f{} }}".format(i) for i in range(16)] * 8
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        signatures = list(
+            executor.map(lambda q: cache.get_or_compute(q, None, parse(q)), queries)
+        )
+
+    assert signatures == [q.replace(" ", "") for q in queries]
+    assert cache.hits + cache.misses == len(queries)
+    assert len(cache) == 8
+
+
+def test_get_signature_uses_process_cache():
+    SIGNATURE_CACHE.clear()
+    query = "{ cached(x: 1) }"
+
+    for _ in range(2):
+        request_context = {}
+        assert get_signature(request_context, None, parse(query), query) == "{cached(x:0)}"
+        assert request_context[SIGNATURE] == "{cached(x:0)}"
+
+    assert (SIGNATURE_CACHE.hits, SIGNATURE_CACHE.misses) == (1, 1)
+
+
+def test_anonymous_operations_share_the_empty_operation_name():
+    cache = SignatureCache()
+    query = "{ a } fragment Unused on T { b }"
+    document = parse(query)
+
+    assert cache.get_or_compute(query, None, document) == "{a}"
+    assert cache.get_or_compute(query, "", document) == "{a}"
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -0,0 +1,84 @@
+import random
+
+from graphene_tornado.ext.latency_histogram import BUCKET_COUNT
+from graphene_tornado.ext.latency_histogram import duration_to_bucket
+from graphene_tornado.ext.latency_histogram import LatencyHistogram
+
+
+def _dense(histogram):
+    buckets = [0] * BUCKET_COUNT
+    for bucket, count in histogram:
+        buckets[bucket] += count
+    return buckets
+
+
+def _encode_dense(buckets):
+    # The reference encoding from Apollo's DurationHistogram.toArray
+    out, zeroes = [], 0
+    for count in buckets:
+        if not count:
+            zeroes += 1
+            continue
+        if zeroes == 1:
+            out.append(0)
+        elif zeroes:
+            out.append(-zeroes)
+        zeroes = 0
+        out.append(count)
+    return out
+
+
+def test_duration_to_bucket():
+    assert duration_to_bucket(0) == 0
+    assert duration_to_bucket(1000) == 0
+    assert duration_to_bucket(1001) == 1
+    assert duration_to_bucket(1100) == 1
+    assert duration_to_bucket(1211) == 3
+    assert duration_to_bucket(10 ** 20) == BUCKET_COUNT - 1
+
+
+def test_encoding():
+    histogram = LatencyHistogram()
+    assert histogram.to_array() == []
+
+    histogram.increment_bucket(1)
+    histogram.increment_bucket(3, 2)
+    histogram.increment_bucket(10)
+    assert histogram.to_array() == [0, 1, 0, 2, -6, 1]
+    assert len(histogram) == 4
+
+    histogram.increment_bucket(0, 5)
+    assert histogram.to_array() == [5, 1, 0, 2, -6, 1]
+    assert LatencyHistogram.from_array(histogram.to_array()) == histogram
+
+
+def test_merge():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    first.increment_bucket(50)
+    second.increment_bucket(20)
+    second.increment_bucket(50, 2)
+    second.increment_bucket(90)
+
+    first.merge(second)
+    first.merge(LatencyHistogram())
+    assert list(first) == [(20, 1), (50, 3), (90, 1)]
+    assert list(second) == [(20, 1), (50, 2), (90, 1)]
+
+
+def test_random_histograms_match_the_dense_encoding():
+    rng = random.Random(46)
+    for _ in range(50):
+        histograms = [LatencyHistogram() for _ in range(3)]
+        dense = [0] * BUCKET_COUNT
+        for histogram in histograms:
+            for _ in range(rng.randrange(20)):
+                duration = int(10 ** rng.uniform(2, 12))
+                histogram.record(duration)
+                dense[duration_to_bucket(duration)] += 1
+
+        merged = LatencyHistogram()
+        for histogram in histograms:
+            merged.merge(histogram)
+        assert _dense(merged) == dense
+        assert merged.to_array() == _encode_dense(dense)
+        assert LatencyHistogram.from_array(merged.to_array()) == merged
@@ -4,13 +4,46 @@ ExtensionStack is an adapter for GraphQLExtension that helps invoke a list of Gr
 import inspect
 from typing import Callable
 from typing import List
+from typing import Tuple
 from typing import Union
 
 from graphene_tornado.graphql_extension import GraphQLExtension
 
 
+class ExtensionPool:
+    """
+    A bounded pool of extension instances that can be passed in place of an extension factory. Instances
+    are drawn from the pool when a handler is initialized and returned to it, after calling their reset()
+    method, when the request finishes. Instances released while the pool is full are discarded.
+    """
+
+    def __init__(
+        self, factory: Callable[[], GraphQLExtension], max_size: int = 64
+    ) -> None:
+        self.factory = factory
+        self.max_size = max_size
+        self._free: List[GraphQLExtension] = []
+
+    def acquire(self) -> GraphQLExtension:
+        if self._free:
+            return self._free.pop()
+        return self.factory()
+
+    def release(self, extension: GraphQLExtension) -> None:
+        if len(self._free) >= self.max_size:
+            return
+        extension.reset()
+        self._free.append(extension)
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+
 def instantiate_extensions(extensions):
     for extension in extensions:
+        if isinstance(extension, ExtensionPool):
+            yield extension.acquire()
+            continue
         if inspect.isclass(extension) or inspect.isfunction(extension):
             yield extension()
             continue
@@ -21,12 +54,26 @@ class GraphQLExtensionStack(GraphQLExtension):
     def __init__(
         self,
         extensions: List[
-            Union[Callable[[], GraphQLExtension], GraphQLExtension]
+            Union[Callable[[], GraphQLExtension], GraphQLExtension, ExtensionPool]
         ] = None,
     ):
+        extensions = extensions or []
         self.extensions: List[GraphQLExtension] = list(
             instantiate_extensions(extensions)
         )
+        self._pooled: List[Tuple[ExtensionPool, GraphQLExtension]] = [
+            (pool, extension)
+            for pool, extension in zip(extensions, self.extensions)
+            if isinstance(pool, ExtensionPool)
+        ]
+
+    def release(self) -> None:
+        """
+        Returns any pooled extensions to their pools. The stack must not be used afterwards.
+        """
+        pooled, self._pooled = self._pooled, []
+        for pool, extension in pooled:
+            pool.release(extension)
 
     async def request_started(
         self,
@@ -17,6 +17,7 @@ from typing import Optional
 
 from graphql import DocumentNode
 from graphql import GraphQLSchema
+from graphql.pyutils import is_awaitable
 from tornado.httputil import HTTPServerRequest
 
 EndHandler = Optional[List[Callable[[List[Exception]], None]]]
@@ -68,6 +69,13 @@ class GraphQLExtension:
     def will_send_response(self, response: Any, context: Any,) -> EndHandler:
         pass
 
+    def reset(self) -> None:
+        """
+        Clears any per-request state so that the instance can be reused for another request. Only
+        called for extensions that are drawn from an ExtensionPool.
+        """
+        pass
+
     def as_middleware(self) -> Callable:
         """
         Adapter for using the stack as middleware so that the will_resolve_field function
@@ -83,6 +91,8 @@ class GraphQLExtension:
             errors = []
             try:
                 res = next(root, info, **args)
+                if is_awaitable(res):
+                    res = await res
                 return res
             finally:
                 await end_resolve(errors, res)
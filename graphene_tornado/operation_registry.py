@@ -0,0 +1,201 @@
+"""
+A registry of the operations that clients are allowed to execute.
+
+Each operation in the manifest is parsed, validated and signed once when the registry is created. Clients
+then send only the id of an operation, which is the SHA-256 hash of its engine reporting signature, and the
+handler executes the registered document without parsing or validating anything. When the handler is in
+safelist mode, requests that send unknown ids or unregistered query text are rejected and counted.
+
+The manifest is a JSON document of the form::
+
+    {"version": 1, "operations": [{"id": "...", "name": "...", "signature": "...", "body": "..."}]}
+
+Only the body and name of each entry are used; the id and signature are recomputed.
+"""
+import json
+from collections import Counter
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from graphql import DocumentNode
+from graphql import GraphQLError
+from graphql import GraphQLSchema
+from graphql import parse
+from graphql import validate
+from tornado.web import HTTPError
+
+from graphene_tornado.apollo_tooling.operation_id import (
+    default_engine_reporting_signature,
+)
+from graphene_tornado.apollo_tooling.query_hash import compute
+
+RegisteredOperation = NamedTuple(
+    "RegisteredOperation",
+    [
+        ("id", str),
+        ("operation_name", Optional[str]),
+        ("signature", str),
+        ("body", str),
+        ("document", DocumentNode),
+    ],
+)
+
+# (client name, client version)
+ClientKey = Tuple[str, str]
+
+# The counters key clients by request headers, clients beyond the first max_clients are counted together
+OTHER_CLIENT: ClientKey = ("other", "")
+DEFAULT_MAX_CLIENTS = 1000
+
+
+class ForbiddenOperationError(HTTPError):
+    def __init__(self, message: str) -> None:
+        super(ForbiddenOperationError, self).__init__(403, message)
+
+
+def operation_signature(document: DocumentNode, operation_name: Optional[str]) -> str:
+    return default_engine_reporting_signature(document, operation_name or "")
+
+
+def _signature_id(query: str, operation_name: Optional[str]) -> Optional[str]:
+    """
+    Returns:
+        The id of the operation the query would be registered as, or None if it does not parse
+    """
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return None
+    return compute(operation_signature(document, operation_name))
+
+
+class OperationRegistry:
+    """
+    Args:
+        schema: The schema that operations are validated against
+        operations: Manifest entries, each with a body and an optional name
+        max_clients: The number of distinct client names and versions each counter keeps, the others are
+            counted as OTHER_CLIENT
+
+    Attributes:
+        registered: The number of registered operations executed per client name and version
+        forbidden: The number of rejected requests that sent query text, per client name and version
+        unregistered: The number of rejected requests that sent an unknown id, per client name and version
+    """
+
+    def __init__(
+        self,
+        schema: Any,
+        operations: Iterable[Dict[str, Any]] = (),
+        max_clients: int = DEFAULT_MAX_CLIENTS,
+    ) -> None:
+        self.schema: GraphQLSchema = getattr(schema, "graphql_schema", schema)
+        self.operations: Dict[str, RegisteredOperation] = {}
+        self.max_clients = max_clients
+        self.registered: Counter = Counter()
+        self.forbidden: Counter = Counter()
+        self.unregistered: Counter = Counter()
+
+        for operation in operations:
+            # Anonymous operations may be written with an empty name
+            self.register(operation["body"], operation.get("name") or None)
+
+    @classmethod
+    def from_manifest(cls, schema: Any, path: str) -> "OperationRegistry":
+        with open(path) as f:
+            manifest = json.load(f)
+        return cls(schema, manifest["operations"])
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    def register(
+        self, body: str, operation_name: Optional[str] = None
+    ) -> RegisteredOperation:
+        """
+        Parses, validates and signs an operation and adds it to the registry.
+
+        Raises:
+            ValueError: If the operation does not parse or validate against the schema
+        """
+        operation_name = operation_name or None
+        try:
+            document = parse(body)
+        except GraphQLError as e:
+            raise ValueError("Operation {} is invalid: {}".format(operation_name, e))
+
+        errors = validate(self.schema, document)
+        if errors:
+            raise ValueError(
+                "Operation {} is invalid: {}".format(operation_name, errors[0].message)
+            )
+
+        signature = operation_signature(document, operation_name)
+        operation = RegisteredOperation(
+            compute(signature), operation_name, signature, body, document
+        )
+        self.operations[operation.id] = operation
+        return operation
+
+    def get(self, operation_id: str) -> Optional[RegisteredOperation]:
+        return self.operations.get(operation_id, None)
+
+    def resolve(
+        self,
+        operation_id: Optional[str],
+        query: Optional[str],
+        operation_name: Optional[str],
+        client: ClientKey,
+    ) -> Optional[RegisteredOperation]:
+        """
+        Finds the registered operation for a request, by id or else by the signature of its query text.
+        Query text sent along with an id must be the operation's body or have its signature.
+
+        Returns:
+            The registered operation, or None if the request has neither an id nor a query
+
+        Raises:
+            ForbiddenOperationError: If the operation is not registered
+        """
+        if operation_id:
+            operation = self.get(operation_id)
+            if operation is None:
+                self._count(self.unregistered, client)
+                raise ForbiddenOperationError("Unknown operation id.")
+            if (
+                query
+                and query != operation.body
+                and _signature_id(query, operation_name) != operation.id
+            ):
+                self._count(self.forbidden, client)
+                raise ForbiddenOperationError("Query does not match the operation id.")
+        elif query:
+            operation = self.get(_signature_id(query, operation_name) or "")
+            if operation is None:
+                self._count(self.forbidden, client)
+                raise ForbiddenOperationError("Operation is not registered.")
+        else:
+            return None
+
+        self._count(self.registered, client)
+        return operation
+
+    def _count(self, counter: Counter, client: ClientKey) -> None:
+        if client not in counter and len(counter) >= self.max_clients:
+            client = OTHER_CLIENT
+        counter[client] += 1
+
+    def take_counts(self) -> Tuple[Counter, Counter, Counter]:
+        """
+        Returns:
+            The registered, forbidden and unregistered counters, which are reset
+        """
+        counts = self.registered, self.forbidden, self.unregistered
+        self.registered = Counter()
+        self.forbidden = Counter()
+        self.unregistered = Counter()
+        return counts
@@ -0,0 +1,108 @@
+"""
+In-process rate limiting of GraphQL operations.
+
+TokenBucketRateLimiter implements a token bucket per key using the generic cell rate algorithm: instead of
+a token count and a timestamp, each bucket is stored as a single float, the time at which it will be full
+again. A bucket whose time has passed is full and is indistinguishable from a missing one, so idle buckets
+are simply deleted by a periodic sweep.
+"""
+import math
+import time
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Optional
+
+from tornado.web import HTTPError
+
+
+class RateLimitExceededError(HTTPError):
+    def __init__(self, retry_after: int) -> None:
+        super(RateLimitExceededError, self).__init__(429, "Rate limit exceeded.")
+        self.retry_after = retry_after
+
+
+class OperationCostExceededError(HTTPError):
+    """
+    The operation costs more tokens than a bucket can hold, so it will never be allowed and must not be
+    retried.
+    """
+
+    def __init__(self, cost: float, burst: float) -> None:
+        super(OperationCostExceededError, self).__init__(
+            400,
+            "Operation cost {:g} exceeds the rate limit burst of {:g}.".format(
+                cost, burst
+            ),
+        )
+
+
+class TokenBucketRateLimiter:
+    """
+    Args:
+        rate: The number of tokens added to each bucket per second
+        burst: The capacity of each bucket
+        cleanup_interval: How often, in seconds, idle buckets are removed
+        clock: A monotonic clock returning seconds
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        cleanup_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate and burst must be positive")
+
+        self.rate = rate
+        self.burst = burst
+        self.cleanup_interval = cleanup_interval
+        self.clock = clock
+        self.allowed = 0
+        self.limited = 0
+        self._interval = 1.0 / rate
+        self._tolerance = burst * self._interval
+        self._full_at: Dict[Hashable, float] = {}
+        self._next_cleanup = clock() + cleanup_interval
+
+    def __len__(self) -> int:
+        return len(self._full_at)
+
+    def acquire(self, key: Hashable, cost: float = 1.0) -> Optional[float]:
+        """
+        Takes cost tokens from the bucket of key.
+
+        Returns:
+            None if the tokens were taken, otherwise the number of seconds until they will be available, which
+            is math.inf if cost is greater than the burst
+        """
+        if cost > self.burst:
+            self.limited += 1
+            return math.inf
+
+        now = self.clock()
+        if now >= self._next_cleanup:
+            self.cleanup(now)
+
+        # Work relative to now so that a full bucket gives exactly zero rather than a rounding error
+        until_full = max(self._full_at.get(key, now) - now, 0.0) + cost * self._interval
+        wait = until_full - self._tolerance
+        if wait > 0:
+            self.limited += 1
+            return wait
+
+        self._full_at[key] = now + until_full
+        self.allowed += 1
+        return None
+
+    def cleanup(self, now: Optional[float] = None) -> None:
+        """
+        Removes the buckets that have refilled completely.
+        """
+        now = self.clock() if now is None else now
+        idle = [key for key, full_at in self._full_at.items() if full_at <= now]
+        for key in idle:
+            del self._full_at[key]
+        self._next_cleanup = now + self.cleanup_interval
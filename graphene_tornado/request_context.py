@@ -1,6 +1,108 @@
 """
-Common keys stored in the request context.
+Common keys stored in the request context, and the context variable that holds the state of the
+request currently being executed.
+
+The current RequestContext is set by TornadoGraphQLHandler at the start of each GraphQL response and
+can be retrieved with get_request_context() from any resolver or extension. Because it is stored in a
+context variable, each asyncio task sees its own request, even when several requests (or batch entries)
+are executing concurrently on the same IOLoop.
 """
+import uuid
+from contextvars import ContextVar
+from contextvars import Token
+from typing import Any
+from typing import Dict
+from typing import Optional
+
+from tornado.httputil import HTTPServerRequest
+from tornado.ioloop import IOLoop
 
 SIGNATURE_HASH_KEY = "_signature_hash"
 SIGNATURE = "_signature"
+REGISTERED_OPERATION = "_registered_operation"
+
+OPERATION_ID_KEY = "operationId"
+
+REQUEST_ID_HEADER = "X-Request-Id"
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+
+CLIENT_NAME_HEADER = "apollographql-client-name"
+CLIENT_REFERENCE_HEADER_KEY = "apollographql-client-reference-id"
+CLIENT_VERSION_HEADER_KEY = "apollographql-client-version"
+
+
+class RequestContext:
+    """
+    Per-request state shared by the handler, extensions and resolvers.
+
+    Attributes:
+        request_id: The id of the request, taken from the X-Request-Id header when present
+        request: The Tornado request
+        deadline: The IOLoop time by which execution should finish, if any
+        loaders: Data loaders created for this request
+        tracing: State owned by tracing extensions
+        cache: A cache scoped to this request
+        values: The request context dictionary that is passed to extension hooks
+    """
+
+    __slots__ = (
+        "request_id",
+        "request",
+        "deadline",
+        "loaders",
+        "tracing",
+        "cache",
+        "values",
+    )
+
+    def __init__(
+        self,
+        request_id: Optional[str] = None,
+        request: Optional[HTTPServerRequest] = None,
+        deadline: Optional[float] = None,
+        values: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.request_id = request_id or uuid.uuid4().hex
+        self.request = request
+        self.deadline = deadline
+        self.loaders: Dict[str, Any] = {}
+        self.tracing: Dict[str, Any] = {}
+        self.cache: Dict[Any, Any] = {}
+        self.values: Dict[str, Any] = {} if values is None else values
+
+    def time_remaining(self) -> Optional[float]:
+        """
+        Returns:
+            The number of seconds until the deadline, or None if the request has no deadline
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - IOLoop.current().time(), 0.0)
+
+
+_REQUEST_CONTEXT: ContextVar[Optional[RequestContext]] = ContextVar(
+    "graphene_tornado_request_context", default=None
+)
+
+
+def get_request_context() -> Optional[RequestContext]:
+    """
+    Returns:
+        The context of the request being executed by the current task, or None outside of a request
+    """
+    return _REQUEST_CONTEXT.get()
+
+
+def set_request_context(request_context: RequestContext) -> Token:
+    """
+    Args:
+        request_context: The context to make current
+
+    Returns:
+        A token that must be passed to reset_request_context when the request is done
+    """
+    return _REQUEST_CONTEXT.set(request_context)
+
+
+def reset_request_context(token: Token) -> None:
+    _REQUEST_CONTEXT.reset(token)
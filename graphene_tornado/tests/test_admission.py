@@ -0,0 +1,161 @@
+import asyncio
+
+import graphene
+import pytest
+import tornado
+from graphene import ObjectType
+from graphene import Schema
+from tornado import gen
+
+from graphene_tornado.admission import AdmissionController
+from graphene_tornado.admission import AdmissionLane
+from graphene_tornado.admission import AdmissionRejectedError
+from graphene_tornado.tests.http_helper import HttpHelper
+from graphene_tornado.tests.test_graphql import GRAPHQL_HEADER
+from graphene_tornado.tests.test_graphql import response_json
+from graphene_tornado.tests.test_graphql import url_string
+from graphene_tornado.tornado_graphql_handler import TornadoGraphQLHandler
+
+
+class Query(ObjectType):
+
+    slow = graphene.String()
+
+    async def resolve_slow(self, info):
+        await asyncio.sleep(0.1)
+        return "slow"
+
+
+schema = Schema(query=Query)
+
+rejecting = AdmissionController(max_concurrent=1, retry_after=3)
+queueing = AdmissionController(max_concurrent=1, max_queued=1)
+laned = AdmissionController(
+    max_concurrent=1, lanes={"expensive": AdmissionLane(max_concurrent=1)}
+)
+
+
+class LanedHandler(TornadoGraphQLHandler):
+    def get_admission_lane(self):
+        return self.get_query_argument("lane", None)
+
+
+class ExampleAdmissionApplication(tornado.web.Application):
+    def __init__(self):
+        handlers = [
+            (
+                r"/graphql/rejecting",
+                TornadoGraphQLHandler,
+                dict(schema=schema, admission_controller=rejecting),
+            ),
+            (
+                r"/graphql/queueing",
+                TornadoGraphQLHandler,
+                dict(schema=schema, admission_controller=queueing),
+            ),
+            (
+                r"/graphql/laned",
+                LanedHandler,
+                dict(schema=schema, admission_controller=laned),
+            ),
+        ]
+        tornado.web.Application.__init__(self, handlers)
+
+
+@pytest.fixture
+def app():
+    return ExampleAdmissionApplication()
+
+
+@pytest.fixture
+def http_helper(http_client, base_url):
+    return HttpHelper(http_client, base_url)
+
+
+@pytest.mark.gen_test
+def test_requests_over_the_limit_are_rejected(http_helper):
+    responses = yield gen.multi(
+        [
+            http_helper.get(
+                url_string("/graphql/rejecting", query="{slow}"),
+                headers=GRAPHQL_HEADER,
+                raise_error=False,
+            )
+            for _ in range(2)
+        ]
+    )
+
+    assert sorted(r.code for r in responses) == [200, 503]
+    rejected = [r for r in responses if r.code == 503][0]
+    assert rejected.headers["Retry-After"] == "3"
+    assert response_json(rejected) == {
+        "errors": [{"message": "Server is overloaded, retry later."}]
+    }
+    assert rejecting.in_flight == 0
+    assert rejecting.default_lane.rejected == 1
+
+
+@pytest.mark.gen_test
+def test_queued_requests_are_admitted(http_helper):
+    responses = yield gen.multi(
+        [
+            http_helper.get(
+                url_string("/graphql/queueing", query="{slow}"),
+                headers=GRAPHQL_HEADER,
+                raise_error=False,
+            )
+            for _ in range(3)
+        ]
+    )
+
+    assert sorted(r.code for r in responses) == [200, 200, 503]
+    assert queueing.in_flight == 0
+    assert queueing.default_lane.admitted == 2
+
+
+@pytest.mark.gen_test
+def test_lanes_are_admitted_independently(http_helper):
+    responses = yield gen.multi(
+        [
+            http_helper.get(
+                url_string("/graphql/laned", query="{slow}"),
+                headers=GRAPHQL_HEADER,
+                raise_error=False,
+            ),
+            http_helper.get(
+                url_string("/graphql/laned", query="{slow}", lane="expensive"),
+                headers=GRAPHQL_HEADER,
+                raise_error=False,
+            ),
+        ]
+    )
+
+    assert [r.code for r in responses] == [200, 200]
+
+
+@pytest.mark.gen_test
+def test_queue_timeout_rejects_waiting_requests():
+    lane = AdmissionLane(max_concurrent=1, max_queued=1, queue_timeout=0.01)
+    yield lane.acquire()
+
+    with pytest.raises(AdmissionRejectedError):
+        yield lane.acquire()
+
+    assert lane.queued == 0
+    lane.release()
+    assert lane.in_flight == 0
+
+
+@pytest.mark.gen_test
+def test_release_hands_slot_to_waiter():
+    lane = AdmissionLane(max_concurrent=1, max_queued=1)
+    yield lane.acquire()
+
+    waiting = asyncio.ensure_future(lane.acquire())
+    yield asyncio.sleep(0)
+    assert lane.queued == 1
+
+    lane.release()
+    yield waiting
+    assert lane.in_flight == 1
+    assert lane.queued == 0
@@ -0,0 +1,175 @@
+import asyncio
+
+import graphene
+import pytest
+import tornado
+from graphene import ObjectType
+from graphene import Schema
+
+from graphene_tornado.deadline import deadline_middleware
+from graphene_tornado.request_context import get_request_context
+from graphene_tornado.tests.http_helper import HttpHelper
+from graphene_tornado.tests.test_graphql import GRAPHQL_HEADER
+from graphene_tornado.tests.test_graphql import response_json
+from graphene_tornado.tests.test_graphql import url_string
+from graphene_tornado.tornado_graphql_handler import TornadoGraphQLHandler
+
+
+class Query(ObjectType):
+
+    fast = graphene.String()
+    slow = graphene.String()
+    time_remaining = graphene.Float()
+
+    async def resolve_fast(self, info):
+        return "fast"
+
+    async def resolve_slow(self, info):
+        await asyncio.sleep(5)
+        return "slow"
+
+    def resolve_time_remaining(self, info):
+        return get_request_context().time_remaining()
+
+
+schema = Schema(query=Query)
+
+
+class MiddlewareRecordingHandler(TornadoGraphQLHandler):
+    def initialize(self, middlewares=None, **kwargs):
+        super(MiddlewareRecordingHandler, self).initialize(**kwargs)
+        self.middlewares = middlewares
+
+    def get_middleware(self):
+        middleware = super(MiddlewareRecordingHandler, self).get_middleware()
+        self.middlewares.append(middleware)
+        return middleware
+
+
+class ExampleDeadlineApplication(tornado.web.Application):
+    def __init__(self, middlewares):
+        handlers = [
+            (
+                r"/graphql",
+                TornadoGraphQLHandler,
+                dict(schema=schema, request_timeout=0.1),
+            ),
+            (r"/graphql/unbounded", TornadoGraphQLHandler, dict(schema=schema)),
+            (
+                r"/graphql/recorded",
+                MiddlewareRecordingHandler,
+                dict(schema=schema, middlewares=middlewares),
+            ),
+        ]
+        tornado.web.Application.__init__(self, handlers)
+
+
+@pytest.fixture
+def middlewares():
+    return []
+
+
+@pytest.fixture
+def app(middlewares):
+    return ExampleDeadlineApplication(middlewares)
+
+
+@pytest.fixture
+def http_helper(http_client, base_url):
+    return HttpHelper(http_client, base_url)
+
+
+@pytest.mark.gen_test
+def test_returns_partial_result_when_deadline_expires(http_helper):
+    response = yield http_helper.get(
+        url_string(query="{fast slow}"), headers=GRAPHQL_HEADER
+    )
+
+    assert response.code == 200
+    result = response_json(response)
+    assert result["data"] == {"fast": "fast", "slow": None}
+    assert [e["message"] for e in result["errors"]] == ["Request deadline exceeded."]
+    assert result["errors"][0]["path"] == ["slow"]
+
+
+@pytest.mark.gen_test
+def test_timeout_header_sets_deadline(http_helper):
+    headers = dict(GRAPHQL_HEADER)
+    headers["X-Request-Timeout"] = "0.05"
+    response = yield http_helper.get(
+        url_string("/graphql/unbounded", query="{slow}"), headers=headers
+    )
+
+    assert response.code == 200
+    assert response_json(response)["data"] == {"slow": None}
+
+
+@pytest.mark.gen_test
+def test_timeout_header_cannot_extend_deadline(http_helper):
+    headers = dict(GRAPHQL_HEADER)
+    headers["X-Request-Timeout"] = "30"
+    response = yield http_helper.get(
+        url_string(query="{timeRemaining}"), headers=headers
+    )
+
+    assert 0 < response_json(response)["data"]["timeRemaining"] <= 0.1
+
+
+@pytest.mark.gen_test
+def test_no_deadline_by_default(http_helper):
+    response = yield http_helper.get(
+        url_string("/graphql/unbounded", query="{fast timeRemaining}"),
+        headers=GRAPHQL_HEADER,
+    )
+
+    assert response_json(response) == {"data": {"fast": "fast", "timeRemaining": None}}
+
+
+@pytest.mark.gen_test
+def test_invalid_timeout_header(http_helper):
+    headers = dict(GRAPHQL_HEADER)
+    headers["X-Request-Timeout"] = "soon"
+    response = yield http_helper.get(
+        url_string(query="{fast}"), headers=headers, raise_error=False
+    )
+
+    assert response.code == 400
+
+
+@pytest.mark.gen_test
+@pytest.mark.parametrize("timeout", ["nan", "inf", "-inf", "1e400", "-1"])
+def test_non_finite_or_negative_timeout_header(http_helper, timeout):
+    headers = dict(GRAPHQL_HEADER)
+    headers["X-Request-Timeout"] = timeout
+    response = yield http_helper.get(
+        url_string(query="{fast}"), headers=headers, raise_error=False
+    )
+
+    assert response.code == 400
+
+
+@pytest.mark.gen_test
+def test_zero_timeout_header(http_helper):
+    headers = dict(GRAPHQL_HEADER)
+    headers["X-Request-Timeout"] = "0"
+    response = yield http_helper.get(
+        url_string(query="{fast}"), headers=headers, raise_error=False
+    )
+
+    assert response.code == 200
+
+
+@pytest.mark.gen_test
+def test_deadline_middleware_only_runs_with_a_deadline(http_helper, middlewares):
+    yield http_helper.get(
+        url_string("/graphql/recorded", query="{fast}"), headers=GRAPHQL_HEADER
+    )
+    headers = dict(GRAPHQL_HEADER)
+    headers["X-Request-Timeout"] = "1"
+    yield http_helper.get(
+        url_string("/graphql/recorded", query="{fast}"), headers=headers
+    )
+
+    without_deadline, with_deadline = middlewares
+    assert deadline_middleware not in without_deadline
+    assert deadline_middleware in with_deadline
@@ -0,0 +1,138 @@
+import asyncio
+from functools import partial
+
+import graphene
+import pytest
+import tornado
+import tornado.locks
+from graphene import ObjectType
+from graphene import Schema
+from tornado.tcpclient import TCPClient
+
+from graphene_tornado.graphql_extension import GraphQLExtension
+from graphene_tornado.tornado_graphql_handler import TornadoGraphQLHandler
+
+
+class Recorder:
+    """
+    The root value of the test requests, which records what happened to them.
+    """
+
+    def __init__(self):
+        # Not bound to an event loop, unlike asyncio.Event before Python 3.10
+        self.started = tornado.locks.Event()
+        self.cancelled = []
+        self.end_errors = {}
+
+    async def record_end(self, phase, errors=None):
+        self.end_errors[phase] = errors
+
+
+class Query(ObjectType):
+
+    slow = graphene.String()
+
+    async def resolve_slow(self, info):
+        self.started.set()
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            self.cancelled.append(True)
+            raise
+        return "slow"
+
+
+schema = Schema(query=Query)
+
+
+class RecordingExtension(GraphQLExtension):
+    def __init__(self, recorder):
+        self.recorder = recorder
+
+    async def request_started(
+        self,
+        request,
+        query_string,
+        parsed_query,
+        operation_name,
+        variables,
+        context,
+        request_context,
+    ):
+        return partial(self.recorder.record_end, "request")
+
+    async def parsing_started(self, query_string):
+        return None
+
+    async def validation_started(self):
+        return None
+
+    async def execution_started(
+        self,
+        schema,
+        document,
+        root,
+        context,
+        variables,
+        operation_name,
+        request_context,
+    ):
+        return partial(self.recorder.record_end, "execution")
+
+    async def will_resolve_field(self, root, info, **args):
+        return partial(self.recorder.record_end, "resolve_field")
+
+    async def will_send_response(self, response, context):
+        pass
+
+
+class ExampleDisconnectApplication(tornado.web.Application):
+    def __init__(self, recorder):
+        handlers = [
+            (
+                r"/graphql",
+                TornadoGraphQLHandler,
+                dict(
+                    schema=schema,
+                    root_value=recorder,
+                    extensions=[lambda: RecordingExtension(recorder)],
+                ),
+            ),
+        ]
+        tornado.web.Application.__init__(self, handlers)
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+@pytest.fixture
+def app(recorder):
+    return ExampleDisconnectApplication(recorder)
+
+
+@pytest.mark.gen_test
+def test_execution_is_cancelled_when_client_disconnects(
+    http_server, http_port, recorder
+):
+    abandoned = TornadoGraphQLHandler.stats.abandoned_requests
+
+    stream = yield TCPClient().connect("127.0.0.1", http_port)
+    yield stream.write(
+        b"GET /graphql?query=%7Bslow%7D HTTP/1.1\r\n"
+        b"Host: localhost\r\n"
+        b"Content-Type: application/graphql\r\n\r\n"
+    )
+    yield recorder.started.wait()
+    stream.close()
+
+    for _ in range(100):
+        if "request" in recorder.end_errors:
+            break
+        yield asyncio.sleep(0.01)
+
+    assert recorder.cancelled == [True]
+    assert TornadoGraphQLHandler.stats.abandoned_requests == abandoned + 1
+    assert isinstance(recorder.end_errors["execution"][0], asyncio.CancelledError)
+    assert isinstance(recorder.end_errors["request"][0], asyncio.CancelledError)
@@ -4,6 +4,8 @@ from functools import partial
 import pytest
 import tornado
 
+from graphene_tornado.extension_stack import ExtensionPool
+from graphene_tornado.extension_stack import GraphQLExtensionStack
 from graphene_tornado.graphql_extension import GraphQLExtension
 from graphene_tornado.schema import schema
 from graphene_tornado.tests.http_helper import HttpHelper
@@ -69,9 +71,31 @@ class TrackingExtension(GraphQLExtension):
         STARTED.append(phase)
 
 
-class ExampleExtensionsApplication(tornado.web.Application):
+class ResettableExtension(TrackingExtension):
+    def __init__(self):
+        self.resets = 0
+
+    def reset(self):
+        self.resets += 1
+
+
+class CountingFactory:
     def __init__(self):
+        self.created = 0
+
+    def __call__(self):
+        self.created += 1
+        return ResettableExtension()
+
+
+class ExampleExtensionsApplication(tornado.web.Application):
+    def __init__(self, pool):
         handlers = [
+            (
+                r"/graphql/pooled",
+                TornadoGraphQLHandler,
+                dict(schema=schema, extensions=[pool]),
+            ),
             (
                 r"/graphql",
                 TornadoGraphQLHandler,
@@ -91,9 +115,25 @@ class ExampleExtensionsApplication(tornado.web.Application):
         tornado.web.Application.__init__(self, handlers)
 
 
+@pytest.fixture(autouse=True)
+def phases():
+    STARTED.clear()
+    ENDED.clear()
+
+
+@pytest.fixture
+def factory():
+    return CountingFactory()
+
+
 @pytest.fixture
-def app():
-    return ExampleExtensionsApplication()
+def pool(factory):
+    return ExtensionPool(factory, max_size=1)
+
+
+@pytest.fixture
+def app(pool):
+    return ExampleExtensionsApplication(pool)
 
 
 @pytest.fixture
@@ -122,4 +162,34 @@ def test_extensions_are_called_in_order(http_helper):
         "resolve_field",
         "response",
     ] == STARTED
-    assert ["parsing", "validation", "execution", "resolve_field", "request"] == ENDED
+    assert ["parsing", "validation", "resolve_field", "execution", "request"] == ENDED
+
+
+@pytest.mark.gen_test
+def test_pooled_extensions_are_reused_across_requests(http_helper, factory, pool):
+    for _ in range(3):
+        response = yield http_helper.get(
+            url_string("/graphql/pooled", query="{test}"), headers=GRAPHQL_HEADER
+        )
+        assert response.code == 200
+        assert response_json(response) == {"data": {"test": "Hello World"}}
+
+    assert factory.created == 1
+    assert len(pool) == 1
+    assert pool.acquire().resets == 3
+
+
+def test_extension_pool_is_bounded(factory):
+    bounded = ExtensionPool(factory, max_size=1)
+    first = GraphQLExtensionStack([bounded])
+    second = GraphQLExtensionStack([bounded])
+    assert first.extensions[0] is not second.extensions[0]
+
+    first.release()
+    second.release()
+    assert len(bounded) == 1
+
+    third = GraphQLExtensionStack([bounded])
+    assert third.extensions[0] is first.extensions[0]
+    assert len(bounded) == 0
+    assert factory.created == 2
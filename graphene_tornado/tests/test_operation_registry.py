@@ -0,0 +1,186 @@
+import json
+
+import pytest
+import tornado
+
+from graphene_tornado.operation_registry import OperationRegistry
+from graphene_tornado.operation_registry import OTHER_CLIENT
+from graphene_tornado.schema import schema
+from graphene_tornado.tests.http_helper import HttpHelper
+from graphene_tornado.tests.test_graphql import GRAPHQL_HEADER
+from graphene_tornado.tests.test_graphql import response_json
+from graphene_tornado.tests.test_graphql import url_string
+from graphene_tornado.tornado_graphql_handler import TornadoGraphQLHandler
+
+HELLO = 'query Hello { test(who: "Dolly") }'
+
+registry = OperationRegistry(schema, [{"name": "Hello", "body": HELLO}])
+HELLO_ID = next(iter(registry.operations))
+
+ANONYMOUS = '{ test(who: "Anonymous") }'
+anonymous_registry = OperationRegistry(schema, [{"name": "", "body": ANONYMOUS}])
+ANONYMOUS_ID = next(iter(anonymous_registry.operations))
+
+
+class ExampleOperationRegistryApplication(tornado.web.Application):
+    def __init__(self):
+        handlers = [
+            (
+                r"/graphql",
+                TornadoGraphQLHandler,
+                dict(schema=schema, operation_registry=registry),
+            ),
+            (
+                r"/graphql/anonymous",
+                TornadoGraphQLHandler,
+                dict(schema=schema, operation_registry=anonymous_registry),
+            ),
+        ]
+        tornado.web.Application.__init__(self, handlers)
+
+
+@pytest.fixture
+def app():
+    return ExampleOperationRegistryApplication()
+
+
+@pytest.fixture
+def http_helper(http_client, base_url):
+    return HttpHelper(http_client, base_url)
+
+
+def _client():
+    headers = dict(GRAPHQL_HEADER)
+    headers["apollographql-client-name"] = "web"
+    headers["apollographql-client-version"] = "2.0"
+    return headers
+
+
+@pytest.mark.gen_test
+def test_executes_registered_operation_by_id(http_helper):
+    response = yield http_helper.post_json(url_string(), dict(operationId=HELLO_ID))
+
+    assert response.code == 200
+    assert response_json(response) == {"data": {"test": "Hello Dolly"}}
+
+
+@pytest.mark.gen_test
+def test_executes_registered_operation_by_text(http_helper):
+    response = yield http_helper.get(url_string(query=HELLO), headers=_client())
+
+    assert response.code == 200
+    assert response_json(response) == {"data": {"test": "Hello Dolly"}}
+
+
+@pytest.mark.gen_test
+def test_executes_operation_with_registered_signature(http_helper):
+    response = yield http_helper.get(
+        url_string(query='query Hello {test(who: "Someone")}'), headers=_client()
+    )
+
+    # Literals are not part of the signature
+    assert response.code == 200
+    assert response_json(response) == {"data": {"test": "Hello Someone"}}
+    assert registry.registered[("web", "2.0")] >= 1
+
+
+@pytest.mark.gen_test
+def test_rejects_unknown_operation_id(http_helper):
+    response = yield http_helper.get(
+        url_string(operationId="nope"), headers=_client(), raise_error=False
+    )
+
+    assert response.code == 403
+    assert response_json(response) == {"errors": [{"message": "Unknown operation id."}]}
+    assert registry.unregistered[("web", "2.0")] == 1
+
+
+@pytest.mark.gen_test
+def test_rejects_unregistered_operation(http_helper):
+    response = yield http_helper.get(
+        url_string(query="{test}"), headers=_client(), raise_error=False
+    )
+
+    assert response.code == 403
+    assert response_json(response) == {
+        "errors": [{"message": "Operation is not registered."}]
+    }
+    assert registry.forbidden[("web", "2.0")] == 1
+
+
+@pytest.mark.gen_test
+@pytest.mark.parametrize(
+    "query", [HELLO, 'query Hello { test(who: "Someone") }'], ids=["body", "signature"]
+)
+def test_executes_operation_id_with_matching_query(http_helper, query):
+    response = yield http_helper.post_json(
+        url_string(), dict(operationId=HELLO_ID, query=query, operationName="Hello")
+    )
+
+    assert response.code == 200
+    assert "errors" not in response_json(response)
+
+
+@pytest.mark.gen_test
+def test_rejects_operation_id_with_different_query(http_helper):
+    response = yield http_helper.post_json(
+        url_string(),
+        dict(operationId=HELLO_ID, query='{ test(who: "INJECTED") __typename }'),
+        headers=_client(),
+        raise_error=False,
+    )
+
+    assert response.code == 403
+    assert response_json(response) == {
+        "errors": [{"message": "Query does not match the operation id."}]
+    }
+    assert registry.forbidden[("web", "2.0")] >= 1
+
+
+def test_registry_loads_manifest(tmpdir):
+    manifest = tmpdir.join("manifest.json")
+    manifest.write(
+        json.dumps({"version": 1, "operations": [{"name": "Hello", "body": HELLO}]})
+    )
+
+    loaded = OperationRegistry.from_manifest(schema, str(manifest))
+    operation = loaded.get(HELLO_ID)
+    assert operation.operation_name == "Hello"
+    assert operation.signature == 'query Hello{test(who:"")}'
+
+
+def test_registry_rejects_invalid_operations():
+    with pytest.raises(ValueError):
+        OperationRegistry(schema, [{"name": "Bad", "body": "{ unknown }"}])
+
+
+@pytest.mark.gen_test
+def test_executes_anonymous_operation_by_id(http_helper):
+    assert anonymous_registry.get(ANONYMOUS_ID).operation_name is None
+
+    response = yield http_helper.get(
+        url_string("/graphql/anonymous", operationId=ANONYMOUS_ID), headers=_client()
+    )
+    assert response.code == 200
+    assert response_json(response) == {"data": {"test": "Hello Anonymous"}}
+
+    response = yield http_helper.post_json(
+        "/graphql/anonymous", dict(operationId=ANONYMOUS_ID, operationName="")
+    )
+    assert response.code == 200
+    assert response_json(response) == {"data": {"test": "Hello Anonymous"}}
+
+
+def test_client_counts_are_bounded():
+    bounded = OperationRegistry(
+        schema, [{"name": "Hello", "body": HELLO}], max_clients=2
+    )
+    for version in ("1", "2", "3", "4"):
+        bounded.resolve(HELLO_ID, None, None, ("web", version))
+    bounded.resolve(HELLO_ID, None, None, ("web", "1"))
+
+    assert bounded.registered == {("web", "1"): 2, ("web", "2"): 1, OTHER_CLIENT: 2}
+
+    registered, _, _ = bounded.take_counts()
+    assert sum(registered.values()) == 5
+    assert not bounded.registered
@@ -0,0 +1,193 @@
+import math
+
+import pytest
+import tornado
+
+from graphene_tornado.rate_limit import TokenBucketRateLimiter
+from graphene_tornado.schema import schema
+from graphene_tornado.tests.http_helper import HttpHelper
+from graphene_tornado.tests.test_graphql import GRAPHQL_HEADER
+from graphene_tornado.tests.test_graphql import response_json
+from graphene_tornado.tests.test_graphql import url_string
+from graphene_tornado.tornado_graphql_handler import TornadoGraphQLHandler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class ExampleRateLimitApplication(tornado.web.Application):
+    def __init__(self, rate_limiter):
+        handlers = [
+            (
+                r"/graphql",
+                TornadoGraphQLHandler,
+                dict(schema=schema, rate_limiter=rate_limiter),
+            ),
+            (
+                r"/graphql/batch",
+                TornadoGraphQLHandler,
+                dict(schema=schema, rate_limiter=rate_limiter, batch=True),
+            ),
+            (
+                r"/graphql/expensive",
+                ExpensiveOperationHandler,
+                dict(schema=schema, rate_limiter=rate_limiter),
+            ),
+        ]
+        tornado.web.Application.__init__(self, handlers)
+
+
+class ExpensiveOperationHandler(TornadoGraphQLHandler):
+    def get_operation_cost(self, document, variables, operation_name):
+        return 5.0
+
+
+@pytest.fixture
+def rate_limiter():
+    return TokenBucketRateLimiter(rate=0.01, burst=1)
+
+
+@pytest.fixture
+def app(rate_limiter):
+    return ExampleRateLimitApplication(rate_limiter)
+
+
+@pytest.fixture
+def http_helper(http_client, base_url):
+    return HttpHelper(http_client, base_url)
+
+
+def _client(name):
+    headers = dict(GRAPHQL_HEADER)
+    headers["apollographql-client-name"] = name
+    headers["apollographql-client-version"] = "1.0"
+    return headers
+
+
+@pytest.mark.gen_test
+def test_operations_are_rate_limited_per_client_and_signature(http_helper):
+    response = yield http_helper.get(
+        url_string(query='{test(who: "a")}'), headers=_client("web")
+    )
+    assert response.code == 200
+
+    # Same signature, since literals are hidden
+    response = yield http_helper.get(
+        url_string(query='{test(who: "b")}'), headers=_client("web"), raise_error=False
+    )
+    assert response.code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert response_json(response) == {"errors": [{"message": "Rate limit exceeded."}]}
+
+    response = yield http_helper.get(
+        url_string(query='{test(who: "a")}'), headers=_client("ios")
+    )
+    assert response.code == 200
+    assert response_json(response) == {"data": {"test": "Hello a"}}
+
+    response = yield http_helper.get(
+        url_string(query="{request: test}"), headers=_client("web")
+    )
+    assert response.code == 200
+
+
+@pytest.mark.gen_test
+def test_operations_costing_more_than_the_burst_are_not_retryable(http_helper):
+    response = yield http_helper.get(
+        url_string("/graphql/expensive", query="{test}"),
+        headers=_client("web"),
+        raise_error=False,
+    )
+
+    assert response.code == 400
+    assert "Retry-After" not in response.headers
+    assert response_json(response) == {
+        "errors": [{"message": "Operation cost 5 exceeds the rate limit burst of 1."}]
+    }
+
+
+@pytest.mark.gen_test
+def test_batch_entries_are_rate_limited_individually(http_helper):
+    response = yield http_helper.post_json(
+        "/graphql/batch",
+        [
+            {"id": 1, "query": '{test(who: "a")}'},
+            {"id": 2, "query": '{test(who: "b")}'},
+            {"id": 3, "query": "{request: test}"},
+        ],
+        headers=_client("web"),
+    )
+
+    assert response.code == 200
+    first, second, third = response_json(response)
+    assert first == {"id": 1, "status": 200, "data": {"test": "Hello a"}}
+    assert second["status"] == 429
+    assert second["retryAfter"] > 0
+    assert second["errors"][0]["message"] == "Rate limit exceeded."
+    assert "data" not in second
+    assert third == {"id": 3, "status": 200, "data": {"request": "Hello World"}}
+
+
+@pytest.mark.gen_test
+def test_batches_are_rate_limited_if_every_entry_is(http_helper):
+    yield http_helper.get(url_string(query="{test}"), headers=_client("web"))
+    response = yield http_helper.post_json(
+        "/graphql/batch",
+        [{"id": 1, "query": "{test}"}, {"id": 2, "query": "{test}"}],
+        headers=_client("web"),
+        raise_error=False,
+    )
+
+    assert response.code == 429
+    assert [entry["status"] for entry in response_json(response)] == [429, 429]
+
+
+def test_token_bucket_refills():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(rate=1, burst=2, clock=clock)
+
+    assert limiter.acquire("key") is None
+    assert limiter.acquire("key") is None
+    assert limiter.acquire("key") == pytest.approx(1.0)
+
+    clock.now = 1.0
+    assert limiter.acquire("key") is None
+    assert limiter.acquire("key") == pytest.approx(1.0)
+    assert limiter.allowed == 3
+    assert limiter.limited == 2
+
+
+def test_token_bucket_weights_by_cost():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(rate=1, burst=10, clock=clock)
+
+    assert limiter.acquire("key", cost=8) is None
+    assert limiter.acquire("key", cost=4) == pytest.approx(2.0)
+    assert limiter.acquire("key", cost=2) is None
+
+
+def test_costs_above_the_burst_are_never_allowed():
+    limiter = TokenBucketRateLimiter(rate=1, burst=2, clock=FakeClock())
+
+    assert limiter.acquire("key", cost=3) == math.inf
+    assert limiter.acquire("key", cost=2) is None
+    assert limiter.limited == 1
+
+
+def test_idle_buckets_are_cleaned_up():
+    clock = FakeClock()
+    limiter = TokenBucketRateLimiter(rate=1, burst=2, cleanup_interval=10, clock=clock)
+
+    limiter.acquire("first")
+    clock.now = 9.5
+    limiter.acquire("second")
+    assert len(limiter) == 2
+
+    clock.now = 10.0
+    limiter.acquire("third")
+    assert len(limiter) == 2
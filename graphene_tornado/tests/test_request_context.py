@@ -0,0 +1,96 @@
+import asyncio
+
+import graphene
+import pytest
+import tornado
+from graphene import ObjectType
+from graphene import Schema
+from tornado import gen
+
+from graphene_tornado.request_context import get_request_context
+from graphene_tornado.tests.http_helper import HttpHelper
+from graphene_tornado.tests.test_graphql import GRAPHQL_HEADER
+from graphene_tornado.tests.test_graphql import response_json
+from graphene_tornado.tests.test_graphql import url_string
+from graphene_tornado.tornado_graphql_handler import TornadoGraphQLHandler
+
+
+class Query(ObjectType):
+
+    request_id = graphene.String()
+    slow_request_id = graphene.String(delay=graphene.Float())
+
+    def resolve_request_id(self, info):
+        return get_request_context().request_id
+
+    async def resolve_slow_request_id(self, info, delay=0.0):
+        request_context = get_request_context()
+        await asyncio.sleep(delay)
+        assert get_request_context() is request_context
+        return request_context.request_id
+
+
+schema = Schema(query=Query)
+
+
+class ExampleRequestContextApplication(tornado.web.Application):
+    def __init__(self):
+        handlers = [
+            (r"/graphql", TornadoGraphQLHandler, dict(schema=schema)),
+        ]
+        tornado.web.Application.__init__(self, handlers)
+
+
+@pytest.fixture
+def app():
+    return ExampleRequestContextApplication()
+
+
+@pytest.fixture
+def http_helper(http_client, base_url):
+    return HttpHelper(http_client, base_url)
+
+
+@pytest.mark.gen_test
+def test_request_id_is_taken_from_header(http_helper):
+    headers = dict(GRAPHQL_HEADER)
+    headers["X-Request-Id"] = "abc123"
+    response = yield http_helper.get(url_string(query="{requestId}"), headers=headers)
+
+    assert response.code == 200
+    assert response_json(response) == {"data": {"requestId": "abc123"}}
+
+
+@pytest.mark.gen_test
+def test_request_id_is_generated(http_helper):
+    response = yield http_helper.get(
+        url_string(query="{requestId}"), headers=GRAPHQL_HEADER
+    )
+
+    assert response.code == 200
+    assert len(response_json(response)["data"]["requestId"]) == 32
+
+
+@pytest.mark.gen_test
+def test_request_context_is_isolated_between_concurrent_requests(http_helper):
+    first = dict(GRAPHQL_HEADER)
+    first["X-Request-Id"] = "first"
+    second = dict(GRAPHQL_HEADER)
+    second["X-Request-Id"] = "second"
+
+    responses = yield gen.multi(
+        [
+            http_helper.get(
+                url_string(query="{slowRequestId(delay: 0.05)}"), headers=first
+            ),
+            http_helper.get(
+                url_string(query="{slowRequestId(delay: 0.01)}"), headers=second
+            ),
+        ]
+    )
+
+    assert [response_json(r)["data"]["slowRequestId"] for r in responses] == [
+        "first",
+        "second",
+    ]
+    assert get_request_context() is None
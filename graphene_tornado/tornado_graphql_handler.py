@@ -1,11 +1,15 @@
+import asyncio
 import inspect
 import json
+import math
 import sys
 import traceback
 from asyncio import iscoroutinefunction
 from typing import Any
 from typing import Callable
+from typing import cast
 from typing import Dict
+from typing import Hashable
 from typing import List
 from typing import Optional
 from typing import Tuple
@@ -18,7 +22,6 @@ from graphql import get_operation_ast
 from graphql import OperationType
 from graphql import parse
 from graphql import validate
-from graphql.error import GraphQLFormattedError  as format_graphql_error
 from graphql.error.graphql_error import GraphQLError
 from graphql.error.syntax_error import GraphQLSyntaxError
 from graphql.execution.execute import ExecutionResult
@@ -27,15 +30,41 @@ from tornado import web
 from tornado.escape import json_encode
 from tornado.escape import to_unicode
 from tornado.httputil import HTTPServerRequest
+from tornado.ioloop import IOLoop
 from tornado.log import app_log
 from tornado.web import HTTPError
 from typing_extensions import Awaitable
 from werkzeug.datastructures import MIMEAccept
 from werkzeug.http import parse_accept_header
 
+from graphene_tornado.admission import AdmissionController
+from graphene_tornado.admission import AdmissionLane
+from graphene_tornado.admission import AdmissionRejectedError
+from graphene_tornado.deadline import DEADLINE_GRACE_PERIOD
+from graphene_tornado.deadline import deadline_middleware
+from graphene_tornado.deadline import DeadlineExceededError
+from graphene_tornado.ext.extension_helpers import get_signature_hash
+from graphene_tornado.extension_stack import ExtensionPool
 from graphene_tornado.extension_stack import GraphQLExtensionStack
 from graphene_tornado.graphql_extension import GraphQLExtension
+from graphene_tornado.operation_registry import OperationRegistry
+from graphene_tornado.operation_registry import RegisteredOperation
+from graphene_tornado.rate_limit import OperationCostExceededError
+from graphene_tornado.rate_limit import RateLimitExceededError
+from graphene_tornado.rate_limit import TokenBucketRateLimiter
 from graphene_tornado.render_graphiql import render_graphiql
+from graphene_tornado.request_context import CLIENT_NAME_HEADER
+from graphene_tornado.request_context import CLIENT_VERSION_HEADER_KEY
+from graphene_tornado.request_context import get_request_context
+from graphene_tornado.request_context import OPERATION_ID_KEY
+from graphene_tornado.request_context import REGISTERED_OPERATION
+from graphene_tornado.request_context import REQUEST_ID_HEADER
+from graphene_tornado.request_context import REQUEST_TIMEOUT_HEADER
+from graphene_tornado.request_context import RequestContext
+from graphene_tornado.request_context import reset_request_context
+from graphene_tornado.request_context import set_request_context
+from graphene_tornado.request_context import SIGNATURE
+from graphene_tornado.request_context import SIGNATURE_HASH_KEY
 
 
 class ExecutionError(Exception):
@@ -48,6 +77,15 @@ class ExecutionError(Exception):
         self.message = "\n".join(self.errors)
 
 
+class HandlerStats:
+    """
+    Process-wide counters for TornadoGraphQLHandler.
+    """
+
+    def __init__(self) -> None:
+        self.abandoned_requests = 0
+
+
 class TornadoGraphQLHandler(web.RequestHandler):
 
     schema: Schema
@@ -59,11 +97,20 @@ class TornadoGraphQLHandler(web.RequestHandler):
     graphiql_version: Optional[str] = None
     graphiql_template: Optional[str] = None
     graphiql_html_title: Optional[str] = None
+    request_timeout: Optional[float] = None
     document: Optional[DocumentNode]
     graphql_params: Optional[Tuple[Any, Any, Any, Any]] = None
     parsed_body: Optional[Dict[str, Any]] = None
     extension_stack = GraphQLExtensionStack([])
     request_context: Dict[str, Any] = {}
+    stats = HandlerStats()
+    execution_task: Optional["asyncio.Future[Any]"] = None
+    abandoned: bool = False
+    admission_controller: Optional[AdmissionController] = None
+    admission_lane: Optional[AdmissionLane] = None
+    rate_limiter: Optional[TokenBucketRateLimiter] = None
+    operation_registry: Optional[OperationRegistry] = None
+    registered_operation: Optional[RegisteredOperation] = None
 
     def initialize(
         self,
@@ -74,8 +121,12 @@ class TornadoGraphQLHandler(web.RequestHandler):
         pretty: bool = False,
         batch: bool = False,
         extensions: List[
-            Union[Callable[[], GraphQLExtension], GraphQLExtension]
+            Union[Callable[[], GraphQLExtension], GraphQLExtension, ExtensionPool]
         ] = None,
+        request_timeout: Optional[float] = None,
+        admission_controller: Optional[AdmissionController] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        operation_registry: Optional[OperationRegistry] = None,
     ) -> None:
         super(TornadoGraphQLHandler, self).initialize()
 
@@ -89,14 +140,49 @@ class TornadoGraphQLHandler(web.RequestHandler):
         if middleware is not None:
             middlewares.extend(list(self.instantiate_middleware(middleware)))
 
-        if len(middlewares) > 0:
-            self.middleware = middlewares
+        self.middleware = middlewares
+        # Innermost, so that extensions see the timeout errors it raises. Only requests
+        # with a deadline pay for it.
+        self.middleware_with_deadline = middlewares + [deadline_middleware]
+        self.request_timeout = request_timeout
+        self.admission_controller = admission_controller
+        self.rate_limiter = rate_limiter
+        self.operation_registry = operation_registry
 
         self.root_value = root_value
         self.pretty = pretty
         self.graphiql = graphiql
         self.batch = batch
 
+    async def prepare(self) -> None:
+        if self.admission_controller is None:
+            return
+
+        lane = self.admission_controller.lane(self.get_admission_lane())
+        try:
+            await lane.acquire()
+        except AdmissionRejectedError as ex:
+            self.handle_error(ex)
+            await self.finish()
+            return
+        self.admission_lane = lane
+
+    def get_admission_lane(self) -> Optional[str]:
+        """
+        Selects the admission lane of the request. This runs before the body is parsed, so it can
+        only use the URI and headers. Returns None for the default lane.
+        """
+        return None
+
+    def release_admission(self) -> None:
+        if self.admission_lane is not None:
+            self.admission_lane.release()
+            self.admission_lane = None
+
+    def on_finish(self) -> None:
+        self.release_admission()
+        self.extension_stack.release()
+
     @property
     def context(self) -> HTTPServerRequest:
         return self.request
@@ -105,6 +191,9 @@ class TornadoGraphQLHandler(web.RequestHandler):
         return self.root_value
 
     def get_middleware(self) -> List[Callable]:
+        request_context = get_request_context()
+        if request_context is not None and request_context.deadline is not None:
+            return self.middleware_with_deadline
         return self.middleware
 
     def get_document(self) -> Optional[DocumentNode]:
@@ -113,18 +202,72 @@ class TornadoGraphQLHandler(web.RequestHandler):
     def get_parsed_body(self):
         return self.parsed_body
 
+    def create_request_context(self) -> RequestContext:
+        """
+        Creates the context for a single GraphQL response. Subclasses can override this to attach
+        loaders or caches that resolvers retrieve with get_request_context().
+        """
+        return RequestContext(
+            request_id=self.request.headers.get(REQUEST_ID_HEADER, None),
+            request=self.request,
+            deadline=self.get_deadline(),
+        )
+
+    def get_deadline(self) -> Optional[float]:
+        """
+        The deadline is the handler's request_timeout, shortened by the client's X-Request-Timeout
+        header if that asks for less time.
+
+        Returns:
+            The IOLoop time by which the request should finish, or None for no deadline
+        """
+        timeout = self.request_timeout
+        header = self.request.headers.get(REQUEST_TIMEOUT_HEADER, None)
+        if header is not None:
+            try:
+                requested = float(header)
+            except ValueError:
+                requested = math.nan
+            # A non-finite timeout would end up as a NaN or infinite timer on the IOLoop
+            if not (math.isfinite(requested) and requested >= 0):
+                raise HTTPError(400, "Invalid {} header.".format(REQUEST_TIMEOUT_HEADER))
+            if timeout is None or requested < timeout:
+                timeout = requested
+
+        if timeout is None:
+            return None
+        return IOLoop.current().time() + timeout
+
     async def get(self) -> None:
         try:
             await self.run("get")
+        except asyncio.CancelledError:
+            if not self.abandoned:
+                raise
         except Exception as ex:
             self.handle_error(ex)
 
     async def post(self) -> None:
         try:
             await self.run("post")
+        except asyncio.CancelledError:
+            if not self.abandoned:
+                raise
         except Exception as ex:
             self.handle_error(ex)
 
+    def on_connection_close(self) -> None:
+        """
+        Cancels the execution in progress when the client goes away, so that resolvers stop calling
+        backends for a result that nobody will read.
+        """
+        super(TornadoGraphQLHandler, self).on_connection_close()
+        self.release_admission()
+        if self.execution_task is not None and not self.execution_task.done():
+            self.abandoned = True
+            self.stats.abandoned_requests += 1
+            self.execution_task.cancel()
+
     async def run(self, method: str) -> None:
         show_graphiql = self.graphiql and self.should_display_graphiql()
 
@@ -137,10 +280,16 @@ class TornadoGraphQLHandler(web.RequestHandler):
         if self.batch:
             responses = []
             for entry in data:
+                # The params are cached per request, each entry has its own
+                self.graphql_params = None
                 r = await self.get_response(entry, method, entry)
                 responses.append(r)
             result = "[{}]".format(",".join([response[0] for response in responses]))
-            status_code = max(responses, key=lambda response: response[1])[1]
+            # Rate limited entries carry their own status, the batch is only a 429 if all of them are
+            status_code = max(
+                (response[1] for response in responses if response[1] != 429),
+                default=429,
+            )
         else:
             result, status_code = await self.get_response(data, method, show_graphiql)
 
@@ -209,10 +358,37 @@ class TornadoGraphQLHandler(web.RequestHandler):
         return self.parsed_body
 
     async def get_response(self, data, method, show_graphiql=False):
+        request_context = self.create_request_context()
+        self.request_context = request_context.values
+        token = set_request_context(request_context)
+        try:
+            return await self._get_response(
+                data, method, request_context.values, show_graphiql
+            )
+        finally:
+            reset_request_context(token)
+
+    async def _get_response(self, data, method, request_context, show_graphiql=False):
         query, variables, operation_name, id = self.get_graphql_params(
             self.request, data
         )
 
+        self.registered_operation = None
+        if self.operation_registry is not None:
+            operation = self.get_registered_operation(
+                data, query, operation_name, request_context
+            )
+            # Query text that only matches the signature of a registered operation may have different
+            # literals, so it is executed as sent
+            if operation is not None and (not query or query == operation.body):
+                self.registered_operation = operation
+                query = operation.body
+                operation_name = operation_name or operation.operation_name or None
+                # Share the precomputed signature so that reporting never transforms the registered
+                # document
+                request_context[SIGNATURE] = operation.signature
+                request_context[SIGNATURE_HASH_KEY] = operation.id
+
         request_end = await self.extension_stack.request_started(
             self.request,
             query,
@@ -220,13 +396,30 @@ class TornadoGraphQLHandler(web.RequestHandler):
             operation_name,
             variables,
             self.context,
-            self.request_context,
+            request_context,
         )
 
+        errors: List[BaseException] = []
         try:
-            execution_result, invalid = await self.execute_graphql_request(
-                method, query, variables, operation_name, show_graphiql
+            self.execution_task = asyncio.ensure_future(
+                self.execute_graphql_request(
+                    method, query, variables, operation_name, show_graphiql
+                )
             )
+            rejection: Optional[HTTPError] = None
+            try:
+                execution_result, invalid = await self.execution_task
+            except (RateLimitExceededError, OperationCostExceededError) as e:
+                # The entries of a batch are limited one by one, the others still execute
+                if not self.batch:
+                    raise
+                rejection = e
+                execution_result = ExecutionResult(
+                    errors=[GraphQLError(e.log_message)], data=None
+                )
+                invalid = True
+            finally:
+                self.execution_task = None
 
             status_code = 200
             if execution_result:
@@ -246,13 +439,16 @@ class TornadoGraphQLHandler(web.RequestHandler):
                     ]
 
                 if invalid:
-                    status_code = 400
+                    status_code = 400 if rejection is None else rejection.status_code
                 else:
                     response["data"] = execution_result.data
 
                 if self.batch:
                     response["id"] = id
                     response["status"] = status_code
+                    retry_after = getattr(rejection, "retry_after", None)
+                    if retry_after is not None:
+                        response["retryAfter"] = retry_after
 
                 result = self.json_encode(response, pretty=self.pretty or show_graphiql)
             else:
@@ -261,8 +457,11 @@ class TornadoGraphQLHandler(web.RequestHandler):
             res = (result, status_code)
             await self.extension_stack.will_send_response(result, self.context)
             return res
+        except asyncio.CancelledError as e:
+            errors.append(e)
+            raise
         finally:
-            await request_end()
+            await request_end(errors)
 
     async def execute_graphql_request(
         self,
@@ -279,29 +478,21 @@ class TornadoGraphQLHandler(web.RequestHandler):
                 return None, None
             raise HTTPError(400, "Must provide query string.")
 
-        parsing_ended = await self.extension_stack.parsing_started(query)
-        try:
-            self.document = parse(query)
-            await parsing_ended()
-        except GraphQLError as e:
-            await parsing_ended(e)
-            return ExecutionResult(errors=[e], data=None), True
-
-        validation_ended = await self.extension_stack.validation_started()
-        try:
-            validation_errors = validate(self.schema.graphql_schema, self.document)
-        except GraphQLError as e:
-            await validation_ended([e])
-            return ExecutionResult(errors=[e], data=None), True
-
-        if validation_errors:
-            await validation_ended(validation_errors)
-            return ExecutionResult(errors=validation_errors, data=None,), True
+        if self.registered_operation is not None:
+            # Registered operations were parsed and validated when the registry was built
+            self.document = self.registered_operation.document
         else:
-            await validation_ended()
+            invalid_result = await self.parse_and_validate(query)
+            if invalid_result is not None:
+                return invalid_result, True
+
+        document = self.document
+        if document is None:
+            # parse_and_validate sets the document whenever it returns no errors
+            raise HTTPError(500, "Query was not parsed.")
 
         if method.lower() == "get":
-            operation_node = get_operation_ast(self.document, operation_name)
+            operation_node = get_operation_ast(document, operation_name)
             if not operation_node:
                 if show_graphiql:
                     return None, None
@@ -320,31 +511,167 @@ class TornadoGraphQLHandler(web.RequestHandler):
                     ),
                 )
 
+        if self.rate_limiter is not None:
+            self.check_rate_limit(document, query, variables, operation_name)
+
         execution_ended = await self.extension_stack.execution_started(
             schema=self.schema.graphql_schema,
-            document=self.document,
+            document=document,
             root=self.root_value,
             context=self.context,
             variables=variables,
             operation_name=operation_name,
-            request_context=self.request_context,
+            request_context=self._current_request_values(),
         )
         try:
             result = await self.execute(
-                self.document,
+                document,
                 root_value=self.get_root(),
                 variable_values=variables,
                 operation_name=operation_name,
                 context_value=self.context,
                 middleware=self.get_middleware(),
             )
+            if is_awaitable(result):
+                result = await self._await_execution(
+                    cast(Awaitable[ExecutionResult], result)
+                )
             await execution_ended()
+        except DeadlineExceededError as e:
+            await execution_ended([e])
+            return ExecutionResult(errors=[e], data=None), False
+        except asyncio.CancelledError as e:
+            await execution_ended([e])
+            raise
         except GraphQLError as e:
             await execution_ended([e])
             return ExecutionResult(errors=[e], data=None), True
 
         return result, False
 
+    async def parse_and_validate(self, query: str) -> Optional[ExecutionResult]:
+        """
+        Parses and validates the query into self.document.
+
+        Returns:
+            None if the query is valid, otherwise a result holding the errors
+        """
+        parsing_ended = await self.extension_stack.parsing_started(query)
+        try:
+            self.document = parse(query)
+            await parsing_ended()
+        except GraphQLError as e:
+            await parsing_ended(e)
+            return ExecutionResult(errors=[e], data=None)
+
+        validation_ended = await self.extension_stack.validation_started()
+        try:
+            validation_errors = validate(self.schema.graphql_schema, self.document)
+        except GraphQLError as e:
+            await validation_ended([e])
+            return ExecutionResult(errors=[e], data=None)
+
+        if validation_errors:
+            await validation_ended(validation_errors)
+            return ExecutionResult(errors=validation_errors, data=None,)
+
+        await validation_ended()
+        return None
+
+    async def _await_execution(
+        self, result: Awaitable[ExecutionResult]
+    ) -> ExecutionResult:
+        request_context = get_request_context()
+        remaining = request_context.time_remaining() if request_context else None
+        if remaining is None:
+            return await result
+
+        try:
+            return await asyncio.wait_for(result, remaining + DEADLINE_GRACE_PERIOD)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError()
+
+    def get_registered_operation(
+        self,
+        data: Dict[str, Any],
+        query: Optional[str],
+        operation_name: Optional[str],
+        request_context: Dict[str, Any],
+    ) -> Optional[RegisteredOperation]:
+        """
+        Looks up the registered operation for the request in safelist mode.
+
+        Raises:
+            ForbiddenOperationError: If the request is for an operation that is not registered
+        """
+        operation_id = self.get_query_argument(OPERATION_ID_KEY, None) or data.get(
+            OPERATION_ID_KEY, None
+        )
+        client = (
+            self.request.headers.get(CLIENT_NAME_HEADER, ""),
+            self.request.headers.get(CLIENT_VERSION_HEADER_KEY, ""),
+        )
+        operation = self.operation_registry.resolve(  # type: ignore
+            operation_id, query, operation_name, client
+        )
+        if operation is not None:
+            request_context[REGISTERED_OPERATION] = True
+        return operation
+
+    def check_rate_limit(
+        self,
+        document: DocumentNode,
+        query: str,
+        variables: Optional[Dict[str, Any]],
+        operation_name: Optional[str],
+    ) -> None:
+        """
+        Takes the operation's cost from its rate limit bucket. An operation that has to wait is rejected with
+        a 429 and a Retry-After header, and one that costs more than the burst with a 400, since it will never
+        be allowed. In batch mode each entry is limited on its own: a limited entry gets its status and
+        retryAfter in the response while the other entries still execute, and the batch as a whole is only
+        a 429 if every entry was limited.
+        """
+        key = self.get_rate_limit_key(query, operation_name)
+        cost = self.get_operation_cost(document, variables, operation_name)
+        retry_after = self.rate_limiter.acquire(key, cost)  # type: ignore
+        if retry_after == math.inf:
+            raise OperationCostExceededError(cost, self.rate_limiter.burst)  # type: ignore
+        if retry_after is not None:
+            raise RateLimitExceededError(math.ceil(retry_after))
+
+    def get_rate_limit_key(self, query: str, operation_name: Optional[str]) -> Hashable:
+        """
+        Rate limits are applied per client name, client version and operation signature.
+        """
+        request_context = self._current_request_values()
+        signature_hash = get_signature_hash(
+            request_context, operation_name, self.document, query
+        )
+        return (
+            self.request.headers.get(CLIENT_NAME_HEADER, ""),
+            self.request.headers.get(CLIENT_VERSION_HEADER_KEY, ""),
+            signature_hash,
+        )
+
+    def get_operation_cost(
+        self,
+        document: DocumentNode,
+        variables: Optional[Dict[str, Any]],
+        operation_name: Optional[str],
+    ) -> float:
+        """
+        The number of rate limit tokens the operation consumes. Override this to weight operations by
+        their computed cost.
+        """
+        return 1.0
+
+    def _current_request_values(self) -> Dict[str, Any]:
+        request_context = get_request_context()
+        if request_context is None:
+            return self.request_context
+        return request_context.values
+
     async def execute(
         self, *args, **kwargs
     ) -> Union[Awaitable[ExecutionResult], ExecutionResult]:
@@ -429,6 +756,9 @@ class TornadoGraphQLHandler(web.RequestHandler):
             tb = "".join(traceback.format_exception(*sys.exc_info()))
             app_log.error("Error: {0} {1}".format(ex, tb))
         self.set_status(self.error_status(ex))
+        retry_after = getattr(ex, "retry_after", None)
+        if retry_after is not None:
+            self.set_header("Retry-After", str(retry_after))
         error_json = json_encode({"errors": self.error_format(ex)})
         app_log.debug("error_json: %s", error_json)
         self.write(error_json)
@@ -447,7 +777,7 @@ class TornadoGraphQLHandler(web.RequestHandler):
         if isinstance(exception, ExecutionError):
             return [{"message": e} for e in exception.errors]
         elif isinstance(exception, GraphQLError):
-            return [format_graphql_error(exception)]
+            return [cast(Dict[str, Any], exception.formatted)]
         elif isinstance(exception, web.HTTPError):
             return [{"message": exception.log_message}]
         else:
@@ -456,6 +786,6 @@ class TornadoGraphQLHandler(web.RequestHandler):
     @staticmethod
     def format_error(error: Union[GraphQLError, GraphQLSyntaxError]) -> Dict[str, Any]:
         if isinstance(error, GraphQLError):
-            return format_graphql_error(error)
+            return cast(Dict[str, Any], error.formatted)
 
         return {"message": str(error)}
@@ -44,7 +44,7 @@ setup(
 
     keywords='api graphql protocol rest relay graphene',
 
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['tests', 'benchmarks', 'benchmarks.*']),
 
     install_requires=[
         'six>=1.10.0',
@@ -61,7 +61,7 @@ setup(
     tests_require=tests_require,
     extras_require={
         'test': tests_require,
-        'apollo-engine-reporting': ['json-stable-stringify-python==0.2','protobuf>=3.7.1','tornado-retry-client==0.6.1'],
+        'apollo-engine-reporting': ['json-stable-stringify-python==0.2','protobuf>=3.7.1'],
         'opencensus': ['opencensus>=0.7.3'],
     },
     include_package_data=True,